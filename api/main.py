@@ -1,11 +1,12 @@
 import os
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from fastapi.middleware.cors import CORSMiddleware
 import pandas as pd
 import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 import time
 from functools import lru_cache
@@ -17,6 +18,9 @@ key: str = os.environ.get("SUPABASE_KEY")
 supabase: Client = create_client(url, key)
 app = FastAPI()
 
+# Solver processes per /fantasy/lineups request (each request starts its own pool)
+FANTASY_LINEUP_WORKERS = int(os.environ.get("FANTASY_LINEUP_WORKERS", "2"))
+
 # --- CACHING SETUP ---
 # Simple in-memory cache with TTL
 _cache = {}
@@ -50,6 +54,58 @@ app.add_middleware(
 class CompareRequest(BaseModel):
     player_ids: List[str] 
 
+class PortfolioRequest(BaseModel):
+    player_ids: List[str]
+    weights: Optional[Dict[str, float]] = None  # player_id -> shares; equal weights if omitted
+
+class SwapRequest(BaseModel):
+    add: List[str] = []
+    drop: List[str] = []
+    shares: Optional[Dict[str, float]] = None  # Shares for added players (default 1)
+
+class SimulationRequest(BaseModel):
+    player_ids: List[str]
+    weights: Optional[Dict[str, float]] = None
+    swaps: List[SwapRequest]
+    limit: Optional[int] = None
+
+class ParlayLeg(BaseModel):
+    player_id: str
+    prop_type: str  # e.g. points, threes, points_rebounds_assists
+    line: float
+    side: str = 'over'
+
+class PropSimulationRequest(BaseModel):
+    legs: List[ParlayLeg]
+    draws: Optional[int] = None
+    seed: Optional[int] = None
+
+class LineupRequest(BaseModel):
+    site: str = 'draftkings'
+    salaries_csv: Optional[str] = None  # Contents of the site's salary export
+    max_per_team: Optional[int] = None
+    min_stack: Optional[int] = None  # At least this many players from one team (~1-1.5s on big slates; stacks is faster)
+    stacks: Optional[Dict[str, int]] = None  # team -> minimum players
+    locked: List[str] = []
+    excluded: List[str] = []
+    scoring: Optional[str] = None  # Scoring preset; defaults to the site's own
+
+class MultiLineupRequest(LineupRequest):
+    n_lineups: int = 20
+    noise: float = 0.1  # Relative projection noise per lineup, for diversity
+    max_exposure: float = 1.0  # Largest share of lineups any player is in
+    exposures: Optional[Dict[str, float]] = None  # player_id -> own cap
+    min_unique: int = 1  # Players each lineup must not share with any other
+    seed: int = 0
+    export: bool = False  # Return the site upload CSV instead of JSON
+
+class ProjectionRequest(BaseModel):
+    scoring: str = 'standard'  # Preset the custom weights and bonuses start from
+    weights: Optional[Dict[str, float]] = None  # stat -> points per unit (0 drops the stat)
+    bonuses: Optional[Dict[str, float]] = None  # double_double / triple_double -> points
+    position: Optional[str] = None
+    limit: int = 50
+
 # --- 3. API ENDPOINTS ---
 @app.get("/")
 def read_root():
@@ -62,6 +118,13 @@ def clear_cache():
     cache_size = len(_cache)
     _cache.clear()
     _cache_ttl.clear()
+    
+    # Have the advisors' shared snapshot check for a new value_date
+    import sys
+    import os
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+    from snapshot_service import SnapshotService
+    SnapshotService.invalidate()
     return {
         "message": "Cache cleared successfully",
         "items_cleared": cache_size,
@@ -125,6 +188,19 @@ def get_player_value_history(player_id: str):
 @app.get("/player/{player_id}/stats")
 def get_player_stats(player_id: str):
     try:
+        # Last games come with the player's rolling stats row
+        import sys
+        import os
+        sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+        from rolling_stats import load_rolling_stats
+        
+        try:
+            row = load_rolling_stats([player_id]).get(player_id)
+            if row is not None:
+                return row['games'][:5]
+        except Exception as e:
+            print(f"Rolling stats unavailable: {e}")
+        
         response = supabase.table('daily_player_stats').select('*').eq('player_id', player_id).order('game_date', desc=True).limit(5).execute()
         return response.data if response.data else []
     except Exception as e:
@@ -158,46 +234,17 @@ def get_player_news(player_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/player/{player_id}/sentiment_breakdown")
-def get_player_sentiment_breakdown(player_id: str):
-    """Get sentiment breakdown by source for a player"""
+def get_player_sentiment_breakdown(player_id: str, days: Optional[int] = None):
+    """Get sentiment breakdown by source for a player (optionally over the last N days)"""
     try:
-        # Get recent sentiment data
-        response = supabase.table('daily_player_sentiment').select(
-            'sentiment_score, source'
-        ).eq('player_id', player_id).execute()
-        
-        if not response.data:
-            return {"total_mentions": 0, "by_source": {}, "avg_sentiment": 0}
-        
-        # Group by source
-        by_source = {}
-        total_sentiment = 0
-        
-        for item in response.data:
-            source = item.get('source', 'unknown')
-            score = item['sentiment_score']
-            
-            if source not in by_source:
-                by_source[source] = {
-                    "count": 0,
-                    "avg_sentiment": 0,
-                    "total": 0
-                }
-            
-            by_source[source]["count"] += 1
-            by_source[source]["total"] += score
-            total_sentiment += score
-        
-        # Calculate averages
-        for source in by_source:
-            by_source[source]["avg_sentiment"] = by_source[source]["total"] / by_source[source]["count"]
-            del by_source[source]["total"]
+        import sys
+        import os
+        sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+        from sentiment_aggregates import source_breakdown
         
-        return {
-            "total_mentions": len(response.data),
-            "by_source": by_source,
-            "avg_sentiment": total_sentiment / len(response.data) if response.data else 0
-        }
+        # Read the per-(source, day) totals instead of every sentiment row
+        since = (datetime.date.today() - datetime.timedelta(days=days)).isoformat() if days else None
+        return source_breakdown(player_id, since=since)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -374,8 +421,38 @@ def get_breakout_candidates(limit: int = 10):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ai/screens")
+def get_screens(screens: str = "buy,sell,breakout", limit: int = 10):
+    """Run several signal screens (comma-separated: buy, sell, breakout) in one call"""
+    try:
+        import sys
+        import os
+        sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+        from ai_trade_advisor import AITradeAdvisor
+        from signal_screener import available_screens
+        
+        names = [name.strip() for name in screens.split(',') if name.strip()]
+        unknown = [name for name in names if name not in available_screens()]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown screens: {', '.join(unknown)}")
+        
+        advisor = AITradeAdvisor()
+        results = advisor.run_screens(names, limit)
+        
+        return {
+            name: {
+                "count": len(players),
+                "players": players
+            }
+            for name, players in results.items()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/ai/portfolio-analysis")
-def analyze_portfolio(request: CompareRequest):
+def analyze_portfolio(request: PortfolioRequest):
     """Analyze risk and performance of a portfolio of players"""
     try:
         import sys
@@ -384,7 +461,7 @@ def analyze_portfolio(request: CompareRequest):
         from ai_trade_advisor import AITradeAdvisor
         
         advisor = AITradeAdvisor()
-        analysis = advisor.analyze_portfolio_risk(request.player_ids)
+        analysis = advisor.analyze_portfolio_risk(request.player_ids, request.weights)
         
         return analysis
     except Exception as e:
@@ -401,54 +478,86 @@ def analyze_portfolio(request: CompareRequest):
             ]
         }
 
+@app.post("/ai/portfolio/simulate")
+def simulate_portfolio(request: SimulationRequest):
+    """
+    Score a batch of what-if trades (add X / drop Y) against a base roster in
+    one call, ranked by change in risk-adjusted value
+    """
+    import sys
+    import os
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+    from portfolio_analytics import PortfolioAnalytics, MAX_SCENARIOS
+
+    if len(request.swaps) > MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCENARIOS} swaps per request")
+
+    try:
+        swaps = [{'add': s.add, 'drop': s.drop, 'shares': s.shares} for s in request.swaps]
+        result = PortfolioAnalytics().simulate(request.player_ids, swaps, request.weights, request.limit)
+        if 'error' in result:
+            raise HTTPException(status_code=404, detail=result['error'])
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def serve_report(request: Request, report_name: str):
+    """
+    Serve a precomputed daily report with an ETag. Reports are built by the
+    last pipeline stage (scraper/daily_reports.py); one is only computed live
+    when nothing is stored for the latest value_date.
+    """
+    import sys
+    import os
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+    from daily_reports import REPORT_BUILDERS, get_report, normalize_payload, compute_etag
+    from snapshot_service import get_snapshot
+    
+    value_date = get_snapshot().version
+    cache_key = f"report_{report_name}_{value_date}"
+    
+    report, hit = get_cached(cache_key, ttl_seconds=300)
+    if not hit:
+        report = get_report(report_name, value_date) if value_date else None
+        if report is None:
+            print(f"ℹ️  No stored {report_name} for {value_date} - computing live")
+            payload = normalize_payload(REPORT_BUILDERS[report_name]())
+            report = {'payload': payload, 'etag': compute_etag(payload)}
+        set_cache(cache_key, report)
+    
+    etag = f'"{report["etag"]}"'
+    if_none_match = request.headers.get('if-none-match', '')
+    if etag in [tag.strip().replace('W/', '', 1) for tag in if_none_match.split(',')]:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    return JSONResponse(content=report['payload'], headers={"ETag": etag})
+
 @app.get("/ai/daily-insights")
-def get_daily_insights():
+def get_daily_insights(request: Request):
     """Get comprehensive daily AI insights"""
+    try:
+        return serve_report(request, 'daily_insights')
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/ai/model-info")
+def get_model_info():
+    """Get metadata for the ML trade model currently being served"""
     try:
         import sys
         import os
         sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
-        from ai_trade_advisor import AITradeAdvisor
+        from model_registry import ModelRegistry
         
-        advisor = AITradeAdvisor()
-        
-        buy_ops = advisor.find_buy_opportunities(5)
-        sell_ops = advisor.find_sell_opportunities(5)
-        breakouts = advisor.find_breakout_candidates(5)
-        
-        # Try to get ML recommendations
-        ml_recommendations = []
-        try:
-            from ml_trade_advisor import MLTradeAdvisor
-            ml_advisor = MLTradeAdvisor()
-            ml_recommendations = ml_advisor.get_ml_recommendations(5)
-        except Exception as e:
-            print(f"ML recommendations unavailable: {e}")
+        registry = ModelRegistry()
+        metadata = registry.get_metadata()
         
         return {
-            "generated_at": datetime.datetime.now().isoformat(),
-            "buy_opportunities": {
-                "count": len(buy_ops),
-                "players": buy_ops
-            },
-            "sell_opportunities": {
-                "count": len(sell_ops),
-                "players": sell_ops
-            },
-            "breakout_candidates": {
-                "count": len(breakouts),
-                "players": breakouts
-            },
-            "ml_recommendations": {
-                "count": len(ml_recommendations),
-                "players": ml_recommendations
-            },
-            "summary": {
-                "total_opportunities": len(buy_ops) + len(sell_ops),
-                "high_urgency_buys": sum(1 for o in buy_ops if o['urgency'] == 'high'),
-                "high_urgency_sells": sum(1 for o in sell_ops if o['urgency'] == 'high'),
-                "high_potential_breakouts": sum(1 for b in breakouts if b['potential'] == 'high')
-            }
+            "current_version": registry.current_version(),
+            "available_versions": registry.list_versions(),
+            "metadata": metadata
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -525,35 +634,10 @@ def get_value_drops(limit: int = 10):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/ai/price-forecast")
-def get_price_forecast():
+def get_price_forecast(request: Request):
     """Get comprehensive price forecast report"""
     try:
-        import sys
-        import os
-        sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
-        from ai_price_predictor import AIPricePredictor
-        
-        predictor = AIPricePredictor()
-        
-        trending = predictor.find_trending_players(5)
-        drops = predictor.find_value_drops(5)
-        
-        return {
-            "generated_at": datetime.datetime.now().isoformat(),
-            "trending_players": {
-                "count": len(trending),
-                "players": trending
-            },
-            "value_drops": {
-                "count": len(drops),
-                "players": drops
-            },
-            "summary": {
-                "total_predictions": len(trending) + len(drops),
-                "strong_buy_signals": sum(1 for d in drops if d.get('buy_signal', False)),
-                "high_confidence_predictions": sum(1 for t in trending if t.get('prediction_confidence', 0) > 0.7)
-            }
-        }
+        return serve_report(request, 'price_forecast')
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -744,14 +828,84 @@ def get_player_betting_props(player_id: str, use_real_lines: bool = False):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/betting/simulate")
+def simulate_props(request: PropSimulationRequest):
+    """
+    Monte Carlo hit probabilities for each leg and for all legs together
+    (correlation between legs on the same player is priced in)
+    """
+    import sys
+    import os
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+    from prop_simulator import PropSimulator, DEFAULT_DRAWS, MAX_DRAWS, MAX_PARLAY_LEGS
+    
+    if not request.legs or len(request.legs) > MAX_PARLAY_LEGS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_PARLAY_LEGS} legs per request")
+    if request.draws is not None and request.draws < 1:
+        raise HTTPException(status_code=400, detail="draws must be positive")
+    
+    try:
+        simulator = PropSimulator(seed=request.seed, draws=min(request.draws or DEFAULT_DRAWS, MAX_DRAWS))
+        simulator.fit([leg.player_id for leg in request.legs])
+        result = simulator.price_parlay([leg.dict() for leg in request.legs])
+        if 'error' in result:
+            raise HTTPException(status_code=400, detail=result['error'])
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/betting/odds/best")
+def get_best_odds(player: str, market: str = None):
+    """
+    Best available over and under (and every bookmaker's current quote) for a
+    player's props, from the recorded odds history - no Odds API call
+
+    Parameters:
+    - player: Player name as the bookmakers list it
+    - market: Prop type, e.g. 'points' or 'points_rebounds_assists' (default: all)
+    """
+    try:
+        import sys
+        import os
+        sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+        from odds_history import get_odds_history
+
+        markets = get_odds_history().best_prices(player, market)
+        if not markets:
+            raise HTTPException(status_code=404, detail="No current odds recorded for this player")
+        return {'player': player, 'markets': markets}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/betting/odds/movement")
+def get_line_movement(player: str, market: str, hours: float = 24, bookmaker: str = None):
+    """
+    Line and price changes for one prop over the last `hours`, oldest first
+    """
+    try:
+        import sys
+        import os
+        sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+        from odds_history import get_odds_history
+
+        ticks = get_odds_history().movement(player, market, hours=hours, bookmaker=bookmaker)
+        return {'player': player, 'market': market, 'hours': hours, 'movement': ticks}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # --- FANTASY OPTIMIZER ENDPOINTS ---
 
 @app.get("/fantasy/lineup")
-def get_fantasy_lineup():
-    """Get optimal fantasy lineup"""
+def get_fantasy_lineup(site: str = 'draftkings'):
+    """Get optimal fantasy lineup (roster slots filled, no salaries)"""
     try:
         # Check cache (2 min cache)
-        cached_data, hit = get_cached("fantasy_lineup", ttl_seconds=120)
+        cache_key = f"fantasy_lineup_{site}"
+        cached_data, hit = get_cached(cache_key, ttl_seconds=120)
         if hit:
             return cached_data
         
@@ -761,16 +915,177 @@ def get_fantasy_lineup():
         from fantasy_optimizer import FantasyOptimizer
         
         optimizer = FantasyOptimizer()
-        lineup = optimizer.get_optimal_lineup(limit=10)
+        lineup = optimizer.get_optimal_lineup(site=site)
+        if 'error' in lineup:
+            raise HTTPException(status_code=400, detail=lineup['error'])
         
         result = {
             "generated_at": datetime.datetime.now().isoformat(),
-            "lineup": lineup
+            **lineup
+        }
+        
+        # Cache result
+        set_cache(cache_key, result)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/fantasy/lineup/optimize")
+def optimize_fantasy_lineup(request: LineupRequest):
+    """
+    Highest-projected lineup under the site's roster slots and salary cap,
+    with optional team limits, stacks, locks and excludes
+    """
+    try:
+        import sys
+        import os
+        sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+        from fantasy_optimizer import FantasyOptimizer
+        
+        optimizer = FantasyOptimizer()
+        lineup = optimizer.get_optimal_lineup(
+            site=request.site,
+            salaries=request.salaries_csv,
+            max_per_team=request.max_per_team,
+            min_stack=request.min_stack,
+            stacks=request.stacks,
+            locked=request.locked,
+            excluded=request.excluded,
+            scoring=request.scoring
+        )
+        if 'error' in lineup:
+            raise HTTPException(status_code=400, detail=lineup['error'])
+        
+        return {
+            "generated_at": datetime.datetime.now().isoformat(),
+            **lineup
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/fantasy/lineups")
+def generate_fantasy_lineups(request: MultiLineupRequest):
+    """
+    Many distinct lineups for multi-entry contests, with per-player exposure
+    caps and a minimum number of unique players between any two lineups
+    """
+    try:
+        import sys
+        import os
+        sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+        from fantasy_optimizer import FantasyOptimizer
+        from dfs_optimizer import MAX_LINEUPS, lineups_csv
+        
+        if not 1 <= request.n_lineups <= MAX_LINEUPS:
+            raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_LINEUPS} lineups per request")
+        
+        optimizer = FantasyOptimizer()
+        result = optimizer.get_lineups(
+            request.n_lineups,
+            site=request.site,
+            salaries=request.salaries_csv,
+            noise=request.noise,
+            max_exposure=request.max_exposure,
+            exposures=request.exposures,
+            min_unique=request.min_unique,
+            workers=FANTASY_LINEUP_WORKERS,
+            seed=request.seed,
+            max_per_team=request.max_per_team,
+            min_stack=request.min_stack,
+            stacks=request.stacks,
+            locked=request.locked,
+            excluded=request.excluded,
+            scoring=request.scoring
+        )
+        if 'error' in result:
+            raise HTTPException(status_code=400, detail=result['error'])
+        
+        if request.export:
+            return Response(
+                content=lineups_csv(result['lineups'], request.site),
+                media_type="text/csv",
+                headers={"Content-Disposition": f'attachment; filename="{request.site}_lineups.csv"'}
+            )
+        return {
+            "generated_at": datetime.datetime.now().isoformat(),
+            **result
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/fantasy/scoring")
+def get_fantasy_scoring_presets():
+    """Scoring presets (weights per stat and bonuses) accepted by the fantasy endpoints"""
+    import sys
+    import os
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+    from fantasy_scoring import list_presets
+    
+    return {"presets": list_presets()}
+
+def _fantasy_projections(scoring, position, limit):
+    from fantasy_optimizer import FantasyOptimizer
+    
+    optimizer = FantasyOptimizer()
+    return {
+        "generated_at": datetime.datetime.now().isoformat(),
+        "scoring": scoring.to_dict(),
+        "projections": optimizer.get_projections(position=position, limit=limit, scoring=scoring)
+    }
+
+@app.get("/fantasy/projections")
+def get_fantasy_projections(scoring: str = 'standard', position: Optional[str] = None, limit: int = 50):
+    """Today's projected fantasy points under a scoring preset (standard, draftkings, fanduel, yahoo)"""
+    try:
+        # Check cache (2 min cache)
+        cache_key = f"fantasy_projections_{scoring}_{position}_{limit}"
+        cached_data, hit = get_cached(cache_key, ttl_seconds=120)
+        if hit:
+            return cached_data
+        
+        import sys
+        import os
+        sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+        from fantasy_scoring import get_scoring
+        
+        try:
+            system = get_scoring(scoring)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        result = _fantasy_projections(system, position, limit)
         
         # Cache result
-        set_cache("fantasy_lineup", result)
+        set_cache(cache_key, result)
         return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/fantasy/projections")
+def score_fantasy_projections(request: ProjectionRequest):
+    """Today's projected fantasy points under custom weights and bonuses on top of a preset"""
+    try:
+        import sys
+        import os
+        sys.path.append(os.path.join(os.path.dirname(__file__), '../scraper'))
+        from fantasy_scoring import get_scoring
+        
+        try:
+            system = get_scoring(request.scoring, weights=request.weights, bonuses=request.bonuses)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return _fantasy_projections(system, request.position, request.limit)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
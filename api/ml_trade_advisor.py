@@ -2,6 +2,7 @@
 ML-Powered Trade Advisor - Uses machine learning to predict profitable trades
 """
 import os
+import sys
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import datetime
@@ -12,9 +13,16 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 import pickle
+import joblib
 import warnings
 warnings.filterwarnings('ignore')
 
+# Shared helpers live alongside the scrapers
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../scraper'))
+from supabase_pager import iter_pages
+from model_registry import ModelRegistry
+from snapshot_service import get_snapshot
+
 load_dotenv()
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
@@ -23,8 +31,16 @@ supabase: Client = create_client(url, key)
 class MLTradeAdvisor:
     """Machine Learning-powered trade recommendations"""
     
+    # Scored snapshots shared across instances, keyed by (model_version, value_date)
+    _prediction_cache = {}
+    _prediction_cache_size = 4
+    
     def __init__(self):
         self.model = None
+        self.model_version = None
+        self.model_metadata = None
+        self.training_metadata = {}
+        self.registry = ModelRegistry()
         # Use absolute path relative to this file
         current_dir = os.path.dirname(os.path.abspath(__file__))
         self.model_path = os.path.join(current_dir, 'ml_trade_model.pkl')
@@ -41,18 +57,20 @@ class MLTradeAdvisor:
         """
         print("\n📊 Generating training data from historical player values...")
         
-        # Get all historical data
-        response = supabase.table('player_value_index').select(
+        # Get all historical data, page by page (a single read is capped at max-rows)
+        pages = [pd.DataFrame(page) for page in iter_pages(
+            supabase, 'player_value_index',
             'player_id, value_date, value_score, stat_component, '
-            'sentiment_component, momentum_score, confidence_score'
-        ).order('player_id').order('value_date').execute()
+            'sentiment_component, momentum_score, confidence_score',
+            key=('player_id', 'value_date')
+        )]
         
-        if not response.data or len(response.data) < 100:
+        if not pages or sum(len(p) for p in pages) < 100:
             print("❌ Not enough historical data. Need at least 100 records.")
             return None
         
         # Convert to DataFrame
-        df = pd.DataFrame(response.data)
+        df = pd.concat(pages, ignore_index=True)
         df['value_date'] = pd.to_datetime(df['value_date'])
         
         training_samples = []
@@ -135,11 +153,24 @@ class MLTradeAdvisor:
         )
         
         self.model.fit(X_train, y_train)
+        self.model_version = f"trained-{datetime.datetime.now().isoformat()}"
         
         # Evaluate
         y_pred = self.model.predict(X_test)
         accuracy = accuracy_score(y_test, y_pred)
         
+        # Recorded alongside the model when it's published
+        self.training_metadata = {
+            'training_window': {
+                'start': str(training_df['date'].min()),
+                'end': str(training_df['date'].max())
+            },
+            'accuracy': float(accuracy),
+            'features': list(self.feature_names),
+            'n_samples': int(len(training_df)),
+            'model_params': self.model.get_params()
+        }
+        
         print(f"✅ Model trained successfully!")
         print(f"   Accuracy: {accuracy*100:.1f}%")
         print(f"   Training samples: {len(X_train)}")
@@ -162,17 +193,28 @@ class MLTradeAdvisor:
         return accuracy
     
     def save_model(self):
-        """Save trained model to disk"""
+        """Publish trained model to the model registry as the current version"""
         if self.model is None:
             print("❌ No model to save")
-            return
+            return None
         
-        with open(self.model_path, 'wb') as f:
-            pickle.dump(self.model, f)
-        print(f"✅ Model saved to {self.model_path}")
+        self.model_version = self.registry.publish(self.model, self.training_metadata)
+        self.model_metadata = self.registry.get_metadata(self.model_version)
+        return self.model_version
     
     def load_model(self):
-        """Load trained model from disk"""
+        """Load the current model from the registry, falling back to the legacy pickle"""
+        try:
+            if self.registry.current_version():
+                self.model, self.model_metadata, self.model_version = self.registry.load()
+                return True
+        except Exception as e:
+            print(f"⚠️  Could not load model from registry: {e}")
+        
+        return self._load_legacy_model()
+    
+    def _load_legacy_model(self):
+        """Load trained model from the legacy pickle file"""
         print(f"🔍 Attempting to load model from: {self.model_path}")
         print(f"   File exists: {os.path.exists(self.model_path)}")
         print(f"   Current working directory: {os.getcwd()}")
@@ -184,35 +226,32 @@ class MLTradeAdvisor:
         try:
             with open(self.model_path, 'rb') as f:
                 self.model = pickle.load(f)
+            self.model_version = self._file_version(self.model_path)
             print(f"✅ Model loaded successfully from {self.model_path}")
             return True
         except Exception as e:
             print(f"❌ Error loading model: {e}")
             return False
     
-    def predict_trade_success(self, player_data: Dict) -> Dict:
-        """
-        Predict if trading this player will be profitable
-        Returns: {probability, recommendation, confidence}
-        """
-        if self.model is None:
-            return {'error': 'Model not trained'}
-        
-        # Prepare features
-        features = np.array([[
-            player_data.get('stat_component', 0),
-            player_data.get('sentiment_component', 0),
-            player_data.get('momentum_score', 0),
-            player_data.get('confidence_score', 0),
-            player_data.get('value_score', 50),
-            player_data.get('stat_trend', 0),
-            player_data.get('sentiment_trend', 0)
-        ]])
-        
-        # Get prediction probability
-        probability = self.model.predict_proba(features)[0][1]  # Probability of profitable
-        
-        # Determine recommendation
+    def _file_version(self, path: str) -> str:
+        """Identify a model file by modification time and size"""
+        stat = os.stat(path)
+        return f"{int(stat.st_mtime)}-{stat.st_size}"
+    
+    def _build_feature_matrix(self, records: List[Dict]) -> np.ndarray:
+        """Stack player records into one (n_players x n_features) matrix"""
+        return np.array([[
+            record.get('stat_component', 0),
+            record.get('sentiment_component', 0),
+            record.get('momentum_score', 0),
+            record.get('confidence_score', 0),
+            record.get('value_score', 50),
+            record.get('stat_trend', 0),
+            record.get('sentiment_trend', 0)
+        ] for record in records], dtype=float)
+    
+    def _classify_probability(self, probability: float) -> Dict:
+        """Turn a profit probability into a recommendation"""
         if probability > 0.7:
             recommendation = 'STRONG BUY'
             action = 'buy'
@@ -236,10 +275,89 @@ class MLTradeAdvisor:
             'confidence': 'high' if abs(probability - 0.5) > 0.2 else 'medium'
         }
     
+    def predict_trade_success(self, player_data: Dict) -> Dict:
+        """
+        Predict if trading this player will be profitable
+        Returns: {probability, recommendation, confidence}
+        """
+        if self.model is None:
+            return {'error': 'Model not trained'}
+        
+        return self.predict_batch([player_data])[0]
+    
+    def predict_batch(self, records: List[Dict]) -> List[Dict]:
+        """
+        Score many players with a single predict_proba call.
+        Returns one {probability, recommendation, action, confidence} per record.
+        """
+        if self.model is None:
+            return [{'error': 'Model not trained'} for _ in records]
+        if not records:
+            return []
+        
+        features = self._build_feature_matrix(records)
+        
+        # Spread tree traversal over all cores without touching the shared
+        # (registry-cached) estimator's own n_jobs
+        with joblib.parallel_backend('threading', n_jobs=-1):
+            probabilities = self.model.predict_proba(features)[:, 1]  # Probability of profitable
+        
+        return [self._classify_probability(p) for p in probabilities]
+    
+    def score_snapshot(self, value_date: str) -> List[Dict]:
+        """
+        Score every player in one value_date snapshot, sorted by probability.
+        Memoized per (model_version, value_date) so repeated requests reuse it.
+        """
+        cache_key = (self.model_version, value_date)
+        cached = MLTradeAdvisor._prediction_cache.get(cache_key)
+        if cached is not None:
+            print(f"✅ Using cached ML scores for {value_date}")
+            return cached
+        
+        # Get all players' data for this date (the latest day is already in memory)
+        snapshot = get_snapshot()
+        if snapshot.version == value_date:
+            records = snapshot.records
+        else:
+            response = supabase.table('player_value_index').select(
+                'player_id, value_score, stat_component, sentiment_component, '
+                'momentum_score, confidence_score'
+            ).eq('value_date', value_date).execute()
+            records = response.data or []
+        
+        player_data = []
+        for record in records:
+            # Calculate trends (simplified - using momentum as proxy)
+            player_data.append({
+                **record,
+                'stat_trend': record['momentum_score'] * record['stat_component'] * 0.1,
+                'sentiment_trend': record['momentum_score'] * 0.1
+            })
+        
+        scored = [
+            {'record': record, 'prediction': prediction}
+            for record, prediction in zip(records, self.predict_batch(player_data))
+        ]
+        scored.sort(key=lambda x: x['prediction']['probability'], reverse=True)
+        
+        # Keep only the most recent few snapshots
+        while len(MLTradeAdvisor._prediction_cache) >= MLTradeAdvisor._prediction_cache_size:
+            MLTradeAdvisor._prediction_cache.pop(next(iter(MLTradeAdvisor._prediction_cache)))
+        MLTradeAdvisor._prediction_cache[cache_key] = scored
+        
+        return scored
+    
     def get_ml_recommendations(self, limit: int = 10) -> List[Dict]:
         """Get ML-powered buy recommendations"""
         print("\n🤖 Generating ML-powered recommendations...")
         
+        # Pick up a newly published model version without a restart
+        current_version = self.registry.current_version()
+        if self.model is not None and current_version and current_version != self.model_version:
+            print(f"🔄 Model version changed ({self.model_version} -> {current_version}). Reloading...")
+            self.model = None
+        
         if self.model is None:
             print("❌ Model not loaded. Loading...")
             if not self.load_model():
@@ -247,32 +365,18 @@ class MLTradeAdvisor:
                 return []
         
         # Get latest data
-        latest_date_response = supabase.table('player_value_index').select('value_date').order('value_date', desc=True).limit(1).execute()
-        if not latest_date_response.data:
+        latest = get_snapshot()
+        if not len(latest):
             return []
         
-        latest_date = latest_date_response.data[0]['value_date']
-        
-        # Get all players' latest data
-        response = supabase.table('player_value_index').select(
-            'player_id, value_score, stat_component, sentiment_component, '
-            'momentum_score, confidence_score'
-        ).eq('value_date', latest_date).execute()
+        # Score all players' latest data at once (already sorted by probability)
+        snapshot = self.score_snapshot(latest.version)
         
         recommendations = []
         
-        for record in response.data:
-            # Calculate trends (simplified - using momentum as proxy)
-            stat_trend = record['momentum_score'] * record['stat_component'] * 0.1
-            sentiment_trend = record['momentum_score'] * 0.1
-            
-            player_data = {
-                **record,
-                'stat_trend': stat_trend,
-                'sentiment_trend': sentiment_trend
-            }
-            
-            prediction = self.predict_trade_success(player_data)
+        for scored in snapshot:
+            record = scored['record']
+            prediction = scored['prediction']
             
             # Only include buy signals (lowered threshold from 0.6 to 0.55)
             if prediction['action'] == 'buy' and prediction['probability'] > 0.55:
@@ -287,17 +391,10 @@ class MLTradeAdvisor:
                     'ml_confidence': prediction['confidence']
                 })
         
-        # Sort by probability
-        recommendations.sort(key=lambda x: x['ml_probability'], reverse=True)
-        
         # Get player names
         if recommendations:
-            player_ids = [r['player_id'] for r in recommendations[:limit]]
-            players_response = supabase.table('players').select('id, full_name, team_name, position').in_('id', player_ids).execute()
-            players_map = {p['id']: p for p in players_response.data}
-            
             for rec in recommendations[:limit]:
-                player = players_map.get(rec['player_id'])
+                player = latest.player(rec['player_id'])
                 if player:
                     rec['player_name'] = player['full_name']
                     rec['team'] = player['team_name']
@@ -307,7 +404,7 @@ class MLTradeAdvisor:
         print(f"✅ Found {result_count} ML-powered buy opportunities")
         
         if result_count == 0:
-            print(f"ℹ️  Checked {len(response.data)} players, none met criteria (probability > 0.55 and action == 'buy')")
+            print(f"ℹ️  Checked {len(snapshot)} players, none met criteria (probability > 0.55 and action == 'buy')")
         
         return recommendations[:limit]
 
@@ -325,11 +422,12 @@ def train_and_save():
     # Train model
     accuracy = advisor.train_model(training_df)
     
-    # Save model
-    advisor.save_model()
+    # Publish to the registry (the API picks up the new version on its next request)
+    version = advisor.save_model()
     
     print(f"\n✅ ML Trade Advisor trained and saved!")
     print(f"   Model accuracy: {accuracy*100:.1f}%")
+    print(f"   Model version: {version} ({advisor.registry.root})")
     print(f"   Ready to use for predictions")
 
 if __name__ == "__main__":
@@ -91,8 +91,10 @@ function TradeSimulator({ apiUrl, onPlayerClick }) {
     setLoading(true);
     try {
       const playerIds = portfolio.map(p => p.id);
+      const weights = Object.fromEntries(portfolio.map(p => [p.id, p.shares || 1]));
       const response = await axios.post(`${apiUrl}/ai/portfolio-analysis`, {
-        player_ids: playerIds
+        player_ids: playerIds,
+        weights
       });
       // Check if response has error flag
       if (response.data.error === 'insufficient_data') {
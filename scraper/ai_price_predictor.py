@@ -5,25 +5,49 @@ import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import datetime
+import argparse
+import threading
 import numpy as np
-from typing import List, Dict, Tuple
-from sklearn.linear_model import LinearRegression
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 from sklearn.preprocessing import StandardScaler
 import warnings
 warnings.filterwarnings('ignore')
 
+from supabase_pager import iter_rows
+from market_scan import MarketScan
+
 load_dotenv()
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
 supabase: Client = create_client(url, key)
 
+# Per-day model inputs besides the day index and moving average
+FEATURE_COLUMNS = ['stat_component', 'sentiment_component', 'momentum_score', 'confidence_score']
+
+# Horizon written by the nightly pipeline; shorter requests are served from its prefix
+STORED_HORIZON = 14
+
+# Players per player_forecasts read (keeps the in_() filter short)
+PLAYER_CHUNK_SIZE = 200
+
 class AIPricePredictor:
     """AI-powered price prediction using machine learning"""
     
+    # Forecasts and momentum shared by every predictor in the process, keyed by
+    # (player_id, last value_date[, days_ahead]). A new value index row changes
+    # the key, so stale entries are never hit and just age out of the LRU.
+    _forecast_cache = OrderedDict()
+    _momentum_cache = OrderedDict()
+    _cache_size = 4096
+    _cache_lock = threading.Lock()
+    
     def __init__(self):
         self.today = datetime.date.today()
         self.scaler = StandardScaler()
         self.models = {}  # Cache models per player
+        self.latest_dates = {}  # player_id -> last value_date seen by this instance
+        self.market_scan = None
     
     def get_historical_data(self, player_id: str, days: int = 30) -> List[Dict]:
         """Get historical value data for a player"""
@@ -40,117 +64,288 @@ class AIPricePredictor:
             print(f"Error fetching historical data: {e}")
             return []
     
+    def get_latest_value_date(self, player_id: str) -> Optional[str]:
+        """Date of a player's newest value index row"""
+        if player_id not in self.latest_dates:
+            response = supabase.table('player_value_index').select('value_date').eq(
+                'player_id', player_id
+            ).order('value_date', desc=True).limit(1).execute()
+            self.latest_dates[player_id] = response.data[0]['value_date'] if response.data else None
+        return self.latest_dates[player_id]
+    
+    def get_histories(self, player_ids: List[str] = None, days: int = 30) -> Dict[str, List[Dict]]:
+        """Get value histories for many players (default: all) in one paged read"""
+        start_date = (self.today - datetime.timedelta(days=days)).isoformat()
+        
+        def filters(query):
+            query = query.gte('value_date', start_date)
+            return query.in_('player_id', player_ids) if player_ids is not None else query
+        
+        histories = {}
+        for record in iter_rows(
+            supabase, 'player_value_index',
+            'player_id, value_date, value_score, stat_component, sentiment_component, '
+            'momentum_score, confidence_score',
+            key=('player_id', 'value_date'),
+            filters=filters
+        ):
+            histories.setdefault(record['player_id'], []).append(record)
+        return histories
+    
     def prepare_features(self, historical_data: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
         """Prepare features for ML model"""
         if len(historical_data) < 5:
             return None, None
         
-        # Extract features
-        X = []
-        y = []
+        X, y, _ = self.prepare_feature_tensor([historical_data])
+        return X[0], y[0]
+    
+    def prepare_feature_tensor(self, histories: List[List[Dict]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Stack several histories into (players, days, features) arrays.
+        
+        Features per day: day_index, stat_component, sentiment_component,
+        momentum_score, confidence_score and the 3-day moving average of the
+        previous value_scores (the day's own value for the first 3 days).
+        Shorter histories are zero-padded at the end; the returned mask marks
+        real rows. Missing values come through as NaN.
+        """
+        max_len = max(len(h) for h in histories)
+        X = np.zeros((len(histories), max_len, len(FEATURE_COLUMNS) + 2))
+        y = np.zeros((len(histories), max_len))
+        mask = np.zeros((len(histories), max_len), dtype=bool)
         
-        for i in range(len(historical_data)):
-            record = historical_data[i]
+        for p, history in enumerate(histories):
+            n = len(history)
+            columns = np.array(
+                [[record.get(c, 0) for c in FEATURE_COLUMNS + ['value_score']] for record in history],
+                dtype=float
+            )
+            values = columns[:, -1]
             
-            # Features: day_index, stat_component, sentiment_component, momentum_score
-            features = [
-                i,  # Time index
-                record.get('stat_component', 0),
-                record.get('sentiment_component', 0),
-                record.get('momentum_score', 0),
-                record.get('confidence_score', 0)
-            ]
+            # Mean of the previous 3 values via a cumulative sum
+            moving_avg = values.copy()
+            if n > 3:
+                cumsum = np.concatenate([[0.0], np.cumsum(values)])
+                moving_avg[3:] = (cumsum[3:n] - cumsum[0:n - 3]) / 3
             
-            # Add moving averages if we have enough data
-            if i >= 3:
-                recent_values = [historical_data[j]['value_score'] for j in range(max(0, i-3), i)]
-                features.append(np.mean(recent_values))  # 3-day moving average
-            else:
-                features.append(record['value_score'])
-            
-            X.append(features)
-            y.append(record['value_score'])
+            X[p, :n, 0] = np.arange(n)
+            X[p, :n, 1:-1] = columns[:, :-1]
+            X[p, :n, -1] = moving_avg
+            y[p, :n] = values
+            mask[p, :n] = True
+        
+        return X, y, mask
+    
+    def _fit_batch(self, X: np.ndarray, y: np.ndarray, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ordinary least squares with intercept for every player at once.
         
-        return np.array(X), np.array(y)
+        Same solution as LinearRegression: center X and y on each player's
+        real rows, then take the minimum-norm least-squares coefficients via a
+        stacked pseudo-inverse. Zero padding rows don't change the solution.
+        """
+        counts = mask.sum(axis=1)
+        x_mean = (X * mask[..., None]).sum(axis=1) / counts[:, None]
+        y_mean = (y * mask).sum(axis=1) / counts
+        
+        X_centered = np.where(mask[..., None], X - x_mean[:, None, :], 0.0)
+        y_centered = np.where(mask, y - y_mean[:, None], 0.0)
+        
+        coef = np.einsum('pft,pt->pf', np.linalg.pinv(X_centered), y_centered)
+        intercept = y_mean - np.einsum('pf,pf->p', x_mean, coef)
+        return coef, intercept
+    
+    def train_models(self, histories: Dict[str, List[Dict]]) -> List[str]:
+        """Fit models for many players in one vectorized solve; returns trained ids"""
+        usable = {pid: h for pid, h in histories.items() if len(h) >= 5}
+        if not usable:
+            return []
+        
+        try:
+            player_ids = list(usable)
+            X, y, mask = self.prepare_feature_tensor([usable[pid] for pid in player_ids])
+            
+            # Players with missing values can't be fit
+            complete = ~(np.isnan(X).any(axis=(1, 2)) | np.isnan(y).any(axis=1))
+            if not complete.any():
+                return []
+            coef, intercept = self._fit_batch(X[complete], y[complete], mask[complete])
+            
+            trained_at = datetime.datetime.now()
+            trained = [pid for pid, ok in zip(player_ids, complete) if ok]
+            for i, player_id in enumerate(trained):
+                history = usable[player_id]
+                self.models[player_id] = {
+                    'coef': coef[i],
+                    'intercept': intercept[i],
+                    'last_index': len(history) - 1,
+                    'last_data': history[-1],
+                    'data_points': len(history),
+                    'trained_at': trained_at
+                }
+            return trained
+        except Exception as e:
+            print(f"Error training batch models: {e}")
+            return []
     
     def train_model(self, player_id: str) -> bool:
         """Train ML model for a specific player"""
         historical_data = self.get_historical_data(player_id, days=30)
+        return player_id in self.train_models({player_id: historical_data})
+    
+    def forecast_all(self, days_ahead: int = 7, player_ids: List[str] = None) -> Dict[str, List[Dict]]:
+        """
+        Forecast paths for many players (default: everyone with recent data).
+        Untrained players are fit from a single history read and all paths
+        are produced in one vectorized pass.
+        """
+        if player_ids is None:
+            self.train_models(self.get_histories())
+            player_ids = list(self.models)
+        else:
+            missing = [pid for pid in player_ids if pid not in self.models]
+            if missing:
+                self.train_models(self.get_histories(missing))
         
-        if len(historical_data) < 5:
-            return False
-        
-        X, y = self.prepare_features(historical_data)
-        
-        if X is None or len(X) < 5:
-            return False
+        player_ids = [pid for pid in player_ids if pid in self.models]
+        if not player_ids:
+            return {}
         
         try:
-            # Train linear regression model
-            model = LinearRegression()
-            model.fit(X, y)
+            models = [self.models[pid] for pid in player_ids]
+            coef = np.array([m['coef'] for m in models])
+            intercept = np.array([m['intercept'] for m in models])
+            last_index = np.array([m['last_index'] for m in models])
             
-            # Store model
-            self.models[player_id] = {
-                'model': model,
-                'last_index': len(X) - 1,
-                'last_data': historical_data[-1],
-                'trained_at': datetime.datetime.now()
-            }
+            # Use last known values for components (conservative estimate);
+            # the last value stands in for the moving average
+            last_features = np.array([
+                [m['last_data'].get(c, 0) for c in FEATURE_COLUMNS + ['value_score']]
+                for m in models
+            ], dtype=float)
             
-            return True
+            days = np.arange(1, days_ahead + 1)
+            base = intercept + np.einsum('pf,pf->p', coef[:, 1:], last_features)
+            paths = base[:, None] + coef[:, :1] * (last_index[:, None] + days[None, :])
+            
+            # Ensure values are within reasonable bounds
+            paths = np.clip(paths, 0, 100)
+            
+            dates = [(self.today + datetime.timedelta(days=int(day))).isoformat() for day in days]
+            forecasts = {}
+            for i, player_id in enumerate(player_ids):
+                data_points = models[i]['data_points']
+                forecasts[player_id] = [
+                    {
+                        'date': dates[d],
+                        'predicted_value': round(float(paths[i, d]), 2),
+                        'confidence': self._calculate_prediction_confidence(int(day), data_points),
+                        'days_ahead': int(day)
+                    }
+                    for d, day in enumerate(days)
+                ]
+            return forecasts
         except Exception as e:
-            print(f"Error training model for player {player_id}: {e}")
-            return False
+            print(f"Error predicting future values: {e}")
+            return {}
     
     def predict_future_value(self, player_id: str, days_ahead: int = 7) -> List[Dict]:
         """Predict future values for a player"""
-        # Train model if not already trained
-        if player_id not in self.models:
-            if not self.train_model(player_id):
-                return []
-        
-        model_data = self.models[player_id]
-        model = model_data['model']
-        last_index = model_data['last_index']
-        last_data = model_data['last_data']
-        
-        predictions = []
+        value_date = self.get_latest_value_date(player_id)
+        if value_date is None:
+            return []
         
+        return self.get_forecasts({player_id: value_date}, days_ahead).get(player_id, [])
+    
+    @classmethod
+    def _cache_get(cls, cache: OrderedDict, key):
+        with cls._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+    
+    @classmethod
+    def _cache_put(cls, cache: OrderedDict, key, value):
+        with cls._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > cls._cache_size:
+                cache.popitem(last=False)
+    
+    def _render_forecast(self, path: List[Dict], days_ahead: int) -> List[Dict]:
+        """Attach calendar dates (relative to today) to a cached path"""
+        return [
+            {
+                'date': (self.today + datetime.timedelta(days=p['days_ahead'])).isoformat(),
+                'predicted_value': p['predicted_value'],
+                'confidence': p['confidence'],
+                'days_ahead': p['days_ahead']
+            }
+            for p in path[:days_ahead]
+        ]
+    
+    def _load_stored_rows(self, latest_dates: Dict[str, str], days_ahead: int = None) -> Dict[str, Dict]:
+        """
+        Rows from player_forecasts matching each player's latest value_date
+        (the shortest stored horizon covering days_ahead), paged by player chunk
+        """
+        player_ids = list(latest_dates)
+        rows = {}
         try:
-            for day in range(1, days_ahead + 1):
-                # Prepare features for prediction
-                future_index = last_index + day
-                
-                # Use last known values for components (conservative estimate)
-                features = [
-                    future_index,
-                    last_data.get('stat_component', 0),
-                    last_data.get('sentiment_component', 0),
-                    last_data.get('momentum_score', 0),
-                    last_data.get('confidence_score', 0),
-                    last_data.get('value_score', 50)  # Last moving average
-                ]
-                
-                # Predict
-                predicted_value = model.predict([features])[0]
-                
-                # Ensure value is within reasonable bounds
-                predicted_value = max(0, min(100, predicted_value))
+            for i in range(0, len(player_ids), PLAYER_CHUNK_SIZE):
+                chunk = player_ids[i:i + PLAYER_CHUNK_SIZE]
                 
-                prediction_date = self.today + datetime.timedelta(days=day)
+                def filters(query, chunk=chunk):
+                    query = query.in_('player_id', chunk).in_(
+                        'value_date', sorted({latest_dates[pid] for pid in chunk}))
+                    return query.gte('days_ahead', days_ahead) if days_ahead is not None else query
                 
-                predictions.append({
-                    'date': prediction_date.isoformat(),
-                    'predicted_value': round(predicted_value, 2),
-                    'confidence': self._calculate_prediction_confidence(day, len(self.get_historical_data(player_id))),
-                    'days_ahead': day
-                })
-            
-            return predictions
+                # Key order puts each player's smallest days_ahead first
+                for row in iter_rows(
+                    supabase, 'player_forecasts',
+                    'player_id, value_date, days_ahead, predictions, momentum',
+                    key=('player_id', 'value_date', 'days_ahead'),
+                    filters=filters
+                ):
+                    if latest_dates.get(row['player_id']) == row['value_date']:
+                        rows.setdefault(row['player_id'], row)
         except Exception as e:
-            print(f"Error predicting future values: {e}")
-            return []
+            print(f"⚠️  Stored forecasts unavailable: {e}")
+            return {}
+        return rows
+    
+    def get_forecasts(self, latest_dates: Dict[str, str], days_ahead: int = 7) -> Dict[str, List[Dict]]:
+        """
+        Forecasts for {player_id: latest value_date}. Served from the in-process
+        LRU, then the player_forecasts table written by the nightly pipeline,
+        and only computed (in one batch) for players missing from both.
+        """
+        forecasts = {}
+        
+        missing = {}
+        for player_id, value_date in latest_dates.items():
+            path = self._cache_get(self._forecast_cache, (player_id, value_date, days_ahead))
+            if path is not None:
+                forecasts[player_id] = self._render_forecast(path, days_ahead)
+            else:
+                missing[player_id] = value_date
+        
+        if missing:
+            for player_id, row in self._load_stored_rows(missing, days_ahead).items():
+                path = row['predictions'][:days_ahead]
+                self._cache_put(self._forecast_cache, (player_id, row['value_date'], days_ahead), path)
+                forecasts[player_id] = self._render_forecast(path, days_ahead)
+                del missing[player_id]
+        
+        if missing:
+            computed = self.forecast_all(days_ahead, list(missing))
+            for player_id, path in computed.items():
+                self._cache_put(self._forecast_cache, (player_id, missing[player_id], days_ahead), path)
+                forecasts[player_id] = path
+        
+        return forecasts
     
     def _calculate_prediction_confidence(self, days_ahead: int, data_points: int) -> float:
         """Calculate confidence in prediction based on time horizon and data availability"""
@@ -160,10 +355,26 @@ class AIPricePredictor:
         
         return round(time_factor * data_factor, 3)
     
-    def get_price_momentum(self, player_id: str) -> Dict:
+    def get_price_momentum(self, player_id: str, value_date: str = None) -> Dict:
         """Analyze price momentum and trend"""
-        historical_data = self.get_historical_data(player_id, days=14)
+        value_date = value_date or self.get_latest_value_date(player_id)
+        if value_date is not None:
+            cached = self._cache_get(self._momentum_cache, (player_id, value_date))
+            if cached is None:
+                row = self._load_stored_rows({player_id: value_date}).get(player_id)
+                cached = row.get('momentum') if row else None
+            if cached is not None:
+                self._cache_put(self._momentum_cache, (player_id, value_date), cached)
+                return cached
         
+        historical_data = self.get_historical_data(player_id, days=14)
+        momentum = self._momentum_from_history(historical_data)
+        if value_date is not None:
+            self._cache_put(self._momentum_cache, (player_id, value_date), momentum)
+        return momentum
+    
+    def _momentum_from_history(self, historical_data: List[Dict]) -> Dict:
+        """Trend, momentum, volatility and direction over a value history"""
         if len(historical_data) < 7:
             return {
                 'trend': 'insufficient_data',
@@ -206,64 +417,49 @@ class AIPricePredictor:
             'week_ago_value': values[0] if len(values) >= 7 else values[0]
         }
     
+    def get_market_scan(self) -> MarketScan:
+        """One scan of the recent value window, shared by every market view"""
+        if self.market_scan is None:
+            self.market_scan = MarketScan(self.today).load()
+        return self.market_scan
+    
+    def _with_forecasts(self, candidates: List[Dict]) -> List[Dict]:
+        """Attach 7-day forecasts to scan rows, dropping players without one"""
+        forecasts = self.get_forecasts({c['player_id']: c['latest_date'] for c in candidates}, 7)
+        
+        results = []
+        for c in candidates:
+            predictions = forecasts.get(c['player_id'])
+            if predictions:
+                results.append((c, predictions))
+        return results
+    
     def find_trending_players(self, limit: int = 10) -> List[Dict]:
         """Find players with strong upward trends"""
         print("\n📈 Finding Trending Players...")
         
         try:
-            # Get all players with recent data
-            week_ago = (self.today - datetime.timedelta(days=7)).isoformat()
-            
-            response = supabase.table('player_value_index').select(
-                'player_id, value_score, value_date'
-            ).gte('value_date', week_ago).execute()
-            
-            # Group by player
-            player_data = {}
-            for record in response.data:
-                player_id = record['player_id']
-                if player_id not in player_data:
-                    player_data[player_id] = []
-                player_data[player_id].append(record)
+            # At least 3% increase, sorted by trend
+            candidates = self.get_market_scan().trending(min_pct=3)
             
             trending = []
+            for c, predictions in self._with_forecasts(candidates):
+                trending.append({
+                    'player_id': c['player_id'],
+                    'player_name': c['player_name'],
+                    'team': c['team'],
+                    'position': c['position'],
+                    'current_value': c['current_value'],
+                    'week_ago_value': c['week_ago_value'],
+                    'trend_pct': c['trend_pct'],
+                    'predicted_7day': predictions[-1]['predicted_value'],
+                    'prediction_confidence': predictions[-1]['confidence'],
+                    'momentum': c['momentum']
+                })
+                if len(trending) == limit:
+                    break
             
-            for player_id, data in player_data.items():
-                if len(data) < 5:
-                    continue
-                
-                # Sort by date
-                data.sort(key=lambda x: x['value_date'])
-                
-                # Calculate trend
-                values = [d['value_score'] for d in data]
-                trend = ((values[-1] - values[0]) / values[0] * 100) if values[0] > 0 else 0
-                
-                if trend > 3:  # At least 3% increase
-                    # Get player info
-                    player = supabase.table('players').select('full_name, team_name, position').eq('id', player_id).single().execute()
-                    
-                    # Get predictions
-                    predictions = self.predict_future_value(player_id, days_ahead=7)
-                    
-                    if predictions:
-                        trending.append({
-                            'player_id': player_id,
-                            'player_name': player.data['full_name'],
-                            'team': player.data['team_name'],
-                            'position': player.data['position'],
-                            'current_value': values[-1],
-                            'week_ago_value': values[0],
-                            'trend_pct': round(trend, 2),
-                            'predicted_7day': predictions[-1]['predicted_value'],
-                            'prediction_confidence': predictions[-1]['confidence'],
-                            'momentum': self.get_price_momentum(player_id)
-                        })
-            
-            # Sort by trend
-            trending.sort(key=lambda x: x['trend_pct'], reverse=True)
-            
-            return trending[:limit]
+            return trending
             
         except Exception as e:
             print(f"Error finding trending players: {e}")
@@ -274,58 +470,90 @@ class AIPricePredictor:
         print("\n📉 Finding Value Drops...")
         
         try:
-            week_ago = (self.today - datetime.timedelta(days=7)).isoformat()
-            
-            response = supabase.table('player_value_index').select(
-                'player_id, value_score, value_date'
-            ).gte('value_date', week_ago).execute()
-            
-            player_data = {}
-            for record in response.data:
-                player_id = record['player_id']
-                if player_id not in player_data:
-                    player_data[player_id] = []
-                player_data[player_id].append(record)
+            # At least 3% decrease, biggest drop first
+            candidates = self.get_market_scan().drops(min_pct=3)
             
             drops = []
-            
-            for player_id, data in player_data.items():
-                if len(data) < 5:
-                    continue
+            for c, predictions in self._with_forecasts(candidates):
+                current = c['current_value']
                 
-                data.sort(key=lambda x: x['value_date'])
-                values = [d['value_score'] for d in data]
-                drop = ((values[-1] - values[0]) / values[0] * 100) if values[0] > 0 else 0
+                # Check if predicted to recover
+                predicted_change = ((predictions[-1]['predicted_value'] - current) / current * 100) if current > 0 else 0
                 
-                if drop < -3:  # At least 3% decrease
-                    player = supabase.table('players').select('full_name, team_name, position').eq('id', player_id).single().execute()
-                    predictions = self.predict_future_value(player_id, days_ahead=7)
-                    
-                    if predictions:
-                        # Check if predicted to recover
-                        predicted_change = ((predictions[-1]['predicted_value'] - values[-1]) / values[-1] * 100) if values[-1] > 0 else 0
-                        
-                        drops.append({
-                            'player_id': player_id,
-                            'player_name': player.data['full_name'],
-                            'team': player.data['team_name'],
-                            'position': player.data['position'],
-                            'current_value': values[-1],
-                            'week_ago_value': values[0],
-                            'drop_pct': round(drop, 2),
-                            'predicted_7day': predictions[-1]['predicted_value'],
-                            'predicted_recovery': round(predicted_change, 2),
-                            'prediction_confidence': predictions[-1]['confidence'],
-                            'buy_signal': predicted_change > 2  # Predicted to recover
-                        })
-            
-            drops.sort(key=lambda x: x['drop_pct'])
+                drops.append({
+                    'player_id': c['player_id'],
+                    'player_name': c['player_name'],
+                    'team': c['team'],
+                    'position': c['position'],
+                    'current_value': current,
+                    'week_ago_value': c['week_ago_value'],
+                    'drop_pct': c['trend_pct'],
+                    'predicted_7day': predictions[-1]['predicted_value'],
+                    'predicted_recovery': round(predicted_change, 2),
+                    'prediction_confidence': predictions[-1]['confidence'],
+                    'buy_signal': predicted_change > 2  # Predicted to recover
+                })
+                if len(drops) == limit:
+                    break
             
-            return drops[:limit]
+            return drops
             
         except Exception as e:
             print(f"Error finding value drops: {e}")
             return []
+    
+    def find_market_movers(self, limit: int = 5) -> Dict[str, List[Dict]]:
+        """Biggest risers and fallers over the last week"""
+        try:
+            return self.get_market_scan().movers(limit)
+        except Exception as e:
+            print(f"Error finding market movers: {e}")
+            return {'risers': [], 'fallers': []}
+
+def store_forecasts(horizon: int = STORED_HORIZON, keep_days: int = 30) -> int:
+    """
+    Nightly pipeline stage: forecast every player with recent data and upsert
+    the paths plus momentum into player_forecasts, keyed by the value_date the
+    forecast was built from. Run after the value index has been updated.
+    """
+    print("\n🔮 Storing player forecasts...")
+    predictor = AIPricePredictor()
+    
+    histories = predictor.get_histories()
+    predictor.train_models(histories)
+    forecasts = predictor.forecast_all(horizon, list(predictor.models))
+    
+    momentum_start = (predictor.today - datetime.timedelta(days=14)).isoformat()
+    created_at = datetime.datetime.now().isoformat()
+    rows = []
+    for player_id, path in forecasts.items():
+        history = histories[player_id]
+        rows.append({
+            'player_id': player_id,
+            'value_date': history[-1]['value_date'],
+            'days_ahead': horizon,
+            'predictions': [{k: p[k] for k in ('predicted_value', 'confidence', 'days_ahead')} for p in path],
+            'momentum': predictor._momentum_from_history(
+                [r for r in history if r['value_date'] >= momentum_start]
+            ),
+            'created_at': created_at
+        })
+    
+    try:
+        for i in range(0, len(rows), 500):
+            supabase.table('player_forecasts').upsert(
+                rows[i:i + 500], on_conflict='player_id,value_date,days_ahead'
+            ).execute()
+        
+        cutoff = (predictor.today - datetime.timedelta(days=keep_days)).isoformat()
+        supabase.table('player_forecasts').delete().lt('value_date', cutoff).execute()
+        
+        print(f"✅ Stored {len(rows)} player forecasts ({horizon}-day horizon)")
+    except Exception as e:
+        print(f"❌ Error storing forecasts: {e}")
+        return 0
+    
+    return len(rows)
 
 def generate_predictions_report():
     """Generate daily predictions report"""
@@ -362,4 +590,13 @@ def generate_predictions_report():
     print("="*60)
 
 if __name__ == "__main__":
-    generate_predictions_report()
+    parser = argparse.ArgumentParser(description="AI price predictions")
+    parser.add_argument('--store', action='store_true',
+                        help="Write forecasts for all players to player_forecasts (nightly pipeline)")
+    parser.add_argument('--horizon', type=int, default=STORED_HORIZON, help="Days ahead to store")
+    args = parser.parse_args()
+    
+    if args.store:
+        store_forecasts(args.horizon)
+    else:
+        generate_predictions_report()
@@ -8,6 +8,10 @@ import datetime
 import numpy as np
 from typing import List, Dict, Tuple
 
+from snapshot_service import get_snapshot
+from signal_screener import run_screens, available_screens
+from portfolio_analytics import PortfolioAnalytics
+
 load_dotenv()
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
@@ -71,99 +75,44 @@ class AITradeAdvisor:
         
         return trend, classification
     
+    def run_screens(self, screens: List[str] = None, limit: int = 10) -> Dict[str, List[Dict]]:
+        """
+        Evaluate several signal screens (buy, sell, breakout) against the latest
+        snapshot in one pass and return the top `limit` players for each.
+        """
+        screens = screens or available_screens()
+        
+        snapshot = get_snapshot()
+        if not len(snapshot):
+            print("No data found in player_value_index table")
+            return {name: [] for name in screens}
+        
+        print(f"Using data from: {snapshot.version}")
+        
+        builders = {
+            'buy': self._buy_opportunity,
+            'sell': self._sell_opportunity,
+            'breakout': self._breakout_candidate
+        }
+        
+        results = {}
+        for name, (rows, scores) in run_screens(snapshot.columns, screens, limit).items():
+            results[name] = []
+            for i, score in zip(rows, scores):
+                record = snapshot.records[i]
+                player = snapshot.player(record['player_id'])
+                if not player:
+                    continue
+                results[name].append(builders[name](record, player, float(score)))
+        
+        return results
+    
     def find_buy_opportunities(self, limit: int = 10) -> List[Dict]:
         """Find undervalued players (buy low opportunities)"""
         print("\n🔍 Finding Buy Opportunities...")
         
         try:
-            # Get the most recent date available
-            latest_date_response = supabase.table('player_value_index').select('value_date').order('value_date', desc=True).limit(1).execute()
-            if not latest_date_response.data:
-                print("No data found in player_value_index table")
-                return []
-            
-            latest_date = latest_date_response.data[0]['value_date']
-            print(f"Using data from: {latest_date}")
-            
-            # Get latest value data with player info
-            response = supabase.table('player_value_index').select(
-                'player_id, value_score, stat_component, sentiment_component, '
-                'momentum_score, confidence_score'
-            ).eq('value_date', latest_date).execute()
-            
-            # Pre-filter candidates
-            candidates = []
-            for record in response.data:
-                stat = record['stat_component']
-                sentiment = record['sentiment_component']
-                confidence = record['confidence_score']
-                
-                # Buy signal: High stats, low/negative sentiment, decent confidence
-                if stat > 30 and sentiment < 0 and confidence > 0.1:
-                    opportunity_score = (stat * 0.6) + (abs(sentiment) * 30 * 0.3) + (confidence * 10)
-                    candidates.append({
-                        'player_id': record['player_id'],
-                        'value_score': record['value_score'],
-                        'stat_component': stat,
-                        'sentiment_component': sentiment,
-                        'confidence': confidence,
-                        'opportunity_score': opportunity_score,
-                        'momentum_score': record['momentum_score']
-                    })
-            
-            # Sort and limit before fetching player details
-            candidates.sort(key=lambda x: x['opportunity_score'], reverse=True)
-            top_candidates = candidates[:limit]
-            
-            # Batch fetch player details
-            player_ids = [c['player_id'] for c in top_candidates]
-            players_response = supabase.table('players').select('id, full_name, team_name, position').in_('id', player_ids).execute()
-            players_map = {p['id']: p for p in players_response.data}
-            
-            # Build final opportunities list
-            opportunities = []
-            for candidate in top_candidates:
-                player = players_map.get(candidate['player_id'])
-                if not player:
-                    continue
-                
-                # Use momentum as a proxy for trend (faster than calculating)
-                momentum = candidate['momentum_score']
-                if momentum > 0.3:
-                    trend_class = "rising_fast"
-                    trend = momentum * 100
-                elif momentum > 0:
-                    trend_class = "rising"
-                    trend = momentum * 100
-                elif momentum < -0.3:
-                    trend_class = "falling_fast"
-                    trend = momentum * 100
-                elif momentum < 0:
-                    trend_class = "falling"
-                    trend = momentum * 100
-                else:
-                    trend_class = "stable"
-                    trend = 0
-                
-                opportunities.append({
-                    'player_id': candidate['player_id'],
-                    'player_name': player['full_name'],
-                    'team': player['team_name'],
-                    'position': player['position'],
-                    'value_score': candidate['value_score'],
-                    'stat_component': candidate['stat_component'],
-                    'sentiment_component': candidate['sentiment_component'],
-                    'confidence': candidate['confidence'],
-                    'opportunity_score': candidate['opportunity_score'],
-                    'trend': trend,
-                    'trend_class': trend_class,
-                    'reason': f"Strong stats ({candidate['stat_component']:.1f}) but negative sentiment ({candidate['sentiment_component']:.2f}). Market undervaluing performance.",
-                    'action': 'BUY',
-                    'urgency': 'high' if candidate['confidence'] > 0.5 else 'medium'
-                })
-            
-            return opportunities
-            
+            return self.run_screens(['buy'], limit)['buy']
         except Exception as e:
             print(f"Error finding buy opportunities: {e}")
             return []
@@ -173,78 +122,7 @@ class AITradeAdvisor:
         print("\n🔍 Finding Sell Opportunities...")
         
         try:
-            # Get the most recent date available
-            latest_date_response = supabase.table('player_value_index').select('value_date').order('value_date', desc=True).limit(1).execute()
-            if not latest_date_response.data:
-                return []
-            
-            latest_date = latest_date_response.data[0]['value_date']
-            
-            response = supabase.table('player_value_index').select(
-                'player_id, value_score, stat_component, sentiment_component, '
-                'momentum_score, confidence_score'
-            ).eq('value_date', latest_date).execute()
-            
-            # Pre-filter candidates
-            candidates = []
-            for record in response.data:
-                stat = record['stat_component']
-                sentiment = record['sentiment_component']
-                confidence = record['confidence_score']
-                
-                # Sell signal: Low stats, high sentiment, decent confidence
-                if stat < 30 and sentiment > 0.2 and confidence > 0.1:
-                    risk_score = (sentiment * 50) - (stat * 0.5) + (confidence * 10)
-                    candidates.append({
-                        'player_id': record['player_id'],
-                        'value_score': record['value_score'],
-                        'stat_component': stat,
-                        'sentiment_component': sentiment,
-                        'confidence': confidence,
-                        'risk_score': risk_score,
-                        'momentum_score': record['momentum_score']
-                    })
-            
-            # Sort and limit before fetching player details
-            candidates.sort(key=lambda x: x['risk_score'], reverse=True)
-            top_candidates = candidates[:limit]
-            
-            # Batch fetch player details
-            player_ids = [c['player_id'] for c in top_candidates]
-            players_response = supabase.table('players').select('id, full_name, team_name, position').in_('id', player_ids).execute()
-            players_map = {p['id']: p for p in players_response.data}
-            
-            # Build final opportunities list
-            opportunities = []
-            for candidate in top_candidates:
-                player = players_map.get(candidate['player_id'])
-                if not player:
-                    continue
-                
-                # Use momentum as trend proxy
-                momentum = candidate['momentum_score']
-                trend = momentum * 100
-                trend_class = "falling_fast" if momentum < -0.3 else "falling" if momentum < 0 else "stable"
-                
-                opportunities.append({
-                    'player_id': candidate['player_id'],
-                    'player_name': player['full_name'],
-                    'team': player['team_name'],
-                    'position': player['position'],
-                    'value_score': candidate['value_score'],
-                    'stat_component': candidate['stat_component'],
-                    'sentiment_component': candidate['sentiment_component'],
-                    'confidence': candidate['confidence'],
-                    'risk_score': candidate['risk_score'],
-                    'trend': trend,
-                    'trend_class': trend_class,
-                    'reason': f"High sentiment ({candidate['sentiment_component']:.2f}) but weak stats ({candidate['stat_component']:.1f}). Market overvaluing hype.",
-                    'action': 'SELL',
-                    'urgency': 'high' if trend < -2 else 'medium'
-                })
-            
-            return opportunities
-            
+            return self.run_screens(['sell'], limit)['sell']
         except Exception as e:
             print(f"Error finding sell opportunities: {e}")
             return []
@@ -254,111 +132,120 @@ class AITradeAdvisor:
         print("\n🚀 Finding Breakout Candidates...")
         
         try:
-            # Get the most recent date available
-            latest_date_response = supabase.table('player_value_index').select('value_date').order('value_date', desc=True).limit(1).execute()
-            if not latest_date_response.data:
-                return []
-            
-            latest_date = latest_date_response.data[0]['value_date']
-            
-            response = supabase.table('player_value_index').select(
-                'player_id, value_score, stat_component, sentiment_component, '
-                'momentum_score, confidence_score'
-            ).eq('value_date', latest_date).execute()
-            
-            # Pre-filter candidates
-            candidates_list = []
-            for record in response.data:
-                momentum = record['momentum_score']
-                sentiment = record['sentiment_component']
-                stat = record['stat_component']
-                confidence = record['confidence_score']
-                
-                # Breakout signal: Positive momentum, rising sentiment, improving stats
-                if momentum > 0.15 and sentiment >= 0 and stat > 15:
-                    breakout_score = (momentum * 50) + (sentiment * 30) + (stat * 0.3) + (confidence * 10)
-                    candidates_list.append({
-                        'player_id': record['player_id'],
-                        'value_score': record['value_score'],
-                        'momentum_score': momentum,
-                        'sentiment_component': sentiment,
-                        'stat_component': stat,
-                        'confidence': confidence,
-                        'breakout_score': breakout_score
-                    })
-            
-            # Sort and limit before fetching player details
-            candidates_list.sort(key=lambda x: x['breakout_score'], reverse=True)
-            top_candidates = candidates_list[:limit]
-            
-            # Batch fetch player details
-            player_ids = [c['player_id'] for c in top_candidates]
-            players_response = supabase.table('players').select('id, full_name, team_name, position').in_('id', player_ids).execute()
-            players_map = {p['id']: p for p in players_response.data}
-            
-            # Build final candidates list
-            candidates = []
-            for candidate in top_candidates:
-                player = players_map.get(candidate['player_id'])
-                if not player:
-                    continue
-                
-                # Use momentum as trend proxy
-                momentum = candidate['momentum_score']
-                trend = momentum * 100
-                trend_class = "rising_fast" if momentum > 0.3 else "rising"
-                
-                candidates.append({
-                    'player_id': candidate['player_id'],
-                    'player_name': player['full_name'],
-                    'team': player['team_name'],
-                    'position': player['position'],
-                    'value_score': candidate['value_score'],
-                    'momentum_score': candidate['momentum_score'],
-                    'sentiment_component': candidate['sentiment_component'],
-                    'stat_component': candidate['stat_component'],
-                    'confidence': candidate['confidence'],
-                    'breakout_score': candidate['breakout_score'],
-                    'trend': trend,
-                    'trend_class': trend_class,
-                    'reason': f"Strong momentum ({candidate['momentum_score']:.2f}) with positive sentiment. Stats trending up.",
-                    'action': 'WATCH',
-                    'potential': 'high' if candidate['breakout_score'] > 50 else 'medium'
-                })
-            
-            return candidates
-            
+            return self.run_screens(['breakout'], limit)['breakout']
         except Exception as e:
             print(f"Error finding breakout candidates: {e}")
             return []
     
-    def analyze_portfolio_risk(self, player_ids: List[str]) -> Dict:
-        """Analyze risk of a portfolio of players"""
+    def _buy_opportunity(self, record: Dict, player: Dict, opportunity_score: float) -> Dict:
+        """Buy signal: strong stats the market is undervaluing"""
+        stat = record['stat_component']
+        sentiment = record['sentiment_component']
+        confidence = record['confidence_score']
+        
+        # Use momentum as a proxy for trend (faster than calculating)
+        momentum = record['momentum_score']
+        if momentum > 0.3:
+            trend_class = "rising_fast"
+            trend = momentum * 100
+        elif momentum > 0:
+            trend_class = "rising"
+            trend = momentum * 100
+        elif momentum < -0.3:
+            trend_class = "falling_fast"
+            trend = momentum * 100
+        elif momentum < 0:
+            trend_class = "falling"
+            trend = momentum * 100
+        else:
+            trend_class = "stable"
+            trend = 0
+        
+        return {
+            'player_id': record['player_id'],
+            'player_name': player['full_name'],
+            'team': player['team_name'],
+            'position': player['position'],
+            'value_score': record['value_score'],
+            'stat_component': stat,
+            'sentiment_component': sentiment,
+            'confidence': confidence,
+            'opportunity_score': opportunity_score,
+            'trend': trend,
+            'trend_class': trend_class,
+            'reason': f"Strong stats ({stat:.1f}) but negative sentiment ({sentiment:.2f}). Market undervaluing performance.",
+            'action': 'BUY',
+            'urgency': 'high' if confidence > 0.5 else 'medium'
+        }
+    
+    def _sell_opportunity(self, record: Dict, player: Dict, risk_score: float) -> Dict:
+        """Sell signal: hype the stats don't support"""
+        stat = record['stat_component']
+        sentiment = record['sentiment_component']
+        
+        # Use momentum as trend proxy
+        momentum = record['momentum_score']
+        trend = momentum * 100
+        trend_class = "falling_fast" if momentum < -0.3 else "falling" if momentum < 0 else "stable"
+        
+        return {
+            'player_id': record['player_id'],
+            'player_name': player['full_name'],
+            'team': player['team_name'],
+            'position': player['position'],
+            'value_score': record['value_score'],
+            'stat_component': stat,
+            'sentiment_component': sentiment,
+            'confidence': record['confidence_score'],
+            'risk_score': risk_score,
+            'trend': trend,
+            'trend_class': trend_class,
+            'reason': f"High sentiment ({sentiment:.2f}) but weak stats ({stat:.1f}). Market overvaluing hype.",
+            'action': 'SELL',
+            'urgency': 'high' if trend < -2 else 'medium'
+        }
+    
+    def _breakout_candidate(self, record: Dict, player: Dict, breakout_score: float) -> Dict:
+        """Breakout signal: positive momentum backed by sentiment and stats"""
+        # Use momentum as trend proxy
+        momentum = record['momentum_score']
+        trend = momentum * 100
+        trend_class = "rising_fast" if momentum > 0.3 else "rising"
+        
+        return {
+            'player_id': record['player_id'],
+            'player_name': player['full_name'],
+            'team': player['team_name'],
+            'position': player['position'],
+            'value_score': record['value_score'],
+            'momentum_score': momentum,
+            'sentiment_component': record['sentiment_component'],
+            'stat_component': record['stat_component'],
+            'confidence': record['confidence_score'],
+            'breakout_score': breakout_score,
+            'trend': trend,
+            'trend_class': trend_class,
+            'reason': f"Strong momentum ({momentum:.2f}) with positive sentiment. Stats trending up.",
+            'action': 'WATCH',
+            'potential': 'high' if breakout_score > 50 else 'medium'
+        }
+    
+    def analyze_portfolio_risk(self, player_ids: List[str], weights: Dict[str, float] = None) -> Dict:
+        """Analyze risk of a portfolio of players (weights: optional player_id -> shares)"""
         print(f"\n📊 Analyzing Portfolio Risk for {len(player_ids)} players...")
         
         try:
-            # Get the most recent date available
-            latest_date_response = supabase.table('player_value_index').select('value_date').order('value_date', desc=True).limit(1).execute()
-            if not latest_date_response.data:
+            snapshot = get_snapshot()
+            if not len(snapshot):
                 raise Exception("No data found in player_value_index table")
             
-            latest_date = latest_date_response.data[0]['value_date']
-            print(f"Using data from: {latest_date}")
-            
-            # Batch fetch player value data
-            value_response = supabase.table('player_value_index').select(
-                'player_id, value_score, stat_component, sentiment_component, '
-                'momentum_score, confidence_score'
-            ).in_('player_id', player_ids).eq('value_date', latest_date).execute()
-            
-            # Batch fetch player names
-            players_response = supabase.table('players').select('id, full_name').in_('id', player_ids).execute()
-            players_map = {p['id']: p['full_name'] for p in players_response.data}
+            print(f"Using data from: {snapshot.version}")
             
             portfolio_data = []
-            for record in value_response.data:
+            for i in snapshot.lookup(player_ids):
+                record = snapshot.records[i]
                 player_id = record['player_id']
-                player_name = players_map.get(player_id, 'Unknown')
+                player_name = snapshot.players.get(player_id, {}).get('full_name', 'Unknown')
                 
                 # Use momentum as trend proxy (much faster than historical calculation)
                 momentum = record['momentum_score']
@@ -463,6 +350,7 @@ class AITradeAdvisor:
                 'medium_risk_players': medium_risk,
                 'low_risk_players': low_risk,
                 'players': portfolio_data,
+                'risk_metrics': PortfolioAnalytics().analyze([p['player_id'] for p in portfolio_data], weights),
                 'recommendations': self._generate_portfolio_recommendations(portfolio_data, risk_score)
             }
             
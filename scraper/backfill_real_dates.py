@@ -173,9 +173,10 @@ print(f"Total player stats inserted: {total_stats}")
 
 if total_stats > 0:
     print("\n✅ SUCCESS! Now run:")
-    print("1. python enhanced_value_index.py")
-    print("2. python verify_database_updates.py (to confirm)")
-    print("3. Clear API cache and refresh browser")
+    print("1. python rolling_stats.py rebuild")
+    print("2. python enhanced_value_index.py")
+    print("3. python verify_database_updates.py (to confirm)")
+    print("4. Clear API cache and refresh browser")
 else:
     print("\n⚠️  No stats inserted - check errors above")
 
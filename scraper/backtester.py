@@ -0,0 +1,315 @@
+"""
+Backtester - Replay player_value_index history against the trade signal rules
+
+History is laid out as (date x player) matrices on a continuous calendar, so
+every rule in signal_screener (and the ML model's probability cutoffs) is a
+single vectorized mask over the whole history and forward 1/3/7-day value
+returns are plain row shifts. For each rule and threshold combination the
+report gives the number of signals, hit rate, average return and turnover.
+
+Usage:
+    python backtester.py                                  # stored history
+    python backtester.py --synthetic --seasons 3 --players 450
+    python backtester.py --ml --json backtest.json        # include ML cutoffs
+"""
+import os
+import json
+import time
+import argparse
+import itertools
+import numpy as np
+from dotenv import load_dotenv
+from typing import Dict, List, Sequence
+
+from signal_screener import SCREENS
+
+load_dotenv()
+
+SIGNAL_COLUMNS = ['value_score', 'stat_component', 'sentiment_component', 'momentum_score', 'confidence_score']
+HORIZONS = (1, 3, 7)
+
+# Thresholds swept per rule; each grid includes the live defaults
+THRESHOLD_GRID = {
+    'buy': {'min_stat': [20, 30, 40], 'max_sentiment': [-0.2, 0, 0.2], 'min_confidence': [0.1, 0.3]},
+    'sell': {'max_stat': [20, 30, 40], 'min_sentiment': [0, 0.2, 0.4], 'min_confidence': [0.1, 0.3]},
+    'breakout': {'min_momentum': [0.05, 0.15, 0.3], 'min_sentiment': [-0.2, 0, 0.2], 'min_stat': [10, 15, 25]},
+}
+
+# MLTradeAdvisor calls > 0.55 a BUY and recommends picks > 0.6
+ML_CUTOFFS = [0.5, 0.55, 0.6, 0.65, 0.7]
+
+class History:
+    """Signal columns as (date x player) matrices, NaN where a player has no row"""
+
+    def __init__(self, dates: np.ndarray, player_ids: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.dates = dates
+        self.player_ids = player_ids
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, ids: np.ndarray, dates: np.ndarray, values: Dict[str, np.ndarray]) -> 'History':
+        """Scatter (player, date) rows onto a calendar covering every day in range"""
+        days = dates.astype('datetime64[D]')
+        calendar = np.arange(days.min(), days.max() + 1)
+        player_ids, col = np.unique(ids, return_inverse=True)
+        row = (days - calendar[0]).astype(int)
+
+        columns = {}
+        for name, column in values.items():
+            matrix = np.full((len(calendar), len(player_ids)), np.nan)
+            matrix[row, col] = column
+            columns[name] = matrix
+        return cls(calendar, player_ids, columns)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    @property
+    def shape(self):
+        return self.columns['value_score'].shape
+
+    def forward_returns(self, horizons: Sequence[int] = HORIZONS) -> np.ndarray:
+        """(horizon x date x player) % change in value_score h days ahead"""
+        value = self['value_score']
+        returns = np.full((len(horizons),) + value.shape, np.nan)
+        for k, h in enumerate(horizons):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns[k, :-h] = np.where(value[:-h] > 0, (value[h:] - value[:-h]) / value[:-h] * 100, np.nan)
+        return returns
+
+def load_history(start: str = None, end: str = None) -> History:
+    """Read player_value_index (optionally between start and end) in one paged pass"""
+    from supabase import create_client
+    from supabase_pager import iter_batches
+
+    supabase = create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
+
+    def filters(query):
+        if start:
+            query = query.gte('value_date', start)
+        if end:
+            query = query.lte('value_date', end)
+        return query
+
+    batches = list(iter_batches(
+        supabase, 'player_value_index', 'player_id, value_date, ' + ', '.join(SIGNAL_COLUMNS),
+        key=('player_id', 'value_date'), filters=filters
+    ))
+    if not batches:
+        raise ValueError("No player_value_index rows to backtest")
+
+    def column(name):
+        return np.concatenate([
+            np.array([np.nan if v is None else v for v in batch[name]], dtype=float) for batch in batches
+        ])
+
+    ids = np.concatenate([batch['player_id'] for batch in batches])
+    dates = np.concatenate([batch['value_date'] for batch in batches]).astype(str)
+    history = History.from_rows(ids, dates, {name: column(name) for name in SIGNAL_COLUMNS})
+    print(f"✅ Loaded {len(ids)} rows: {history.shape[1]} players over {history.shape[0]} days")
+    return history
+
+def synthetic_history(seasons: int = 3, players: int = 450, season_days: int = 170,
+                      offseason_days: int = 30, missing_rate: float = 0.1, seed: int = 7) -> History:
+    """
+    Multi-season random history with the same columns as player_value_index.
+
+    Stats follow a mean-reverting form curve, sentiment reacts to it with
+    noise, and value_score drifts toward a blend of the two, so the rules see
+    realistic lead/lag relationships. Offseasons and random days are missing.
+    """
+    rng = np.random.default_rng(seed)
+    n_days = seasons * (season_days + offseason_days)
+
+    base_stat = rng.uniform(8, 55, players)
+    form = np.zeros(players)
+    value = 0.8 * base_stat + 20
+    confidence = rng.uniform(0.05, 0.9, players)
+
+    columns = {name: np.full((n_days, players), np.nan) for name in SIGNAL_COLUMNS}
+    values = np.full((n_days, players), np.nan)
+    for t in range(n_days):
+        form = 0.9 * form + rng.normal(0, 2.5, players)
+        stat = np.clip(base_stat + form, 0, 80)
+        sentiment = np.tanh(0.08 * form + rng.normal(0, 0.4, players))
+        value = np.clip(0.85 * value + 0.15 * (0.8 * stat + 20 * sentiment + 20) + rng.normal(0, 0.8, players), 1, 99)
+        values[t] = value
+
+        columns['stat_component'][t] = stat
+        columns['sentiment_component'][t] = sentiment
+        columns['confidence_score'][t] = np.clip(confidence + rng.normal(0, 0.05, players), 0, 1)
+
+    columns['value_score'] = values
+    week_ago = np.vstack([np.full((7, players), np.nan), values[:-7]])
+    columns['momentum_score'] = np.where(np.isnan(week_ago), 0.0, (values - week_ago) / week_ago * 5)
+
+    # Offseason gaps and random missing days
+    in_season = (np.arange(n_days) % (season_days + offseason_days)) < season_days
+    missing = ~in_season[:, None] | (rng.random((n_days, players)) < missing_rate)
+    for name in SIGNAL_COLUMNS:
+        columns[name][missing] = np.nan
+
+    dates = np.datetime64('2022-10-01') + np.arange(n_days)
+    player_ids = np.array([f"synthetic-{i:04d}" for i in range(players)], dtype=object)
+    return History(dates, player_ids, columns)
+
+def ml_probabilities(history: History, model) -> np.ndarray:
+    """
+    Profit probability for every (date, player) cell with data, using the same
+    features as MLTradeAdvisor (trends are versus the player's previous row)
+    """
+    observed = ~np.isnan(history['value_score'])
+
+    # Index of each player's previous observed row
+    rows = np.where(observed, np.arange(observed.shape[0])[:, None], -1)
+    last_seen = np.maximum.accumulate(rows, axis=0)
+    previous = np.vstack([np.full((1, observed.shape[1]), -1), last_seen[:-1]])
+    has_previous = previous >= 0
+    cols = np.broadcast_to(np.arange(observed.shape[1]), observed.shape)
+
+    def trend(name):
+        column = history[name]
+        prior = column[np.maximum(previous, 0), cols]
+        return np.where(has_previous, column - prior, 0.0)
+
+    features = np.stack([
+        history['stat_component'], history['sentiment_component'], history['momentum_score'],
+        history['confidence_score'], history['value_score'],
+        trend('stat_component'), trend('sentiment_component')
+    ], axis=-1)[observed]
+
+    probabilities = np.full(observed.shape, np.nan)
+    probabilities[observed] = model.predict_proba(np.nan_to_num(features))[:, 1]
+    return probabilities
+
+def evaluate_mask(mask: np.ndarray, forward: np.ndarray, direction: int = 1) -> List[Dict]:
+    """
+    Hit rate, average return and turnover of one (date x player) signal mask.
+    direction=-1 scores sell signals, where a falling value is a hit.
+    """
+    signals_per_day = mask.sum(axis=1)
+    active_days = signals_per_day > 0
+
+    # Turnover: share of each day's signals that were not signalled the day before
+    new = mask[1:] & ~mask[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily_turnover = new.sum(axis=1) / signals_per_day[1:]
+    turnover = float(np.nanmean(daily_turnover[active_days[1:]])) if active_days[1:].any() else 0.0
+
+    results = []
+    for k, horizon in enumerate(HORIZONS):
+        returns = forward[k]
+        valid = mask & ~np.isnan(returns)
+        count = int(valid.sum())
+        signed = np.where(valid, returns * direction, 0.0)
+        baseline = np.nanmean(returns) * direction
+        avg_return = float(signed.sum() / count) if count else 0.0
+        results.append({
+            'horizon': horizon,
+            'signals': count,
+            'hit_rate': round(float((signed > 0).sum() / count), 4) if count else None,
+            'avg_return': round(avg_return, 3) if count else None,
+            'excess_return': round(avg_return - float(baseline), 3) if count else None,
+            'signals_per_day': round(float(signals_per_day[active_days].mean()), 2) if active_days.any() else 0.0,
+            'turnover': round(turnover, 4)
+        })
+    return results
+
+def grid_params(rule: str) -> List[Dict[str, float]]:
+    grid = THRESHOLD_GRID[rule]
+    return [dict(zip(grid, combo)) for combo in itertools.product(*grid.values())]
+
+def run_backtest(history: History, rules: Sequence[str] = None, model=None,
+                 cutoffs: Sequence[float] = ML_CUTOFFS) -> List[Dict]:
+    """Every rule x threshold combination (plus ML cutoffs if a model is given)"""
+    rules = list(rules or THRESHOLD_GRID)
+    unknown = [rule for rule in rules if rule not in THRESHOLD_GRID]
+    if unknown:
+        raise ValueError(f"Unknown rule(s) {', '.join(unknown)}. Available: {', '.join(THRESHOLD_GRID)}")
+    forward = history.forward_returns()
+    results = []
+
+    for rule in rules:
+        screen = SCREENS[rule]
+        for params in grid_params(rule):
+            mask = screen.select(history.columns, **params)
+            for row in evaluate_mask(mask, forward, screen.direction):
+                results.append({
+                    'rule': rule,
+                    'params': params,
+                    'is_default': params == screen.params,
+                    **row
+                })
+
+    if model is not None:
+        probabilities = ml_probabilities(history, model)
+        for cutoff in cutoffs:
+            for row in evaluate_mask(probabilities > cutoff, forward):
+                results.append({
+                    'rule': 'ml',
+                    'params': {'min_probability': cutoff},
+                    'is_default': cutoff == 0.55,
+                    **row
+                })
+
+    return results
+
+def print_report(results: List[Dict], top: int = 5, horizon: int = 7):
+    """Best threshold sets per rule at one horizon, plus the live defaults"""
+    print(f"\n{'='*78}\nBACKTEST - {horizon}-day forward returns\n{'='*78}")
+    for rule in dict.fromkeys(r['rule'] for r in results):
+        rows = [r for r in results if r['rule'] == rule and r['horizon'] == horizon and r['signals']]
+        rows.sort(key=lambda r: r['avg_return'], reverse=True)
+        default = [r for r in rows if r['is_default']]
+        shown = rows[:top] + [r for r in default if r not in rows[:top]]
+
+        print(f"\n{rule.upper()}")
+        print(f"  {'params':<52} {'signals':>8} {'hit':>6} {'avg%':>7} {'excess':>7} {'turn':>5}")
+        for r in shown:
+            params = ', '.join(f"{k}={v}" for k, v in r['params'].items())
+            marker = '*' if r['is_default'] else ' '
+            print(f"{marker} {params:<52} {r['signals']:>8} {r['hit_rate']:>6.1%} "
+                  f"{r['avg_return']:>7.2f} {r['excess_return']:>7.2f} {r['turnover']:>5.2f}")
+    print("\n* = thresholds currently used by the advisors. Returns are signed (sells gain when value falls).")
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the trade signal rules")
+    parser.add_argument('--synthetic', action='store_true', help="Use generated history instead of Supabase")
+    parser.add_argument('--seasons', type=int, default=3)
+    parser.add_argument('--players', type=int, default=450)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--start', help="First value_date to replay (YYYY-MM-DD)")
+    parser.add_argument('--end', help="Last value_date to replay (YYYY-MM-DD)")
+    parser.add_argument('--rules', default=','.join(THRESHOLD_GRID), help="Comma-separated rules")
+    parser.add_argument('--ml', action='store_true', help="Also backtest the current ML model's cutoffs")
+    parser.add_argument('--horizon', type=int, default=7, choices=HORIZONS, help="Horizon shown in the report")
+    parser.add_argument('--json', help="Write all results to this file")
+    args = parser.parse_args()
+
+    started = time.time()
+    if args.synthetic:
+        history = synthetic_history(args.seasons, args.players, seed=args.seed)
+        print(f"✅ Synthetic history: {history.shape[1]} players over {history.shape[0]} days")
+    else:
+        history = load_history(args.start, args.end)
+
+    model = None
+    if args.ml:
+        from model_registry import ModelRegistry
+        try:
+            model, _, version = ModelRegistry().load()
+            print(f"✅ Using ML model {version} (in-sample for dates it was trained on)")
+        except Exception as e:
+            print(f"⚠️  No ML model available, skipping cutoffs: {e}")
+
+    results = run_backtest(history, [r.strip() for r in args.rules.split(',') if r.strip()], model)
+    print_report(results, horizon=args.horizon)
+    print(f"\n⏱️  {len(results)} results in {time.time() - started:.1f}s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Wrote {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,16 @@ import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import datetime
+import numpy as np
 from typing import List, Dict
 
+from snapshot_service import get_snapshot
+from rolling_stats import get_rolling_stats, window_stat
+from game_logs import PROP_COMPONENTS, GameLog, load_game_logs, prop_tensor
+from prop_edges import UNDER, best_props, evaluate_props
+from odds_history import get_odds_history
+from player_names import normalize_player_name
+
 load_dotenv()
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
@@ -24,6 +32,7 @@ class BettingAdvisor:
         self.today = datetime.date.today().isoformat()
         self.use_real_lines = use_real_lines
         self.real_lines_cache = {}
+        self.game_logs = {}  # player_id -> GameLog, fetched once per advisor
         
         # Try to load real betting lines if enabled
         if use_real_lines:
@@ -37,11 +46,7 @@ class BettingAdvisor:
     
     def _normalize_name(self, name: str) -> str:
         """Normalize player name for matching"""
-        # Remove periods, extra spaces, convert to lowercase
-        # Also remove common suffixes like Jr., Sr., III, etc.
-        normalized = name.lower().replace('.', '').replace('  ', ' ').strip()
-        normalized = normalized.replace(' jr', '').replace(' sr', '').replace(' iii', '').replace(' ii', '')
-        return normalized
+        return normalize_player_name(name)
     
     def _format_prop_name(self, prop_type: str) -> str:
         """Format prop type for display"""
@@ -87,14 +92,12 @@ class BettingAdvisor:
         
         return len(significant_words) > 0
     
-    def _get_default_consistency_response(self) -> Dict:
-        """Return default consistency response when data is insufficient"""
-        return {
-            'rating': 'Unknown',
-            'std': 0,
-            'matchup_adjusted': False,
-            'explanation': 'Insufficient data'
-        }
+    def _get_game_logs(self, player_ids: List[str]) -> Dict[str, GameLog]:
+        """Game logs for the given players, reading only the ones not fetched yet"""
+        missing = [pid for pid in dict.fromkeys(player_ids) if pid not in self.game_logs]
+        if missing:
+            self.game_logs.update(load_game_logs(missing))
+        return {pid: self.game_logs[pid] for pid in player_ids}
     
     def _get_matchup_aware_consistency(self, player_id: str, prop_type: str, opponent_team: str = None) -> Dict:
         """
@@ -104,171 +107,7 @@ class BettingAdvisor:
             dict with 'rating' (High/Medium/Low), 'std' (standard deviation), 
             'matchup_adjusted' (bool), and 'explanation' (str)
         """
-        try:
-            import numpy as np
-            
-            # For combo props, we can't query them directly - calculate from components
-            if prop_type in ['points_rebounds_assists', 'points_rebounds', 'points_assists', 'rebounds_assists']:
-                # Get component stats
-                try:
-                    stats_response = supabase.table('daily_player_stats').select(
-                        'points, rebounds, assists, game_date, opponent_team'
-                    ).eq('player_id', player_id).order('game_date', desc=True).limit(10).execute()
-                    has_opponent_data = True
-                except:
-                    stats_response = supabase.table('daily_player_stats').select(
-                        'points, rebounds, assists, game_date'
-                    ).eq('player_id', player_id).order('game_date', desc=True).limit(10).execute()
-                    has_opponent_data = False
-                
-                if not stats_response.data or len(stats_response.data) < 3:
-                    return self._get_default_consistency_response()
-                
-                # Calculate combo values
-                games = stats_response.data
-                if prop_type == 'points_rebounds_assists':
-                    all_stats = [g['points'] + g['rebounds'] + g['assists'] for g in games if all(g.get(k) is not None for k in ['points', 'rebounds', 'assists'])]
-                elif prop_type == 'points_rebounds':
-                    all_stats = [g['points'] + g['rebounds'] for g in games if all(g.get(k) is not None for k in ['points', 'rebounds'])]
-                elif prop_type == 'points_assists':
-                    all_stats = [g['points'] + g['assists'] for g in games if all(g.get(k) is not None for k in ['points', 'assists'])]
-                elif prop_type == 'rebounds_assists':
-                    all_stats = [g['rebounds'] + g['assists'] for g in games if all(g.get(k) is not None for k in ['rebounds', 'assists'])]
-            else:
-                # Single stat - query directly
-                # Get last 10 games - try with opponent_team first, fall back if column doesn't exist
-                try:
-                    stats_response = supabase.table('daily_player_stats').select(
-                        f'{prop_type}, game_date, opponent_team'
-                    ).eq('player_id', player_id).order('game_date', desc=True).limit(10).execute()
-                    has_opponent_data = True
-                except:
-                    # Column doesn't exist, get stats without opponent info
-                    stats_response = supabase.table('daily_player_stats').select(
-                        f'{prop_type}, game_date'
-                    ).eq('player_id', player_id).order('game_date', desc=True).limit(10).execute()
-                    has_opponent_data = False
-                
-                if not stats_response.data or len(stats_response.data) < 3:
-                    return self._get_default_consistency_response()
-                
-                games = stats_response.data
-                all_stats = [g[prop_type] for g in games if g.get(prop_type) is not None]
-            
-            if len(all_stats) < 3:
-                return self._get_default_consistency_response()
-            
-            # Calculate raw consistency
-            raw_std = np.std(all_stats)
-            
-            # If we have opponent info and opponent_team column exists, adjust for matchup
-            if opponent_team and has_opponent_data:
-                # Find games against similar opponents (same team or similar defensive rating)
-                matchup_games = [g for g in games if g.get('opponent_team') == opponent_team]
-                
-                if len(matchup_games) >= 2:
-                    # We have head-to-head history
-                    matchup_stats = [g[prop_type] for g in matchup_games if g.get(prop_type) is not None]
-                    matchup_std = np.std(matchup_stats)
-                    matchup_avg = np.mean(matchup_stats)
-                    
-                    # Use matchup-specific consistency
-                    if matchup_std < 3:
-                        rating = 'High'
-                    elif matchup_std < 5:
-                        rating = 'Medium'
-                    else:
-                        rating = 'Low'
-                    
-                    return {
-                        'rating': rating,
-                        'std': matchup_std,
-                        'matchup_adjusted': True,
-                        'matchup_avg': matchup_avg,
-                        'matchup_games': len(matchup_games),
-                        'explanation': f'vs {opponent_team}: {len(matchup_games)} game history'
-                    }
-            
-            # Fallback to raw consistency
-            if raw_std < 3:
-                rating = 'High'
-            elif raw_std < 5:
-                rating = 'Medium'
-            else:
-                rating = 'Low'
-            
-            return {
-                'rating': rating,
-                'std': raw_std,
-                'matchup_adjusted': False,
-                'explanation': f'Last {len(all_stats)} games (no matchup data)'
-            }
-            
-        except Exception as e:
-            # Silently fall back to basic calculation
-            import numpy as np
-            try:
-                # For combo props, calculate from components
-                if prop_type in ['points_rebounds_assists', 'points_rebounds', 'points_assists', 'rebounds_assists']:
-                    stats_response = supabase.table('daily_player_stats').select(
-                        'points, rebounds, assists'
-                    ).eq('player_id', player_id).order('game_date', desc=True).limit(5).execute()
-                    
-                    if stats_response.data and len(stats_response.data) >= 3:
-                        if prop_type == 'points_rebounds_assists':
-                            all_stats = [g['points'] + g['rebounds'] + g['assists'] for g in stats_response.data if all(g.get(k) is not None for k in ['points', 'rebounds', 'assists'])]
-                        elif prop_type == 'points_rebounds':
-                            all_stats = [g['points'] + g['rebounds'] for g in stats_response.data if all(g.get(k) is not None for k in ['points', 'rebounds'])]
-                        elif prop_type == 'points_assists':
-                            all_stats = [g['points'] + g['assists'] for g in stats_response.data if all(g.get(k) is not None for k in ['points', 'assists'])]
-                        elif prop_type == 'rebounds_assists':
-                            all_stats = [g['rebounds'] + g['assists'] for g in stats_response.data if all(g.get(k) is not None for k in ['rebounds', 'assists'])]
-                        
-                        if len(all_stats) >= 3:
-                            raw_std = np.std(all_stats)
-                            
-                            if raw_std < 3:
-                                rating = 'High'
-                            elif raw_std < 5:
-                                rating = 'Medium'
-                            else:
-                                rating = 'Low'
-                            
-                            return {
-                                'rating': rating,
-                                'std': raw_std,
-                                'matchup_adjusted': False,
-                                'explanation': f'Last {len(all_stats)} games'
-                            }
-                else:
-                    # Single stat
-                    stats_response = supabase.table('daily_player_stats').select(
-                        f'{prop_type}'
-                    ).eq('player_id', player_id).order('game_date', desc=True).limit(5).execute()
-                    
-                    if stats_response.data and len(stats_response.data) >= 3:
-                        all_stats = [g[prop_type] for g in stats_response.data if g.get(prop_type) is not None]
-                        
-                        if len(all_stats) >= 3:
-                            raw_std = np.std(all_stats)
-                            
-                            if raw_std < 3:
-                                rating = 'High'
-                            elif raw_std < 5:
-                                rating = 'Medium'
-                            else:
-                                rating = 'Low'
-                            
-                            return {
-                                'rating': rating,
-                                'std': raw_std,
-                                'matchup_adjusted': False,
-                                'explanation': f'Last {len(all_stats)} games'
-                            }
-            except:
-                pass
-            
-            return self._get_default_consistency_response()
+        return self._get_game_logs([player_id])[player_id].consistency(prop_type, opponent_team)
     
     def _load_real_lines(self):
         """Load real betting lines from The Odds API (with caching)"""
@@ -298,6 +137,12 @@ class BettingAdvisor:
                 print("⚠️  No props returned from API (might be no games today)")
                 return
             
+            # Keep every bookmaker's quote for best-price and line-movement lookups
+            try:
+                get_odds_history().record(props)
+            except Exception as e:
+                print(f"⚠️  Could not record odds history: {e}")
+            
             # Preferred bookmakers (in order of preference)
             preferred_books = ['fanduel', 'draftkings', 'betmgm', 'caesars', 'pointsbet', 'bovada']
             
@@ -443,28 +288,25 @@ class BettingAdvisor:
     def get_player_prop_insights(self, player_id: str) -> Dict:
         """Get betting insights for player props (points, rebounds, assists)"""
         try:
-            # Get recent stats (last 5 games)
-            stats_response = supabase.table('daily_player_stats').select(
-                'points, rebounds, assists, steals, blocks, game_date'
-            ).eq('player_id', player_id).order('game_date', desc=True).limit(10).execute()
+            # Last-5 / last-10 aggregates from the rolling stats store
+            row = get_rolling_stats([player_id]).get(player_id)
             
-            if not stats_response.data or len(stats_response.data) < 3:
+            if not row or row['last_10']['games'] < 3:
                 return {'error': 'Not enough recent games'}
             
-            stats = stats_response.data
-            
             # Calculate averages and trends
-            recent_5 = stats[:5]
-            last_10 = stats[:10] if len(stats) >= 10 else stats
+            points_5, points_10 = window_stat(row, 5, 'points'), window_stat(row, 10, 'points')
+            rebounds_5, rebounds_10 = window_stat(row, 5, 'rebounds'), window_stat(row, 10, 'rebounds')
+            assists_5, assists_10 = window_stat(row, 5, 'assists'), window_stat(row, 10, 'assists')
             
-            points_avg_5 = sum(g['points'] for g in recent_5) / len(recent_5)
-            points_avg_10 = sum(g['points'] for g in last_10) / len(last_10)
+            points_avg_5 = points_5['mean']
+            points_avg_10 = points_10['mean']
             
-            rebounds_avg_5 = sum(g['rebounds'] for g in recent_5) / len(recent_5)
-            rebounds_avg_10 = sum(g['rebounds'] for g in last_10) / len(last_10)
+            rebounds_avg_5 = rebounds_5['mean']
+            rebounds_avg_10 = rebounds_10['mean']
             
-            assists_avg_5 = sum(g['assists'] for g in recent_5) / len(recent_5)
-            assists_avg_10 = sum(g['assists'] for g in last_10) / len(last_10)
+            assists_avg_5 = assists_5['mean']
+            assists_avg_10 = assists_10['mean']
             
             # Trend analysis (recent vs longer term)
             points_trend = "UP" if points_avg_5 > points_avg_10 else "DOWN"
@@ -472,10 +314,9 @@ class BettingAdvisor:
             assists_trend = "UP" if assists_avg_5 > assists_avg_10 else "DOWN"
             
             # Consistency (lower std = more consistent = safer bet)
-            import numpy as np
-            points_std = np.std([g['points'] for g in recent_5])
-            rebounds_std = np.std([g['rebounds'] for g in recent_5])
-            assists_std = np.std([g['assists'] for g in recent_5])
+            points_std = points_5['std']
+            rebounds_std = rebounds_5['std']
+            assists_std = assists_5['std']
             
             # Get player name for real lines lookup
             player_response = supabase.table('players').select('full_name').eq('id', player_id).single().execute()
@@ -603,6 +444,8 @@ class BettingAdvisor:
             'goran dragic': 'goran dragić',
         }
         
+        # Match every player with lines to the database first
+        matched = []
         for player_name, player_data in self.real_lines_cache.items():
             # Check all available prop types for this player
             available_props = []
@@ -612,22 +455,7 @@ class BettingAdvisor:
             away_team = player_data.get('away_team')
             opponent_team = None  # Will be set after player lookup
             
-            # Map API prop names to database column names
-            prop_type_map = {
-                'points': 'points',
-                'rebounds': 'rebounds',
-                'assists': 'assists',
-                'threes': 'three_pointers_made',
-                'blocks': 'blocks',
-                'steals': 'steals',
-                'turnovers': 'turnovers',
-                'points_rebounds_assists': 'pra',  # Calculated
-                'points_rebounds': 'pr',  # Calculated
-                'points_assists': 'pa',  # Calculated
-                'rebounds_assists': 'ra',  # Calculated
-            }
-            
-            for prop_type in prop_type_map.keys():
+            for prop_type in PROP_COMPONENTS:
                 if prop_type not in player_data['props']:
                     continue
                 
@@ -698,165 +526,92 @@ class BettingAdvisor:
                         # Fallback: player team doesn't match either (maybe traded recently)
                         opponent_team = away_team if home_team else home_team
                 
-                # Get recent stats - fetch all needed columns including game_date and opponent
-                # Try with opponent_team first, fall back if column doesn't exist
-                try:
-                    stats = supabase.table('daily_player_stats').select(
-                        'points, rebounds, assists, steals, blocks, turnovers, three_pointers_made, game_date, opponent_team'
-                    ).eq('player_id', player['id']).order('game_date', desc=True).limit(5).execute()
-                except:
-                    # Fallback without opponent_team if column doesn't exist
-                    stats = supabase.table('daily_player_stats').select(
-                        'points, rebounds, assists, steals, blocks, turnovers, three_pointers_made, game_date'
-                    ).eq('player_id', player['id']).order('game_date', desc=True).limit(5).execute()
-                
-                if stats.data and len(stats.data) >= 3:
-                    import numpy as np
-                    
-                    # Analyze each available prop type
-                    best_pick = None
-                    best_value_score = 0
-                    
-                    for prop in available_props:
-                        prop_type = prop['type']
-                        line = prop['line']
-                        db_column = prop_type_map.get(prop_type)
-                        
-                        # Calculate stat values (handle combo props)
-                        if prop_type == 'points_rebounds_assists':
-                            recent_stats = [g['points'] + g['rebounds'] + g['assists'] for g in stats.data if all(k in g for k in ['points', 'rebounds', 'assists'])]
-                        elif prop_type == 'points_rebounds':
-                            recent_stats = [g['points'] + g['rebounds'] for g in stats.data if all(k in g for k in ['points', 'rebounds'])]
-                        elif prop_type == 'points_assists':
-                            recent_stats = [g['points'] + g['assists'] for g in stats.data if all(k in g for k in ['points', 'assists'])]
-                        elif prop_type == 'rebounds_assists':
-                            recent_stats = [g['rebounds'] + g['assists'] for g in stats.data if all(k in g for k in ['rebounds', 'assists'])]
-                        elif db_column:
-                            # Try to get stats, handling None values
-                            recent_stats = [g.get(db_column) for g in stats.data if g.get(db_column) is not None]
-                            if not recent_stats:
-                                print(f"⚠️  No data for {prop_type} ({db_column}) for {player['full_name']}")
-                                continue
-                        else:
-                            print(f"⚠️  Unknown prop type: {prop_type}")
-                            continue  # Skip if stat not available
-                        
-                        if not recent_stats or len(recent_stats) < 3:
-                            continue
-                        
-                        player_avg = np.mean(recent_stats)
-                        stat_std = np.std(recent_stats)
-                        
-                        # Calculate value score (how much edge we have)
-                        edge = player_avg - line
-                        value_score = abs(edge)
-                        
-                        # Determine recommendation
-                        if edge > 2:
-                            recommendation = 'OVER'
-                            confidence = 'HIGH'
-                            reason = f'Averaging {player_avg:.1f}, line is {line} - strong value'
-                        elif edge > 0.5:
-                            recommendation = 'OVER'
-                            confidence = 'MEDIUM'
-                            reason = f'Averaging {player_avg:.1f}, slight edge over {line}'
-                        elif edge < -2:
-                            recommendation = 'UNDER'
-                            confidence = 'MEDIUM'
-                            reason = f'Averaging {player_avg:.1f}, line seems high at {line}'
-                        else:
-                            recommendation = 'PASS'
-                            confidence = 'LOW'
-                            reason = f'Line {line} fairly priced (avg: {player_avg:.1f})'
-                        
-                        # Only consider OVER/UNDER picks (skip PASS)
-                        if recommendation != 'PASS' and value_score > best_value_score:
-                            best_value_score = value_score
-                            
-                            # Use simple consistency calculation for speed (skip matchup-aware for now)
-                            # Matchup-aware is slower due to additional queries
-                            if stat_std < 3:
-                                consistency_rating = 'High'
-                            elif stat_std < 5:
-                                consistency_rating = 'Medium'
-                            else:
-                                consistency_rating = 'Low'
-                            
-                            consistency_data = {
-                                'rating': consistency_rating,
-                                'std': stat_std,
-                                'matchup_adjusted': False,
-                                'explanation': f'Last {len(recent_stats)} games'
-                            }
-                            
-                            # Enhance reason with matchup info if available
-                            enhanced_reason = reason
-                            if consistency_data['matchup_adjusted']:
-                                enhanced_reason += f" | vs {opponent_team}: {consistency_data['matchup_avg']:.1f} avg in {consistency_data['matchup_games']} games"
-                            
-                            # Format last 5 games data
-                            last_5_games = []
-                            for game in stats.data[:5]:
-                                game_stat = None
-                                if prop_type == 'points_rebounds_assists':
-                                    game_stat = game.get('points', 0) + game.get('rebounds', 0) + game.get('assists', 0)
-                                elif prop_type == 'points_rebounds':
-                                    game_stat = game.get('points', 0) + game.get('rebounds', 0)
-                                elif prop_type == 'points_assists':
-                                    game_stat = game.get('points', 0) + game.get('assists', 0)
-                                elif prop_type == 'rebounds_assists':
-                                    game_stat = game.get('rebounds', 0) + game.get('assists', 0)
-                                else:
-                                    # Single stat - use prop_type_map to get the correct column
-                                    stat_column = prop_type_map.get(prop_type)
-                                    if stat_column and stat_column in game:
-                                        game_stat = game[stat_column]
-                                
-                                if game_stat is not None:
-                                    last_5_games.append({
-                                        'date': game.get('game_date'),
-                                        'opponent': game.get('opponent_team'),
-                                        'stat': game_stat
-                                    })
-                            
-                            print(f"✅ Added last_5_games for {player['full_name']}: {last_5_games}")
-                            
-                            best_pick = {
-                                'player_id': player['id'],
-                                'player_name': player['full_name'],
-                                'team': player['team_name'],
-                                'position': player['position'],
-                                'prop_type': self._format_prop_name(prop_type),
-                                'line': line,
-                                'line_source': 'sportsbook',
-                                'bookmaker': prop['bookmaker'],
-                                'over_odds': prop['over_odds'],
-                                'under_odds': prop['under_odds'],
-                                'recommendation': recommendation,
-                                'confidence_level': confidence,
-                                'reason': enhanced_reason,
-                                'player_avg': round(player_avg, 1),
-                                'consistency': consistency_data['rating'],
-                                'consistency_explanation': consistency_data['explanation'],
-                                'matchup_adjusted': consistency_data['matchup_adjusted'],
-                                'opponent': opponent_team,
-                                'momentum_score': 0.5,
-                                'confidence': 0.5,
-                                'last_5_games': last_5_games
-                            }
-                    
-                    # Add the best pick for this player
-                    if best_pick:
-                        picks.append(best_pick)
-                    
+                matched.append((player, opponent_team, available_props))
             except Exception as e:
                 print(f"Error processing {player_name}: {e}")
                 continue
         
-        # Sort by recommendation quality
+        if not matched:
+            return []
+        
+        # One game log read for every matched player; all props come from its columns
+        game_logs = self._get_game_logs([player['id'] for player, _, _ in matched])
+        logs = [game_logs[player['id']] for player, _, _ in matched]
+        
+        # (players x props) lines and odds, NaN where a player has no line
+        prop_types = list(PROP_COMPONENTS)
+        lines = np.full((len(matched), len(prop_types)), np.nan)
+        over_odds = np.full_like(lines, np.nan)
+        under_odds = np.full_like(lines, np.nan)
+        for p, (_, _, available_props) in enumerate(matched):
+            for prop in available_props:
+                k = prop_types.index(prop['type'])
+                lines[p, k] = np.nan if prop['line'] is None else prop['line']
+                over_odds[p, k] = np.nan if prop['over_odds'] is None else prop['over_odds']
+                under_odds[p, k] = np.nan if prop['under_odds'] is None else prop['under_odds']
+        
+        # Hit rates, no-vig probabilities, edge and EV for the whole slate at once
+        evaluation = evaluate_props(lines, over_odds, under_odds, prop_tensor(logs, prop_types, 5))
+        best = best_props(evaluation)
+        
+        for p in np.flatnonzero(best >= 0):
+            player, opponent_team, available_props = matched[p]
+            k = best[p]
+            game_log = logs[p]
+            prop_type = prop_types[k]
+            prop = next(prop for prop in available_props if prop['type'] == prop_type)
+            line = prop['line']
+            player_avg = float(evaluation['average'][p, k])
+            
+            if evaluation['recommendation'][p, k] == UNDER:
+                recommendation, confidence = 'UNDER', 'MEDIUM'
+                reason = f'Averaging {player_avg:.1f}, line seems high at {line}'
+            elif evaluation['high_confidence'][p, k]:
+                recommendation, confidence = 'OVER', 'HIGH'
+                reason = f'Averaging {player_avg:.1f}, line is {line} - strong value'
+            else:
+                recommendation, confidence = 'OVER', 'MEDIUM'
+                reason = f'Averaging {player_avg:.1f}, slight edge over {line}'
+            
+            # Matchup-aware consistency from the same columns (no extra queries)
+            consistency_data = game_log.consistency(prop_type, opponent_team)
+            
+            # Enhance reason with matchup info if available
+            if consistency_data['matchup_adjusted']:
+                reason += f" | vs {opponent_team}: {consistency_data['matchup_avg']:.1f} avg in {consistency_data['matchup_games']} games"
+            
+            picks.append({
+                'player_id': player['id'],
+                'player_name': player['full_name'],
+                'team': player['team_name'],
+                'position': player['position'],
+                'prop_type': self._format_prop_name(prop_type),
+                'line': line,
+                'line_source': 'sportsbook',
+                'bookmaker': prop['bookmaker'],
+                'over_odds': prop['over_odds'],
+                'under_odds': prop['under_odds'],
+                'recommendation': recommendation,
+                'confidence_level': confidence,
+                'reason': reason,
+                'player_avg': round(player_avg, 1),
+                'hit_rate': round(float(evaluation['hit_rate'][p, k]), 3),
+                'no_vig_probability': round(float(evaluation['no_vig_probability'][p, k]), 3),
+                'edge': round(float(evaluation['edge'][p, k]), 3),
+                'expected_value': round(float(evaluation['expected_value'][p, k]), 3),
+                'consistency': consistency_data['rating'],
+                'consistency_explanation': consistency_data['explanation'],
+                'matchup_adjusted': consistency_data['matchup_adjusted'],
+                'opponent': opponent_team,
+                'momentum_score': 0.5,
+                'confidence': 0.5,
+                'last_5_games': game_log.last_games(prop_type, 5)
+            })
+        
+        # Sort by recommendation quality, then expected value
         def sort_key(pick):
             conf_score = {'HIGH': 3, 'MEDIUM': 2, 'LOW': 1, 'PASS': 0}.get(pick['confidence_level'], 0)
-            return conf_score
+            return (conf_score, pick['expected_value'])
         
         picks.sort(key=sort_key, reverse=True)
         return picks[:limit]
@@ -880,40 +635,37 @@ class BettingAdvisor:
             
             # Otherwise, get top momentum picks
             # Get latest player value data
-            latest_date_response = supabase.table('player_value_index').select('value_date').order('value_date', desc=True).limit(1).execute()
-            if not latest_date_response.data:
+            snapshot = get_snapshot()
+            if not len(snapshot):
                 return []
             
-            latest_date = latest_date_response.data[0]['value_date']
-            
             # Get players with high momentum and consistency
-            response = supabase.table('player_value_index').select(
-                'player_id, value_score, stat_component, momentum_score, confidence_score'
-            ).eq('value_date', latest_date).gte('momentum_score', 0.2).gte('confidence_score', 0.3).execute()
+            candidates = np.flatnonzero(
+                (snapshot['momentum_score'] >= 0.2) & (snapshot['confidence_score'] >= 0.3) & snapshot.has_player
+            )
+            
+            # Every candidate's recent games in one read
+            game_logs = self._get_game_logs([snapshot.records[i]['player_id'] for i in candidates])
             
             picks = []
-            for record in response.data:
-                # Get player details
-                player = supabase.table('players').select('id, full_name, team_name, position').eq('id', record['player_id']).single().execute()
+            for i in candidates:
+                record = snapshot.records[i]
+                player = snapshot.player(record['player_id'])
+                game_log = game_logs[record['player_id']]
                 
-                # Get recent stats for analysis
-                stats = supabase.table('daily_player_stats').select('points, rebounds, assists, steals, blocks').eq('player_id', record['player_id']).order('game_date', desc=True).limit(10).execute()
-                
-                if stats.data and len(stats.data) >= 3:
-                    import numpy as np
-                    
+                if len(game_log) >= 3:
                     # Calculate stats
-                    recent_5 = stats.data[:5]
-                    recent_10 = stats.data[:10]
+                    recent_5 = game_log.values('points', 5)
+                    recent_10 = game_log.values('points', 10)
                     
-                    points_avg_5 = np.mean([g['points'] for g in recent_5])
-                    points_avg_10 = np.mean([g['points'] for g in recent_10])
-                    points_std = np.std([g['points'] for g in recent_5])
+                    points_avg_5 = np.mean(recent_5)
+                    points_avg_10 = np.mean(recent_10)
+                    points_std = np.std(recent_5)
                     
                     # Get real line if available
                     calculated_line = round(points_avg_5 - 1.5, 1)
                     line_info = self._get_line_for_player(
-                        player.data['full_name'], 
+                        player['full_name'], 
                         'points', 
                         calculated_line
                     )
@@ -961,9 +713,9 @@ class BettingAdvisor:
                     
                     picks.append({
                         'player_id': record['player_id'],
-                        'player_name': player.data['full_name'],
-                        'team': player.data['team_name'],
-                        'position': player.data['position'],
+                        'player_name': player['full_name'],
+                        'team': player['team_name'],
+                        'position': player['position'],
                         'momentum_score': record['momentum_score'],
                         'confidence': record['confidence_score'],
                         'prop_type': 'Points',
@@ -0,0 +1,189 @@
+"""
+Daily Reports - Precomputed AI reports produced at the end of the data pipeline
+
+The daily insights (buy/sell/breakout screens + ML picks) and price forecast
+reports only change when the scrapers update player_value_index. This stage
+builds them once per value_date and stores them as versioned JSON, either in
+the daily_reports table or, when DAILY_REPORTS_DIR is set, as files in that
+directory. The API serves the stored copy with an ETag and only computes a
+report live when nothing has been stored for the latest value_date.
+
+Usage:
+    python daily_reports.py            # build and store all reports
+"""
+import os
+import json
+import hashlib
+import datetime
+from dotenv import load_dotenv
+from supabase import create_client, Client
+from typing import Callable, Dict, Optional
+
+from snapshot_service import get_snapshot
+
+load_dotenv()
+url: str = os.environ.get("SUPABASE_URL")
+key: str = os.environ.get("SUPABASE_KEY")
+supabase: Client = create_client(url, key)
+
+REPORTS_DIR = os.environ.get("DAILY_REPORTS_DIR")
+
+def build_daily_insights() -> Dict:
+    """Buy/sell/breakout screens plus ML recommendations"""
+    from ai_trade_advisor import AITradeAdvisor
+
+    advisor = AITradeAdvisor()
+
+    # All three screens in one pass over the latest snapshot
+    screens = advisor.run_screens(['buy', 'sell', 'breakout'], 5)
+    buy_ops = screens['buy']
+    sell_ops = screens['sell']
+    breakouts = screens['breakout']
+
+    # Try to get ML recommendations
+    ml_recommendations = []
+    try:
+        from ml_trade_advisor import MLTradeAdvisor
+        ml_advisor = MLTradeAdvisor()
+        ml_recommendations = ml_advisor.get_ml_recommendations(5)
+    except Exception as e:
+        print(f"ML recommendations unavailable: {e}")
+
+    return {
+        "generated_at": datetime.datetime.now().isoformat(),
+        "buy_opportunities": {
+            "count": len(buy_ops),
+            "players": buy_ops
+        },
+        "sell_opportunities": {
+            "count": len(sell_ops),
+            "players": sell_ops
+        },
+        "breakout_candidates": {
+            "count": len(breakouts),
+            "players": breakouts
+        },
+        "ml_recommendations": {
+            "count": len(ml_recommendations),
+            "players": ml_recommendations
+        },
+        "summary": {
+            "total_opportunities": len(buy_ops) + len(sell_ops),
+            "high_urgency_buys": sum(1 for o in buy_ops if o['urgency'] == 'high'),
+            "high_urgency_sells": sum(1 for o in sell_ops if o['urgency'] == 'high'),
+            "high_potential_breakouts": sum(1 for b in breakouts if b['potential'] == 'high')
+        }
+    }
+
+def build_price_forecast() -> Dict:
+    """Trending players, value drops and market movers with 7-day forecasts"""
+    from ai_price_predictor import AIPricePredictor
+
+    predictor = AIPricePredictor()
+
+    # All three views share one market scan
+    trending = predictor.find_trending_players(5)
+    drops = predictor.find_value_drops(5)
+    movers = predictor.find_market_movers(5)
+
+    return {
+        "generated_at": datetime.datetime.now().isoformat(),
+        "trending_players": {
+            "count": len(trending),
+            "players": trending
+        },
+        "value_drops": {
+            "count": len(drops),
+            "players": drops
+        },
+        "market_movers": movers,
+        "summary": {
+            "total_predictions": len(trending) + len(drops),
+            "strong_buy_signals": sum(1 for d in drops if d.get('buy_signal', False)),
+            "high_confidence_predictions": sum(1 for t in trending if t.get('prediction_confidence', 0) > 0.7)
+        }
+    }
+
+REPORT_BUILDERS: Dict[str, Callable[[], Dict]] = {
+    'daily_insights': build_daily_insights,
+    'price_forecast': build_price_forecast,
+}
+
+def _json_default(value):
+    # NumPy scalars (np.float64, np.bool_, ...) -> plain Python values
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def normalize_payload(payload: Dict) -> Dict:
+    """Round-trip through JSON so stored and live payloads are identical"""
+    return json.loads(json.dumps(payload, default=_json_default))
+
+def compute_etag(payload: Dict) -> str:
+    """Content hash of a payload"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=_json_default)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+def _report_path(report_name: str, value_date: str) -> str:
+    return os.path.join(REPORTS_DIR, report_name, f"{value_date}.json")
+
+def save_report(report_name: str, value_date: str, payload: Dict) -> Dict:
+    """Store a report for value_date; returns the stored record"""
+    payload = normalize_payload(payload)
+    record = {
+        'report_name': report_name,
+        'value_date': value_date,
+        'etag': compute_etag(payload),
+        'payload': payload,
+        'created_at': datetime.datetime.now().isoformat()
+    }
+
+    if REPORTS_DIR:
+        path = _report_path(report_name, value_date)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+    else:
+        supabase.table('daily_reports').upsert(record, on_conflict='report_name,value_date').execute()
+
+    return record
+
+def get_report(report_name: str, value_date: str) -> Optional[Dict]:
+    """Stored report for value_date, or None"""
+    try:
+        if REPORTS_DIR:
+            path = _report_path(report_name, value_date)
+            if not os.path.exists(path):
+                return None
+            with open(path) as f:
+                return json.load(f)
+
+        response = supabase.table('daily_reports').select(
+            'report_name, value_date, etag, payload, created_at'
+        ).eq('report_name', report_name).eq('value_date', value_date).limit(1).execute()
+        return response.data[0] if response.data else None
+    except Exception as e:
+        print(f"⚠️  Could not read stored report {report_name}: {e}")
+        return None
+
+def run_reports_stage() -> int:
+    """Pipeline stage: build every report for the latest value_date and store it"""
+    value_date = get_snapshot(force_refresh=True).version
+    if not value_date:
+        print("❌ No player_value_index data - skipping reports")
+        return 0
+
+    stored = 0
+    for report_name, build in REPORT_BUILDERS.items():
+        try:
+            record = save_report(report_name, value_date, build())
+            print(f"✅ Stored {report_name} for {value_date} (etag {record['etag'][:12]})")
+            stored += 1
+        except Exception as e:
+            print(f"❌ Error building {report_name}: {e}")
+    return stored
+
+if __name__ == "__main__":
+    run_reports_stage()
@@ -6,6 +6,8 @@ from supabase import create_client, Client
 import datetime
 import time
 
+from sentiment_aggregates import load_previous_sentiment, refresh_sentiment_aggregates
+
 # --- 1. SETUP ---
 print("\nStarting Sentiment Scraper (Phase 2, Stage 2)...")
 load_dotenv()
@@ -111,6 +113,14 @@ def run_sentiment_pipeline():
 
     if sentiment_to_insert:
         print(f"\nUpserting {len(sentiment_to_insert)} sentiment records...")
+        
+        # Days these articles were stored under before (re-scraped ones move to today)
+        try:
+            previous_rows = load_previous_sentiment(sentiment_to_insert)
+        except Exception as e:
+            print(f"Error reading previous sentiment days (run `python sentiment_aggregates.py rebuild`): {e}")
+            previous_rows = []
+        
         try:
             response = supabase.table('daily_player_sentiment').upsert(
                 sentiment_to_insert, 
@@ -120,6 +130,13 @@ def run_sentiment_pipeline():
             if response.data:
                 print(f"Successfully upserted {len(response.data)} sentiment records.")
             print("--- SENTIMENT SCRAPE COMPLETE ---")
+            
+            # Refresh the per-source daily totals for the days just written
+            try:
+                refreshed = refresh_sentiment_aggregates(sentiment_to_insert, previous_rows)
+                print(f"Refreshed {refreshed} daily sentiment aggregates.")
+            except Exception as e:
+                print(f"Error refreshing sentiment aggregates (run `python sentiment_aggregates.py rebuild`): {e}")
         except Exception as e:
             print(f"Error upserting sentiment: {e}")
     else:
@@ -7,6 +7,8 @@ import time
 from nba_api.stats.endpoints import scoreboardv2, boxscoretraditionalv3, playerdashboardbyyearoveryear
 from nba_api.stats.static import teams
 
+from rolling_stats import update_rolling_stats
+
 # --- 1. SETUP ---
 print("Starting Stats Scraper (Phase 2, Stage 1 - NBA.com API V3)...")
 load_dotenv()
@@ -261,6 +263,13 @@ def run_stats_pipeline():
             if response.data:
                  print(f"Successfully upserted {len(response.data)} stat lines.")
             print("--- STATS SCRAPE COMPLETE ---")
+            
+            # Fold the new games into the last-5/last-10 aggregates
+            try:
+                updated = update_rolling_stats(response.data or final_stats_to_insert)
+                print(f"Updated rolling stats for {updated} players.")
+            except Exception as e:
+                print(f"Error updating rolling stats (run `python rolling_stats.py rebuild`): {e}")
         except Exception as e:
             print(f"Error upserting stats: {e}")
     else:
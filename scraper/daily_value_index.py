@@ -2,6 +2,9 @@ import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import datetime
+import numpy as np
+
+from fantasy_scoring import STANDARD_SCORING
 
 # --- 1. SETUP ---
 print("\nStarting Value Index Calculator (Phase 2, Stage 3)...")
@@ -22,20 +25,6 @@ except Exception as e:
 
 # --- 2. HELPER FUNCTIONS ---
 
-def calculate_fantasy_score(stats):
-    """
-    Calculates a simple fantasy score based on a common formula.
-    (1*pts + 1.2*reb + 1.5*ast + 3*stl + 3*blk - 1*tov)
-    """
-    return (
-        stats['points'] +
-        (stats['rebounds'] * 1.2) +
-        (stats['assists'] * 1.5) +
-        (stats['steals'] * 3) +
-        (stats['blocks'] * 3) -
-        stats['turnovers']
-    )
-
 def get_stat_score(player_id, start_date):
     """
     Gets the average fantasy score for a player over the last 7 days.
@@ -50,8 +39,12 @@ def get_stat_score(player_id, start_date):
         if not response.data:
             return 0  # No stats in the last 7 days
 
-        fantasy_scores = [calculate_fantasy_score(game) for game in response.data]
-        return sum(fantasy_scores) / len(fantasy_scores)
+        # Standard scoring; games with a missing stat are skipped
+        fantasy_scores = STANDARD_SCORING.score_games(response.data)
+        fantasy_scores = fantasy_scores[np.isfinite(fantasy_scores)]
+        if not len(fantasy_scores):
+            return 0
+        return float(fantasy_scores.mean())
 
     except Exception as e:
         print(f"  Error fetching stats for player {player_id}: {e}")
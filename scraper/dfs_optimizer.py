@@ -0,0 +1,636 @@
+"""
+DFS Optimizer - Salary-capped, position-constrained lineups as an integer program
+
+A slate is a set of players with projected fantasy points, a salary and the
+DFS positions they can play. Picking a lineup is a 0/1 program with one
+variable per eligible (player, roster slot) pair: fill every slot exactly
+once, use each player at most once, stay under the salary cap, respect team
+limits, stacks, locks and excludes, and maximize projected points. HiGHS
+(through scipy.optimize.milp) solves a 300-player slate in milliseconds.
+
+Salaries come from the site's salary export (DraftKings or FanDuel CSV);
+without one the lineup is built on positions alone.
+
+generate_lineups builds many distinct lineups at once (projection noise,
+exposure caps, minimum uniqueness) across a pool of solver processes.
+
+Usage:
+    python dfs_optimizer.py --site draftkings --salaries DKSalaries.csv
+    python dfs_optimizer.py --salaries DKSalaries.csv --lineups 20 --max-exposure 0.5 --export upload.csv
+"""
+import io
+import os
+import csv
+import time
+import argparse
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.sparse import coo_matrix, vstack
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from player_names import normalize_player_name
+
+# Roster rules per site. min_teams stands in for the sites' "players from at
+# least N games" rule, since the slate only knows teams.
+SITES = {
+    'draftkings': {
+        'salary_cap': 50000,
+        'slots': ['PG', 'SG', 'SF', 'PF', 'C', 'G', 'F', 'UTIL'],
+        'max_per_team': None,
+        'min_teams': 2,
+        'scoring': 'draftkings'  # fantasy_scoring preset
+    },
+    'fanduel': {
+        'salary_cap': 60000,
+        'slots': ['PG', 'PG', 'SG', 'SG', 'SF', 'SF', 'PF', 'PF', 'C'],
+        'max_per_team': 4,
+        'min_teams': 3,
+        'scoring': 'fanduel'
+    }
+}
+
+BASE_POSITIONS = ['PG', 'SG', 'SF', 'PF', 'C']
+
+MAX_LINEUPS = 150
+MAX_STALLED_ROUNDS = 5  # Rounds in a row without a new lineup before giving up
+ROUND_SIZE = 4  # Candidate lineups per round; fixed so results don't depend on the worker count
+
+# Positions that may fill each roster slot
+SLOT_POSITIONS = {
+    **{p: {p} for p in BASE_POSITIONS},
+    'G': {'PG', 'SG'},
+    'F': {'SF', 'PF'},
+    'UTIL': set(BASE_POSITIONS)
+}
+
+# players.position uses the NBA listing ("Guard", "Forward-Center", ...)
+LISTED_POSITIONS = {
+    'guard': {'PG', 'SG'},
+    'forward': {'SF', 'PF'},
+    'center': {'C'},
+    'g': {'PG', 'SG'},
+    'f': {'SF', 'PF'},
+    'c': {'C'}
+}
+
+def parse_positions(position: str) -> Set[str]:
+    """DFS positions for "PG/SG", "Guard-Forward", "F-C" and the like"""
+    positions = set()
+    for token in (position or '').replace('/', ' ').replace('-', ' ').replace(',', ' ').split():
+        if token.upper() in BASE_POSITIONS:
+            positions.add(token.upper())
+        else:
+            positions |= LISTED_POSITIONS.get(token.lower(), set())
+    return positions
+
+def _column(fieldnames: List[str], *candidates: str) -> Optional[str]:
+    lookup = {name.strip().lower(): name for name in fieldnames}
+    for candidate in candidates:
+        if candidate in lookup:
+            return lookup[candidate]
+    return None
+
+def load_salaries(source) -> List[Dict]:
+    """
+    Rows of a DraftKings or FanDuel salary export: name, salary, positions,
+    dfs_id and team. `source` is a path, CSV text or an open file.
+    """
+    if hasattr(source, 'read'):
+        handle = source
+    elif '\n' in source:
+        handle = io.StringIO(source)
+    else:
+        handle = open(source, newline='')
+
+    with handle:
+        reader = csv.DictReader(handle)
+        fields = reader.fieldnames or []
+        name_col = _column(fields, 'name', 'nickname', 'player')
+        first_col, last_col = _column(fields, 'first name'), _column(fields, 'last name')
+        salary_col = _column(fields, 'salary')
+        # DraftKings' "Roster Position" lists slots (PG/G/UTIL); "Position" is the player's own
+        position_col = _column(fields, 'position', 'roster position', 'pos')
+        id_col = _column(fields, 'id', 'player id')
+        team_col = _column(fields, 'teamabbrev', 'team')
+        if salary_col is None or (name_col is None and first_col is None):
+            raise ValueError("Salary CSV needs a name and a salary column")
+
+        rows = []
+        for row in reader:
+            name = row[name_col] if name_col else f"{row[first_col]} {row[last_col]}"
+            salary = (row.get(salary_col) or '').replace('$', '').replace(',', '').strip()
+            if not name or not salary:
+                continue
+            rows.append({
+                'name': name.strip(),
+                'salary': int(float(salary)),
+                'positions': parse_positions(row[position_col]) if position_col else set(),
+                'dfs_id': row[id_col].strip() if id_col and row.get(id_col) else None,
+                'team': row[team_col].strip() if team_col and row.get(team_col) else None
+            })
+        return rows
+
+class Slate:
+    """
+    One site's slate as arrays (projection, salary, team code, slot
+    eligibility) plus the lineup integer program over it.
+
+    players: dicts with player_id, player_name, team, positions (DFS
+    positions), salary (None when unknown) and projected_fantasy_points.
+    """
+
+    def __init__(self, players: List[Dict], site: str = 'draftkings'):
+        if site not in SITES:
+            raise ValueError(f"Unknown site '{site}' (expected one of {', '.join(SITES)})")
+        self.site = site
+        self.rules = SITES[site]
+        self.slots = self.rules['slots']
+        self.players = players
+
+        self.projection = np.array([p['projected_fantasy_points'] for p in players], dtype=float)
+        self.has_salaries = bool(players) and all(p.get('salary') is not None for p in players)
+        self.salary = np.array([p.get('salary') or 0 for p in players], dtype=float)
+        self.teams, self.team_codes = np.unique([p.get('team') or '' for p in players], return_inverse=True)
+        self.ids = {p['player_id']: i for i, p in enumerate(players)}
+
+        self.eligible = np.array(
+            [[bool(set(p['positions']) & SLOT_POSITIONS[slot]) for slot in self.slots] for p in players],
+            dtype=bool
+        ).reshape(len(players), len(self.slots))
+        self.var_player, self.var_slot = np.nonzero(self.eligible)
+
+        # covers[q, p]: q can fill every slot p can
+        missing = self.eligible.astype(np.int32) @ (~self.eligible).astype(np.int32).T
+        self.covers = missing.T == 0
+        self._models = {}
+
+    def dominated(self, projection: np.ndarray, max_per_team: Optional[int],
+                  same_team: bool, blocked: np.ndarray) -> np.ndarray:
+        """
+        Players some optimal lineup can do without. p is dominated by q when
+        q projects at least as high, costs no more and fits every slot p
+        does; if enough of p's dominators can always be swapped in for p
+        without breaking a rule, p is never needed.
+
+        same_team (for stacks) only counts teammates. Otherwise a swap must
+        avoid teams already at max_per_team (at most (roster - 1) // cap of
+        them) and, when the rest of the lineup spans too few teams, every
+        team already in it (at most min_teams - 1). Blocked players never
+        count as dominators.
+        """
+        n, roster = len(self.players), len(self.slots)
+        index = np.arange(n)
+        # Strict order on (projection, -salary, -index), so repeated swaps terminate
+        better = (
+            (projection[:, None] > projection[None, :]) |
+            ((projection[:, None] == projection[None, :]) &
+             ((self.salary[:, None] < self.salary[None, :]) |
+              ((self.salary[:, None] == self.salary[None, :]) & (index[:, None] < index[None, :]))))
+        )
+        dominates = better & (self.salary[:, None] <= self.salary[None, :]) & self.covers & ~blocked[:, None]
+        if same_team:
+            # Up to roster - 1 dominators may already be in the lineup
+            dominates &= self.team_codes[:, None] == self.team_codes[None, :]
+            return dominates.sum(axis=0) >= roster
+
+        # Dominators per (team, player), largest teams first
+        per_team = np.zeros((len(self.teams), n), dtype=int)
+        rows, cols = np.nonzero(dominates)
+        np.add.at(per_team, (self.team_codes[rows], cols), 1)
+        per_team = -np.sort(-per_team, axis=0)
+        total = per_team.sum(axis=0)
+
+        full_teams = (roster - 1) // max_per_team if max_per_team else 0
+        enough = total - per_team[:full_teams].sum(axis=0) >= roster
+        min_teams = self.rules['min_teams'] if len(self.teams) >= self.rules['min_teams'] else 0
+        if min_teams > 1:
+            enough &= total - per_team[:min_teams - 1].sum(axis=0) >= 1
+        return enough
+
+    def _model(self, max_per_team: Optional[int], min_stack: Optional[int], stacks: Optional[Dict[str, int]]):
+        """
+        Constraint matrix, row bounds and integrality for a set of team rules,
+        built once per slate and reused by every solve with the same rules.
+        None if a stacked team is not on the slate.
+        """
+        key = (max_per_team, min_stack, tuple(sorted((stacks or {}).items())))
+        if key in self._models:
+            return self._models[key]
+
+        n_players, n_slots, n_teams = len(self.players), len(self.slots), len(self.teams)
+        n_pairs = len(self.var_player)
+
+        # Variables: pick[player] (binary), assign[(player, slot) pair], then
+        # per team used[team] (min_teams) and stack[team] (binary, min_stack).
+        # Only the picks need to be integer: for integral picks the slot
+        # assignment is a bipartite matching, whose polytope has integral
+        # vertices, so branching never has to permute flex slots.
+        min_teams = self.rules['min_teams'] if n_teams >= self.rules['min_teams'] else 0
+        n_used = n_teams if min_teams > 1 else 0
+        n_stack = n_teams if min_stack else 0
+        pick, assign = 0, n_players
+        used, stack = assign + n_pairs, assign + n_pairs + n_used
+        n_vars = stack + n_stack
+
+        rows, cols, values, lower, upper = [], [], [], [], []
+
+        def add(row_keys, columns, coefficients, n_rows, lb, ub):
+            rows.append(len(lower) + np.asarray(row_keys))
+            cols.append(np.asarray(columns))
+            values.append(np.broadcast_to(np.asarray(coefficients, dtype=float), len(cols[-1])))
+            lower.extend(np.broadcast_to(lb, n_rows))
+            upper.extend(np.broadcast_to(ub, n_rows))
+
+        everyone = np.arange(n_players)
+        pairs = np.arange(n_pairs)
+        teams = np.arange(n_teams)
+
+        # Every slot filled once; each picked player fills exactly one slot
+        add(self.var_slot, assign + pairs, 1, n_slots, 1, 1)
+        add(np.concatenate([self.var_player, everyone]), np.concatenate([assign + pairs, pick + everyone]),
+            np.concatenate([np.ones(n_pairs), -np.ones(n_players)]), n_players, 0, 0)
+
+        if self.has_salaries:
+            add(np.zeros(n_players, dtype=int), pick + everyone, self.salary, 1, 0, self.rules['salary_cap'])
+
+        if max_per_team:
+            add(self.team_codes, pick + everyone, 1, n_teams, 0, max_per_team)
+
+        for team, minimum in (stacks or {}).items():
+            members = np.flatnonzero(self.teams[self.team_codes] == team)
+            if not len(members):
+                self._models[key] = None
+                return None
+            add(np.zeros(len(members), dtype=int), pick + members, 1, 1, minimum, np.inf)
+
+        if n_used:
+            # used[t] <= players picked from t; at least min_teams teams used
+            add(np.concatenate([self.team_codes, teams]), np.concatenate([pick + everyone, used + teams]),
+                np.concatenate([np.ones(n_players), -np.ones(n_teams)]), n_teams, 0, np.inf)
+            add(np.zeros(n_teams, dtype=int), used + teams, 1, 1, min_teams, np.inf)
+
+        if n_stack:
+            # players picked from t >= min_stack * stack[t]; at least one stack
+            add(np.concatenate([self.team_codes, teams]), np.concatenate([pick + everyone, stack + teams]),
+                np.concatenate([np.ones(n_players), -min_stack * np.ones(n_teams)]), n_teams, 0, np.inf)
+            add(np.zeros(n_teams, dtype=int), stack + teams, 1, 1, 1, np.inf)
+
+        matrix = coo_matrix(
+            (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(len(lower), n_vars)
+        ).tocsr()
+        integrality = np.zeros(n_vars)
+        integrality[pick:pick + n_players] = 1
+        integrality[stack:stack + n_stack] = 1
+        self._models[key] = (matrix, np.array(lower), np.array(upper), integrality)
+        return self._models[key]
+
+    def solve(self, projection: np.ndarray = None, max_per_team: int = None,
+              min_stack: int = None, stacks: Dict[str, int] = None,
+              locked: Iterable[str] = (), excluded: Iterable[str] = (),
+              avoid: Sequence[Sequence[int]] = (), min_unique: int = 1,
+              time_limit: float = 10.0) -> Optional[np.ndarray]:
+        """
+        Player index for each roster slot of the best lineup (None if no
+        lineup satisfies the constraints).
+
+        projection overrides self.projection; max_per_team overrides the
+        site's limit; min_stack asks for at least that many players from one
+        team, and stacks for at least stacks[team] from each given team.
+        min_stack is the slow case: its "some team" choice is a binary per
+        team with a weak LP relaxation, so a 300-player slate takes about
+        1-1.5s instead of 0.15-0.3s (a named team in stacks takes about 0.5s).
+        The lineup differs from every lineup in avoid (player indices) by at
+        least min_unique players.
+        """
+        n_players, roster = len(self.players), len(self.slots)
+        projection = self.projection if projection is None else projection
+        if len(self.var_player) == 0:
+            return None
+
+        max_per_team = max_per_team or self.rules['max_per_team']
+        model = self._model(max_per_team, min_stack, stacks)
+        if model is None:
+            return None
+        matrix, lower, upper, integrality = model
+        n_vars = matrix.shape[1]
+
+        out = np.zeros(n_players, dtype=bool)
+        for player_id in excluded:
+            if player_id in self.ids:
+                out[self.ids[player_id]] = True
+        locks = np.zeros(n_players, dtype=bool)
+        for player_id in locked:
+            if player_id not in self.ids:
+                return None
+            locks[self.ids[player_id]] = True
+
+        if len(avoid) and min_unique > 0:
+            # At most roster - min_unique players shared with each earlier lineup
+            avoid = np.asarray(avoid, dtype=int)
+            overlap = coo_matrix(
+                (np.ones(avoid.size), (np.repeat(np.arange(len(avoid)), roster), avoid.ravel())),
+                shape=(len(avoid), n_vars)
+            )
+            matrix = vstack([matrix, overlap]).tocsr()
+            lower = np.concatenate([lower, np.zeros(len(avoid))])
+            upper = np.concatenate([upper, np.full(len(avoid), roster - min_unique)])
+
+        # Dropping dominated players up front shrinks the search a lot. A
+        # player already in an avoided lineup can't stand in for another
+        # without raising that overlap, so it never counts as a dominator.
+        if self.has_salaries:
+            blocked = out.copy()
+            if len(avoid) and min_unique > 0:
+                blocked[np.unique(avoid)] = True
+            out |= self.dominated(projection, max_per_team, bool(stacks or min_stack), blocked) & ~locks
+
+        lower_bounds, upper_bounds = np.zeros(n_vars), np.ones(n_vars)
+        upper_bounds[:n_players] = ~out
+        lower_bounds[:n_players] = locks
+        objective = np.zeros(n_vars)
+        objective[:n_players] = -projection
+
+        result = milp(
+            objective,
+            constraints=LinearConstraint(matrix, lower, upper),
+            integrality=integrality,
+            bounds=Bounds(lower_bounds, upper_bounds),
+            options={'time_limit': time_limit}
+        )
+        if result.x is None or result.status not in (0, 1):
+            return None
+
+        # Picks are integral; the LP may still split a slot between two picked
+        # players, so read the assignment off as a matching
+        picked = np.flatnonzero(result.x[:n_players] > 0.5)
+        return self._assign_slots(picked)
+
+    def _assign_slots(self, picked: np.ndarray) -> Optional[np.ndarray]:
+        """Slot -> player for a set of picks, by augmenting paths (rosters are tiny)"""
+        eligible = {
+            p: [s for s, slot in enumerate(self.slots) if set(self.players[p]['positions']) & SLOT_POSITIONS[slot]]
+            for p in picked
+        }
+        holder = {}
+
+        def place(p, seen):
+            for s in eligible[p]:
+                if s not in seen:
+                    seen.add(s)
+                    if s not in holder or place(holder[s], seen):
+                        holder[s] = p
+                        return True
+            return False
+
+        # Least flexible players first keeps the natural slots (PG in PG, not UTIL)
+        for p in sorted(picked, key=lambda p: len(eligible[p])):
+            if not place(p, set()):
+                return None
+        if len(holder) != len(self.slots):
+            return None
+        return np.array([holder[s] for s in range(len(self.slots))])
+
+    def describe(self, lineup: np.ndarray, projection: np.ndarray = None) -> Dict:
+        """Response dict for a solved lineup (players in slot order)"""
+        projection = self.projection if projection is None else projection
+        players = []
+        for slot, index in zip(self.slots, lineup):
+            player = {k: v for k, v in self.players[index].items() if k != 'positions'}
+            player['slot'] = slot
+            player['positions'] = sorted(self.players[index]['positions'])
+            players.append(player)
+        return {
+            'site': self.site,
+            'salary_cap': self.rules['salary_cap'] if self.has_salaries else None,
+            'salary_used': int(self.salary[lineup].sum()) if self.has_salaries else None,
+            'projected_fantasy_points': round(float(projection[lineup].sum()), 1),
+            'lineup': players
+        }
+
+def match_salaries(projections: List[Dict], salaries: List[Dict]) -> List[Dict]:
+    """
+    Projections joined to salary rows by player name. The site's positions
+    win over players.position; players missing from the salary file are dropped.
+    """
+    by_name = {normalize_player_name(row['name']): row for row in salaries}
+    matched = []
+    for player in projections:
+        row = by_name.get(normalize_player_name(player['player_name']))
+        if row is None:
+            continue
+        matched.append({
+            **player,
+            'salary': row['salary'],
+            'dfs_id': row['dfs_id'],
+            'positions': row['positions'] or player['positions']
+        })
+    return matched
+
+# --- Multiple lineups ---
+
+# Each worker process builds the slate (arrays, dominance matrix, constraint
+# model) once and reuses it for every lineup it solves
+_worker_slate = None
+
+def _init_worker(players: List[Dict], site: str):
+    global _worker_slate
+    _worker_slate = Slate(players, site)
+
+def _solve_lineup(task: Dict, slate: Slate = None) -> Optional[List[int]]:
+    slate = slate or _worker_slate
+    rng = np.random.default_rng(task['seed'])
+    projection = slate.projection * np.maximum(0.0, 1 + task['noise'] * rng.standard_normal(len(slate.projection)))
+    lineup = slate.solve(
+        projection,
+        excluded=task['excluded'],
+        avoid=task['avoid'],
+        min_unique=task['min_unique'],
+        **task['options']
+    )
+    return None if lineup is None else lineup.tolist()
+
+def generate_lineups(players: List[Dict], site: str = 'draftkings', n_lineups: int = 20,
+                     noise: float = 0.1, max_exposure: float = 1.0,
+                     exposures: Dict[str, float] = None, min_unique: int = 1,
+                     workers: int = None, seed: int = 0, **options) -> Dict:
+    """
+    Up to n_lineups distinct lineups, best projected first.
+
+    Each lineup maximizes projections perturbed by noise (relative standard
+    deviation) and shares at most roster - min_unique players with every
+    earlier one. A player is in at most max_exposure (or exposures[player_id])
+    of the lineups. options go to Slate.solve (max_per_team, min_stack,
+    stacks, locked, excluded).
+
+    Candidates are solved ROUND_SIZE at a time, spread over the worker
+    processes; each candidate's noise is seeded by its index, and a round's
+    results are accepted in that order, so a seed gives the same lineups
+    whatever the worker count. Candidates that clash with an earlier lineup
+    (overlap or exposure) are replaced in the next round.
+    """
+    if not 1 <= n_lineups <= MAX_LINEUPS:
+        return {'error': f'Between 1 and {MAX_LINEUPS} lineups per request'}
+    slate = Slate(players, site)
+    roster = len(slate.slots)
+
+    caps = np.full(len(players), np.floor(max_exposure * n_lineups + 1e-9))
+    for player_id, exposure in (exposures or {}).items():
+        if player_id in slate.ids:
+            caps[slate.ids[player_id]] = np.floor(exposure * n_lineups + 1e-9)
+    counts = np.zeros(len(players))
+
+    # Without noise every candidate in a round would be the same lineup
+    round_size = ROUND_SIZE if noise > 0 else 1
+    workers = min(workers or os.cpu_count() or 1, round_size, n_lineups)
+    excluded = list(options.pop('excluded', None) or ())
+
+    def tasks(batch: int, attempt: int, accepted: List[List[int]]):
+        capped = [players[i]['player_id'] for i in np.flatnonzero(counts >= caps)]
+        return [
+            {
+                'seed': [seed, attempt + k],
+                'noise': noise if len(accepted) + k else 0.0,  # First lineup is the optimal one
+                'excluded': excluded + capped,
+                'avoid': accepted,
+                'min_unique': min_unique,
+                'options': options
+            }
+            for k in range(batch)
+        ]
+
+    accepted, attempt, stalls = [], 0, 0
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(players, site)) if workers > 1 else None
+    try:
+        while len(accepted) < n_lineups and stalls < MAX_STALLED_ROUNDS:
+            batch = tasks(min(round_size, n_lineups - len(accepted)), attempt, accepted)
+            attempt += len(batch)
+            results = list(pool.map(_solve_lineup, batch)) if pool else [_solve_lineup(t, slate) for t in batch]
+            if all(r is None for r in results):
+                break  # Nothing feasible is left
+
+            progress = False
+            for lineup in results:
+                if lineup is None or np.any(counts[lineup] >= caps[lineup]):
+                    continue
+                if any(len(set(lineup) & set(other)) > roster - min_unique for other in accepted):
+                    continue
+                accepted.append(lineup)
+                counts[lineup] += 1
+                progress = True
+                if len(accepted) == n_lineups:
+                    break
+            stalls = 0 if progress else stalls + 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if not accepted:
+        return {'error': 'No lineup satisfies the roster, salary and stacking constraints'}
+    if len(accepted) < n_lineups:
+        print(f"⚠️  Only {len(accepted)} of {n_lineups} lineups satisfy the uniqueness and exposure limits")
+
+    lineups = sorted((np.array(l) for l in accepted), key=lambda l: -slate.projection[l].sum())
+    used = np.flatnonzero(counts)
+    return {
+        'site': site,
+        'lineups': [slate.describe(l) for l in lineups],
+        'exposure': sorted(
+            ({
+                'player_id': players[i]['player_id'],
+                'player_name': players[i]['player_name'],
+                'lineups': int(counts[i]),
+                'share': round(counts[i] / len(accepted), 3)
+            } for i in used),
+            key=lambda e: -e['lineups']
+        )
+    }
+
+def lineups_csv(lineups: List[Dict], site: str) -> str:
+    """Upload file for the site: one column per roster slot, one row per lineup"""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(SITES[site]['slots'])
+    for lineup in lineups:
+        writer.writerow([p.get('dfs_id') or p['player_name'] for p in lineup['lineup']])
+    return out.getvalue()
+
+def synthetic_slate(n_players: int, seed: int = 0) -> List[Dict]:
+    """Random players with realistic salaries, positions and projections"""
+    rng = np.random.default_rng(seed)
+    listings = ['Guard', 'Guard-Forward', 'Forward', 'Forward-Center', 'Center']
+    teams = [f'T{i:02d}' for i in range(30)]
+    players = []
+    for i in range(n_players):
+        projection = float(rng.gamma(4.0, 7.0))
+        players.append({
+            'player_id': f'p{i}',
+            'player_name': f'Player {i}',
+            'team': teams[i % len(teams)],
+            'positions': parse_positions(listings[rng.integers(len(listings))]),
+            'salary': int(np.clip(round((3000 + projection * 180 + rng.normal(0, 600)) / 100) * 100, 3000, 12000)),
+            'projected_fantasy_points': round(projection, 1)
+        })
+    return players
+
+def print_lineup(result: Dict):
+    for player in result['lineup']:
+        salary = f"${player['salary']:,}" if player.get('salary') is not None else ''
+        print(f"{player['slot']:>4}  {player['player_name']:<28} {player['team'] or '':<5} {salary:>8}  {player['projected_fantasy_points']:.1f}")
+    print(f"✅ {result['projected_fantasy_points']} projected points" +
+          (f", ${result['salary_used']:,} of ${result['salary_cap']:,}" if result['salary_cap'] else ''))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the highest-projected DFS lineups")
+    parser.add_argument('--site', default='draftkings', choices=sorted(SITES))
+    parser.add_argument('--salaries', help="Site salary CSV export")
+    parser.add_argument('--max-per-team', type=int)
+    parser.add_argument('--min-stack', type=int, help="Players from one team (about 1-1.5s on 300 players)")
+    parser.add_argument('--lineups', type=int, default=1, help="Number of distinct lineups")
+    parser.add_argument('--noise', type=float, default=0.1, help="Relative projection noise per lineup")
+    parser.add_argument('--max-exposure', type=float, default=1.0, help="Largest share of lineups per player")
+    parser.add_argument('--min-unique', type=int, default=1, help="Players each lineup must not share with another")
+    parser.add_argument('--workers', type=int, help="Solver processes (default: CPU count)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--export', help="Write the site upload CSV here")
+    parser.add_argument('--benchmark', type=int, metavar='PLAYERS', help="Time a synthetic slate of this size")
+    args = parser.parse_args()
+    constraints = {'max_per_team': args.max_per_team, 'min_stack': args.min_stack}
+    generation = {
+        'noise': args.noise,
+        'max_exposure': args.max_exposure,
+        'min_unique': args.min_unique,
+        'workers': args.workers,
+        'seed': args.seed
+    }
+
+    start = time.perf_counter()
+    if args.benchmark and args.lineups == 1:
+        slate = Slate(synthetic_slate(args.benchmark), args.site)
+        result = slate.describe(slate.solve(**constraints))
+    elif args.benchmark:
+        result = generate_lineups(synthetic_slate(args.benchmark), args.site, args.lineups, **generation, **constraints)
+    else:
+        from fantasy_optimizer import FantasyOptimizer
+        optimizer = FantasyOptimizer()
+        if args.lineups == 1:
+            result = optimizer.get_optimal_lineup(site=args.site, salaries=args.salaries, **constraints)
+        else:
+            result = optimizer.get_lineups(args.lineups, site=args.site, salaries=args.salaries, **generation, **constraints)
+    elapsed = time.perf_counter() - start
+    if 'error' in result:
+        print(f"❌ {result['error']}")
+        raise SystemExit(1)
+
+    lineups = result.get('lineups', [result])
+    for lineup in lineups[:3]:
+        print_lineup(lineup)
+    if len(lineups) > 3:
+        print(f"   ... {len(lineups) - 3} more")
+    if args.benchmark:
+        print(f"⏱️  {args.benchmark} players, {len(lineups)} lineup(s) in {elapsed * 1000:.1f} ms")
+    if args.export:
+        with open(args.export, 'w', newline='') as f:
+            f.write(lineups_csv(lineups, args.site))
+        print(f"✅ Wrote {len(lineups)} lineups to {args.export}")
@@ -9,6 +9,8 @@ import time
 import requests
 from bs4 import BeautifulSoup
 
+from sentiment_aggregates import load_previous_sentiment, refresh_sentiment_aggregates
+
 # --- 1. SETUP ---
 print("\nStarting Enhanced Sentiment Scraper...")
 load_dotenv()
@@ -335,6 +337,14 @@ def run_enhanced_sentiment_pipeline():
     # Insert all sentiment data
     if all_sentiment_data:
         print(f"\n\nUpserting {len(all_sentiment_data)} sentiment records...")
+        
+        # Days these articles were stored under before (re-scraped ones move to today)
+        try:
+            previous_rows = load_previous_sentiment(all_sentiment_data)
+        except Exception as e:
+            print(f"Error reading previous sentiment days (run `python sentiment_aggregates.py rebuild`): {e}")
+            previous_rows = []
+        
         try:
             # Insert in batches to avoid timeout
             batch_size = 100
@@ -348,6 +358,13 @@ def run_enhanced_sentiment_pipeline():
                 time.sleep(1)
             
             print("--- ENHANCED SENTIMENT SCRAPE COMPLETE ---")
+            
+            # Refresh the per-source daily totals for the days just written
+            try:
+                refreshed = refresh_sentiment_aggregates(all_sentiment_data, previous_rows)
+                print(f"Refreshed {refreshed} daily sentiment aggregates.")
+            except Exception as e:
+                print(f"Error refreshing sentiment aggregates (run `python sentiment_aggregates.py rebuild`): {e}")
         except Exception as e:
             print(f"Error upserting sentiment: {e}")
     else:
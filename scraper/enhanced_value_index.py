@@ -1,8 +1,16 @@
 import os
+import time
+import argparse
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import datetime
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from supabase_pager import iter_batches, iter_rows
+from rolling_stats import get_rolling_stats
+from sentiment_aggregates import load_daily_sentiment
+from fantasy_scoring import STANDARD_SCORING
 
 # --- 1. SETUP ---
 print("\nStarting Enhanced Value Index Calculator...")
@@ -21,37 +29,35 @@ except Exception as e:
     print(f"Error connecting to Supabase: {e}")
     exit()
 
-# --- 2. HELPER FUNCTIONS ---
+STATS_WINDOW_DAYS = 10
+SENTIMENT_WINDOW_DAYS = 5
+BACKFILL_CHUNK_SIZE = 1000
 
-def calculate_fantasy_score(stats):
-    """Enhanced fantasy score calculation"""
-    return (
-        stats['points'] +
-        (stats['rebounds'] * 1.2) +
-        (stats['assists'] * 1.5) +
-        (stats['steals'] * 3) +
-        (stats['blocks'] * 3) -
-        stats['turnovers']
-    )
+# --- 2. HELPER FUNCTIONS ---
 
-def get_stat_trend(player_id, start_date):
+def get_stat_trend(player_id, start_date, recent_games=None):
     """
     Gets stats trend with recency weighting.
+    recent_games: the player's last games, newest first (from player_rolling_stats);
+    queried from daily_player_stats when not given.
     Returns: (avg_score, trend_direction, consistency)
     """
     try:
-        response = supabase.table('daily_player_stats') \
-            .select('points, rebounds, assists, steals, blocks, turnovers, game_date') \
-            .eq('player_id', player_id) \
-            .gte('game_date', start_date) \
-            .order('game_date', desc=True) \
-            .execute()
+        if recent_games is not None:
+            games = [g for g in recent_games if g['game_date'][:10] >= start_date]
+        else:
+            games = supabase.table('daily_player_stats') \
+                .select('points, rebounds, assists, steals, blocks, turnovers, game_date') \
+                .eq('player_id', player_id) \
+                .gte('game_date', start_date) \
+                .order('game_date', desc=True) \
+                .execute().data
         
-        if not response.data or len(response.data) < 2:
+        if not games or len(games) < 2:
             return 0, 0, 0
         
-        # Calculate fantasy scores for each game
-        fantasy_scores = [calculate_fantasy_score(game) for game in response.data]
+        # Calculate fantasy scores for each game (NaN where a stat is missing)
+        fantasy_scores = STANDARD_SCORING.score_games(games).tolist()
         
         # Filter out any NaN values
         fantasy_scores = [s for s in fantasy_scores if np.isfinite(s)]
@@ -85,99 +91,60 @@ def get_stat_trend(player_id, start_date):
         print(f"  Error fetching stats for player {player_id}: {e}")
         return 0, 0, 0
 
-def get_sentiment_trend(player_id, start_date):
-    """
-    Gets sentiment trend with source weighting and recency bias.
-    Returns: (avg_sentiment, trend_direction, volume)
-    """
-    try:
-        response = supabase.table('daily_player_sentiment') \
-            .select('sentiment_score, source, article_date') \
-            .eq('player_id', player_id) \
-            .gte('article_date', start_date) \
-            .order('article_date', desc=True) \
-            .execute()
-        
-        if not response.data:
-            return 0, 0, 0
-        
-        # Weight different sources
-        source_weights = {
-            'reddit_nba': 1.2,
-            'reddit_nbadiscussion': 1.3,
-            'reddit_fantasybball': 1.1,
-            'news_espn': 1.5,
-            'news_cbssports': 1.3,
-            'news_yahoo': 1.2,
-            'bleacher_report': 1.4
-        }
-        
-        weighted_scores = []
-        dates = []
-        
-        for item in response.data:
-            source = item.get('source', 'unknown')
-            score = item['sentiment_score']
-            
-            # Skip invalid scores
-            if not np.isfinite(score):
-                continue
-            
-            # Get base weight for source
-            weight = 1.0
-            for key, val in source_weights.items():
-                if key in source:
-                    weight = val
-                    break
-            
-            weighted_scores.append(score * weight)
-            dates.append(item['article_date'])
-        
-        if not weighted_scores:
-            return 0, 0, 0
-        
-        # Calculate weighted average
-        avg_sentiment = np.mean(weighted_scores)
-        
-        # Calculate trend (recent vs older sentiment)
-        if len(weighted_scores) >= 5:
-            recent_sentiment = np.mean(weighted_scores[:len(weighted_scores)//2])
-            older_sentiment = np.mean(weighted_scores[len(weighted_scores)//2:])
-            trend = recent_sentiment - older_sentiment
-        else:
-            trend = 0
-        
-        # Volume (more mentions = more confidence in sentiment)
-        volume = min(len(weighted_scores) / 20, 1.0)  # Normalize to 0-1
-        
-        # Ensure all values are finite
-        avg_sentiment = avg_sentiment if np.isfinite(avg_sentiment) else 0
-        trend = trend if np.isfinite(trend) else 0
-        volume = volume if np.isfinite(volume) else 0
-        
-        return avg_sentiment, trend, volume
-        
-    except Exception as e:
-        print(f"  Error fetching sentiment for player {player_id}: {e}")
-        return 0, 0, 0
-
-def calculate_momentum_score(stat_trend, sentiment_trend):
+def combine_value_components(stat_score, stat_trend, stat_consistency,
+                             sentiment_score, sentiment_trend, sentiment_volume):
     """
-    Calculate momentum based on alignment of stats and sentiment trends.
-    When both are positive or both negative, momentum is stronger.
+    Turn stat/sentiment metrics into momentum, value score and confidence.
+    Works on scalars or on whole arrays (used by the daily run and the backfill).
+    Returns: (momentum, value_score, confidence)
     """
-    if stat_trend * sentiment_trend > 0:  # Same direction
-        return abs(stat_trend + sentiment_trend) * 1.5
-    else:  # Opposite directions
-        return (stat_trend + sentiment_trend) * 0.5
-
-def normalize_to_100_scale(value, min_val=-50, max_val=50):
-    """Normalize a value to 0-100 scale"""
-    # Handle NaN and Infinity
-    if not np.isfinite(value):
-        return 50.0
-    normalized = ((value - min_val) / (max_val - min_val)) * 100
-    return max(0, min(100, normalized))
+    stat_score, stat_trend, stat_consistency, sentiment_score, sentiment_trend, sentiment_volume = (
+        np.asarray(v, dtype=float) for v in
+        (stat_score, stat_trend, stat_consistency, sentiment_score, sentiment_trend, sentiment_volume)
+    )
+    
+    # Momentum: when stats and sentiment trend in the same direction it's stronger
+    momentum = np.where(
+        stat_trend * sentiment_trend > 0,
+        np.abs(stat_trend + sentiment_trend) * 1.5,
+        (stat_trend + sentiment_trend) * 0.5
+    )
+    
+    # Base score from stats (60% weight)
+    stat_component = stat_score * 0.6
+    
+    # Sentiment component (25% weight)
+    # Scale sentiment from -1,1 to match stat scale
+    sentiment_component = sentiment_score * 30 * 0.25  # Approximate scaling
+    
+    # Momentum component (10% weight)
+    momentum_component = momentum * 10 * 0.1
+    
+    # Consistency bonus (5% weight)
+    consistency_component = stat_consistency * 20 * 0.05
+    
+    # Combine all components and normalize -50..50 to a 0-100 scale
+    raw_score = stat_component + sentiment_component + momentum_component + consistency_component
+    with np.errstate(invalid='ignore'):
+        value_score = np.where(np.isfinite(raw_score), np.clip((raw_score + 50) / 100 * 100, 0, 100), 50.0)
+    
+    # Calculate confidence based on data availability
+    # Boost confidence for elite players (high stat scores are inherently reliable)
+    elite_bonus = np.where(stat_score > 80, 0.3, np.where(stat_score > 60, 0.15, 0))
+    confidence = np.minimum(
+        (stat_consistency * 0.3) +
+        (sentiment_volume * 0.3) +
+        np.where((stat_score > 0) & (sentiment_score != 0), 0.2, 0.1) +
+        elite_bonus,
+        1.0
+    )
+    
+    # No data available
+    no_data = (stat_score == 0) & (sentiment_score == 0)
+    value_score = np.where(no_data, 50.0, value_score)
+    confidence = np.where(no_data, 0.0, confidence)
+    
+    return momentum, value_score, confidence
 
 def safe_float(value, default=0.0):
     """Convert value to safe float, replacing NaN/Inf with default"""
@@ -185,6 +152,68 @@ def safe_float(value, default=0.0):
         return default
     return float(value)
 
+def rolling_sentiment_metrics(player_cols, days, counts, weighted_sums, n_players, target_days):
+    """
+    Sentiment metrics for every (player, target day) at once.
+    Rows are daily totals (player column, day number, mention count, weighted
+    score sum), any number per player and day (one per source); each target
+    day uses the SENTIMENT_WINDOW_DAYS before it through that day, newest
+    first, so every window is a contiguous range of the sorted days and its
+    sums come from prefix sums. The trend compares the newer half of the
+    mentions with the older half; the day straddling the split contributes
+    at its mean.
+    Returns (avg_sentiment, trend, volume) arrays of shape (players x targets).
+    """
+    shape = (n_players, len(target_days))
+    keep = counts > 0
+    if not keep.any():
+        return np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    
+    # One row per (player, day), sorted by player, newest day first
+    span = int(max(days[keep].max(), target_days.max())) + SENTIMENT_WINDOW_DAYS + 1
+    sort_key, inverse = np.unique(player_cols[keep].astype(np.int64) * span - days[keep], return_inverse=True)
+    day_counts = np.bincount(inverse, weights=counts[keep])
+    day_sums = np.bincount(inverse, weights=weighted_sums[keep])
+    day_means = np.append(day_sums / day_counts, 0.0)
+    prefix_n = np.concatenate([[0.0], np.cumsum(day_counts)])
+    prefix_w = np.concatenate([[0.0], np.cumsum(day_sums)])
+    
+    base = np.arange(n_players, dtype=np.int64)[:, None] * span
+    lo = np.searchsorted(sort_key, base - target_days[None, :], side='left')
+    hi = np.searchsorted(sort_key, base - (target_days[None, :] - SENTIMENT_WINDOW_DAYS), side='right')
+    n = prefix_n[hi] - prefix_n[lo]
+    half = n // 2
+    
+    # Newest day whose mentions don't all fit in the newer half
+    split = np.searchsorted(prefix_n, prefix_n[lo] + half, side='right') - 1
+    remainder = prefix_n[lo] + half - prefix_n[split]
+    recent_sum = prefix_w[split] - prefix_w[lo] + remainder * day_means[np.minimum(split, len(day_means) - 1)]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_sentiment = np.where(n > 0, (prefix_w[hi] - prefix_w[lo]) / n, 0.0)
+        recent = recent_sum / half
+        older = (prefix_w[hi] - prefix_w[lo] - recent_sum) / (n - half)
+        trend = np.where(n >= 5, recent - older, 0.0)
+    volume = np.minimum(n / 20, 1.0)
+    
+    return avg_sentiment, trend, volume
+
+def load_sentiment_totals(column, origin, since, until):
+    """
+    Daily sentiment totals between since and until as (player column, day
+    number from origin, mention count, weighted sum) arrays.
+    """
+    rows = [r for r in load_daily_sentiment(since=since, until=until) if r['player_id'] in column]
+    return (
+        np.array([column[r['player_id']] for r in rows], dtype=int),
+        _day_number([str(r['article_date'])[:10] for r in rows], origin),
+        np.array([r['mention_count'] for r in rows], dtype=float),
+        np.array([r['weighted_sum'] for r in rows], dtype=float)
+    )
+
+def _day_number(dates, origin):
+    return (np.asarray(dates, dtype='datetime64[D]') - origin).astype(np.int64)
+
 # --- 3. MAIN EXECUTION ---
 
 def run_enhanced_value_index_pipeline():
@@ -202,60 +231,37 @@ def run_enhanced_value_index_pipeline():
 
     today = datetime.date.today()
     stats_start_date = (today - datetime.timedelta(days=10)).isoformat()
-    sentiment_start_date = (today - datetime.timedelta(days=5)).isoformat()
+    sentiment_start_date = (today - datetime.timedelta(days=SENTIMENT_WINDOW_DAYS)).isoformat()
     
     value_index_to_insert = []
+    
+    # Every player's last 10 games in one lookup (covers the 10-day window)
+    rolling = get_rolling_stats([p['id'] for p in players])
+    
+    # Every player's sentiment window from the daily per-source totals
+    column = {p['id']: i for i, p in enumerate(players)}
+    origin = np.datetime64(sentiment_start_date, 'D')
+    sentiment = rolling_sentiment_metrics(
+        *load_sentiment_totals(column, origin, sentiment_start_date, today.isoformat()),
+        len(players), np.array([SENTIMENT_WINDOW_DAYS])
+    )
 
     for player in players:
         player_id = player['id']
         player_name = player['full_name']
         
         # Get stats metrics
-        stat_score, stat_trend, stat_consistency = get_stat_trend(player_id, stats_start_date)
+        recent_games = rolling[player_id]['games'] if player_id in rolling else []
+        stat_score, stat_trend, stat_consistency = get_stat_trend(player_id, stats_start_date, recent_games)
         
         # Get sentiment metrics
-        sentiment_score, sentiment_trend, sentiment_volume = get_sentiment_trend(player_id, sentiment_start_date)
-        
-        # Calculate momentum
-        momentum = calculate_momentum_score(stat_trend, sentiment_trend)
+        sentiment_score, sentiment_trend, sentiment_volume = (float(m[column[player_id], 0]) for m in sentiment)
         
-        # Enhanced value calculation
-        if stat_score == 0 and sentiment_score == 0:
-            # No data available
-            final_value_score = 50.0
-            confidence = 0.0
-        else:
-            # Base score from stats (60% weight)
-            stat_component = stat_score * 0.6
-            
-            # Sentiment component (25% weight)
-            # Scale sentiment from -1,1 to match stat scale
-            sentiment_scaled = sentiment_score * 30  # Approximate scaling
-            sentiment_component = sentiment_scaled * 0.25
-            
-            # Momentum component (10% weight)
-            momentum_component = momentum * 10 * 0.1
-            
-            # Consistency bonus (5% weight)
-            consistency_component = stat_consistency * 20 * 0.05
-            
-            # Combine all components
-            raw_score = stat_component + sentiment_component + momentum_component + consistency_component
-            
-            # Normalize to 0-100 scale
-            final_value_score = normalize_to_100_scale(raw_score)
-            
-            # Calculate confidence based on data availability
-            # Boost confidence for elite players (high stat scores are inherently reliable)
-            elite_bonus = 0.3 if stat_score > 80 else 0.15 if stat_score > 60 else 0
-            
-            confidence = min(
-                (stat_consistency * 0.3) +  # Reduced from 0.4
-                (sentiment_volume * 0.3) +  # Reduced from 0.4
-                (0.2 if stat_score > 0 and sentiment_score != 0 else 0.1) +
-                elite_bonus,  # Bonus for elite performers
-                1.0
-            )
+        # Momentum, value score and confidence
+        momentum, final_value_score, confidence = (float(v) for v in combine_value_components(
+            stat_score, stat_trend, stat_consistency,
+            sentiment_score, sentiment_trend, sentiment_volume
+        ))
         
         print(f"  {player_name}:")
         print(f"    Stats: {stat_score:.1f} (trend: {stat_trend:+.2f}, consistency: {stat_consistency:.2f})")
@@ -295,5 +301,139 @@ def run_enhanced_value_index_pipeline():
     else:
         print("No value index records to insert.")
 
+# --- 4. BACKFILL ---
+
+def rolling_stat_metrics(fantasy_scores):
+    """
+    get_stat_trend for every (player, day) at once.
+    fantasy_scores is (players x days) with NaN where there was no game; day t
+    is scored from games in its STATS_WINDOW_DAYS window, newest first.
+    Returns (avg_score, trend, consistency) arrays of shape
+    (players x days - STATS_WINDOW_DAYS).
+    """
+    # windows[p, t, 0] is the newest day of target day t's window
+    windows = sliding_window_view(fantasy_scores, STATS_WINDOW_DAYS + 1, axis=1)[..., ::-1]
+    valid = np.isfinite(windows)
+    scores = np.where(valid, windows, 0.0)
+    n = valid.sum(axis=-1)
+    
+    # Position of each game in the newest-first list, and the same weights
+    # as np.exp(np.linspace(0, 1, n))
+    position = np.cumsum(valid, axis=-1) - 1
+    weights = np.where(valid, np.exp(position / np.maximum(n - 1, 1)[..., None]), 0.0)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weighted_avg = (weights * scores).sum(axis=-1) / weights.sum(axis=-1)
+        
+        recent = valid & (position < 3)
+        older = valid & (position >= 3)
+        recent_avg = scores.sum(axis=-1, where=recent) / recent.sum(axis=-1)
+        older_avg = np.where(n > 3, scores.sum(axis=-1, where=older) / older.sum(axis=-1), recent_avg)
+        trend = np.where(n >= 3, (recent_avg - older_avg) / (older_avg + 1), 0.0)
+        
+        mean = scores.sum(axis=-1) / n
+        std_dev = np.sqrt((np.where(valid, scores - mean[..., None], 0.0) ** 2).sum(axis=-1) / n)
+        consistency = 1 / (1 + std_dev)
+    
+    enough = n >= 2
+    return tuple(
+        np.where(enough & np.isfinite(metric), metric, 0.0)
+        for metric in (weighted_avg, trend, consistency)
+    )
+
+def compute_value_index_range(start_date, end_date):
+    """
+    Value index rows for every player on every date from start_date to
+    end_date, from one read of each source table.
+    """
+    players = list(iter_rows(supabase, 'players', 'id', key=('id',)))
+    player_ids = np.array([p['id'] for p in players], dtype=object)
+    column = {pid: i for i, pid in enumerate(player_ids)}
+    
+    start = np.datetime64(start_date, 'D')
+    end = np.datetime64(end_date, 'D')
+    target_days = np.arange(STATS_WINDOW_DAYS, STATS_WINDOW_DAYS + int((end - start).astype(int)) + 1)
+    origin = start - STATS_WINDOW_DAYS  # Day 0 of the grid
+    print(f"Backfilling {len(target_days)} days x {len(player_ids)} players...")
+    
+    # Stats: (players x days) fantasy score grid
+    fantasy_scores = np.full((len(player_ids), len(target_days) + STATS_WINDOW_DAYS), np.nan)
+    stat_fields = ['points', 'rebounds', 'assists', 'steals', 'blocks', 'turnovers']
+    for batch in iter_batches(
+        supabase, 'daily_player_stats', 'player_id, game_date, ' + ', '.join(stat_fields),
+        key=('player_id', 'game_date'),
+        filters=lambda q: q.gte('game_date', str(origin)).lte('game_date', end_date)
+    ):
+        known = np.array([pid in column for pid in batch['player_id']], dtype=bool)
+        cols = np.array([column[pid] for pid in batch['player_id'][known]], dtype=int)
+        stats = {
+            field: np.array([np.nan if v is None else v for v in batch[field][known]], dtype=float)
+            for field in stat_fields
+        }
+        days = _day_number([d[:10] for d in batch['game_date'][known]], origin)
+        fantasy_scores[cols, days] = STANDARD_SCORING.score_columns(stats)
+    
+    stat_score, stat_trend, stat_consistency = rolling_stat_metrics(fantasy_scores)
+    
+    # Sentiment: daily per-source totals
+    sentiment_score, sentiment_trend, sentiment_volume = rolling_sentiment_metrics(
+        *load_sentiment_totals(column, origin, str(start - SENTIMENT_WINDOW_DAYS), end_date),
+        len(player_ids), target_days
+    )
+    
+    momentum, value_score, confidence = combine_value_components(
+        stat_score, stat_trend, stat_consistency,
+        sentiment_score, sentiment_trend, sentiment_volume
+    )
+    
+    dates = [str(origin + int(t)) for t in target_days]
+    records = []
+    for t, value_date in enumerate(dates):
+        for p, player_id in enumerate(player_ids):
+            records.append({
+                "player_id": player_id,
+                "value_date": value_date,
+                "value_score": safe_float(value_score[p, t], 50.0),
+                "stat_component": safe_float(stat_score[p, t], 0.0),
+                "sentiment_component": safe_float(sentiment_score[p, t], 0.0),
+                "momentum_score": safe_float(momentum[p, t], 0.0),
+                "confidence_score": safe_float(confidence[p, t], 0.0)
+            })
+    return records
+
+def run_backfill(start_date, end_date, dry_run=False):
+    """Recompute player_value_index for every date in [start_date, end_date]"""
+    started = time.time()
+    records = compute_value_index_range(start_date, end_date)
+    print(f"Computed {len(records)} value index records in {time.time() - started:.1f}s")
+    
+    if dry_run:
+        print("Dry run - nothing written.")
+        return records
+    
+    for i in range(0, len(records), BACKFILL_CHUNK_SIZE):
+        chunk = records[i:i + BACKFILL_CHUNK_SIZE]
+        try:
+            supabase.table('player_value_index').upsert(chunk, on_conflict='player_id, value_date').execute()
+            print(f"  Upserted {i + len(chunk)}/{len(records)}")
+        except Exception as e:
+            print(f"Error upserting value index records {i}-{i + len(chunk)}: {e}")
+            return records
+    
+    print("--- VALUE INDEX BACKFILL COMPLETE ---")
+    return records
+
 if __name__ == "__main__":
-    run_enhanced_value_index_pipeline()
+    parser = argparse.ArgumentParser(description="Calculate the enhanced value index")
+    parser.add_argument('--backfill', action='store_true', help="Recompute a date range instead of today")
+    parser.add_argument('--start', help="First value_date to backfill (YYYY-MM-DD)")
+    parser.add_argument('--end', default=datetime.date.today().isoformat(), help="Last value_date (default: today)")
+    parser.add_argument('--dry-run', action='store_true', help="Compute the backfill without writing it")
+    args = parser.parse_args()
+    
+    if args.backfill:
+        if not args.start:
+            parser.error("--backfill requires --start")
+        run_backfill(args.start, args.end, args.dry_run)
+    else:
+        run_enhanced_value_index_pipeline()
@@ -8,6 +8,11 @@ import datetime
 import numpy as np
 from typing import List, Dict
 
+from snapshot_service import get_snapshot
+from rolling_stats import get_rolling_stats, window_stat
+from fantasy_scoring import STAT_COLUMNS, as_scoring, stat_matrix
+from dfs_optimizer import SITES, Slate, generate_lineups, load_salaries, match_salaries, parse_positions
+
 load_dotenv()
 
 class FantasyOptimizer:
@@ -19,118 +24,190 @@ class FantasyOptimizer:
         url: str = os.environ.get("SUPABASE_URL")
         key: str = os.environ.get("SUPABASE_KEY")
         self.supabase: Client = create_client(url, key)
+        self._projections = {}  # Scoring system -> projections, shared by lineups and value picks
+    
+    def calculate_fantasy_points(self, stats: Dict, scoring=None) -> float:
+        """Calculate fantasy points (standard scoring unless a preset or ScoringSystem is given)"""
+        return as_scoring(scoring).score(stats, missing=0.0)
     
-    def calculate_fantasy_points(self, stats: Dict) -> float:
-        """Calculate fantasy points (standard scoring)"""
-        return (
-            stats.get('points', 0) * 1.0 +
-            stats.get('rebounds', 0) * 1.2 +
-            stats.get('assists', 0) * 1.5 +
-            stats.get('steals', 0) * 3.0 +
-            stats.get('blocks', 0) * 3.0 -
-            stats.get('turnovers', 0) * 1.0
-        )
+    def get_projections(self, position: str = None, limit: int = None, scoring=None) -> List[Dict]:
+        """Projected fantasy points for today under a scoring preset or ScoringSystem, best first"""
+        scoring = as_scoring(scoring)
+        if scoring.key not in self._projections:
+            self._projections[scoring.key] = self._load_projections(scoring)
+        
+        picks = self._projections[scoring.key]
+        if position:
+            picks = [p for p in picks if position.lower() in p['position'].lower()]
+        return picks[:limit]
     
-    def get_optimal_lineup(self, position: str = None, limit: int = 10) -> List[Dict]:
-        """Get optimal fantasy picks for today"""
+    def _load_projections(self, scoring) -> List[Dict]:
         try:
             # Get latest value data
-            latest_date_response = self.supabase.table('player_value_index').select('value_date').order('value_date', desc=True).limit(1).execute()
-            if not latest_date_response.data:
+            snapshot = get_snapshot()
+            if not len(snapshot):
                 print("⚠️  No player value data found")
                 return []
             
-            latest_date = latest_date_response.data[0]['value_date']
-            
             # Get players with high value and momentum
-            query = self.supabase.table('player_value_index').select(
-                'player_id, value_score, stat_component, momentum_score'
-            ).eq('value_date', latest_date).gte('stat_component', 20)
-            
-            response = query.execute()
+            records = [snapshot.records[i] for i in np.flatnonzero(snapshot['stat_component'] >= 20)]
             
-            if not response.data:
+            if not records:
                 print("⚠️  No players found with sufficient stats")
                 return []
             
-            # Batch fetch all player details at once
-            player_ids = [r['player_id'] for r in response.data]
-            players_response = self.supabase.table('players').select(
-                'id, full_name, team_name, position'
-            ).in_('id', player_ids).execute()
+            # Player details come with the snapshot
+            player_ids = [r['player_id'] for r in records]
+            players_map = snapshot.players
             
-            # Create player lookup map
-            players_map = {p['id']: p for p in players_response.data}
+            # Last-5 aggregates and box scores for all players in one lookup
+            rolling = get_rolling_stats(player_ids)
             
-            # Batch fetch recent stats for all players
-            stats_response = self.supabase.table('daily_player_stats').select(
-                'player_id, points, rebounds, assists, steals, blocks, turnovers, game_date'
-            ).in_('player_id', player_ids).order('game_date', desc=True).execute()
+            eligible = [
+                (record, players_map[record['player_id']], rolling[record['player_id']])
+                for record in records
+                if record['player_id'] in players_map and record['player_id'] in rolling
+                and rolling[record['player_id']]['last_5']['games'] >= 3
+            ]
             
-            # Group stats by player (take last 5 games per player)
-            stats_by_player = {}
-            for stat in stats_response.data:
-                pid = stat['player_id']
-                if pid not in stats_by_player:
-                    stats_by_player[pid] = []
-                if len(stats_by_player[pid]) < 5:
-                    stats_by_player[pid].append(stat)
+            # Score everyone's last 5 games in one pass: (players x 5 x stats)
+            values = np.full((len(eligible), 5, len(STAT_COLUMNS)), np.nan)
+            for i, (_, _, row) in enumerate(eligible):
+                games = row['games'][:5]
+                if games:
+                    values[i, :len(games)] = stat_matrix(games)
+            scores = scoring.score_matrix(values)
+            played = np.isfinite(scores)
+            filled = np.where(played, scores, 0.0)
+            count = played.sum(axis=1)
+            means = filled.sum(axis=1) / np.maximum(count, 1)
+            stds = np.sqrt(np.maximum((filled ** 2).sum(axis=1) / np.maximum(count, 1) - means ** 2, 0.0))
             
             lineup_picks = []
             
-            for record in response.data:
+            for i, (record, player, row) in enumerate(eligible):
                 player_id = record['player_id']
-                player = players_map.get(player_id)
-                stats = stats_by_player.get(player_id, [])
                 
-                if not player or len(stats) < 3:
-                    continue
+                # Average fantasy points and consistency over the last 5 games
+                avg_fantasy = float(means[i])
+                consistency = 1 / (1 + float(stds[i]))
+                
+                # Projected fantasy points (weighted by momentum)
+                momentum_boost = 1 + (record['momentum_score'] * 0.1)
+                projected = avg_fantasy * momentum_boost
                 
-                if stats and len(stats) >= 3:
-                    # Calculate average fantasy points
-                    fantasy_scores = [self.calculate_fantasy_points(g) for g in stats]
-                    avg_fantasy = np.mean(fantasy_scores)
-                    consistency = 1 / (1 + np.std(fantasy_scores))
-                    
-                    # Projected fantasy points (weighted by momentum)
-                    momentum_boost = 1 + (record['momentum_score'] * 0.1)
-                    projected = avg_fantasy * momentum_boost
-                    
-                    lineup_picks.append({
-                        'player_id': player_id,
-                        'player_name': player['full_name'],
-                        'team': player['team_name'],
-                        'position': player['position'],
-                        'projected_fantasy_points': round(projected, 1),
-                        'avg_fantasy_points': round(avg_fantasy, 1),
-                        'consistency_score': round(consistency, 2),
-                        'momentum': record['momentum_score'],
-                        'value_score': record['value_score'],
-                        'recent_stats': {
-                            'points': round(np.mean([g['points'] for g in stats]), 1),
-                            'rebounds': round(np.mean([g['rebounds'] for g in stats]), 1),
-                            'assists': round(np.mean([g['assists'] for g in stats]), 1)
-                        }
-                    })
+                lineup_picks.append({
+                    'player_id': player_id,
+                    'player_name': player['full_name'],
+                    'team': player['team_name'],
+                    'position': player['position'],
+                    'positions': sorted(parse_positions(player['position'])),
+                    'projected_fantasy_points': round(projected, 1),
+                    'avg_fantasy_points': round(avg_fantasy, 1),
+                    'consistency_score': round(consistency, 2),
+                    'momentum': record['momentum_score'],
+                    'value_score': record['value_score'],
+                    'recent_stats': {
+                        'points': round(window_stat(row, 5, 'points')['mean'], 1),
+                        'rebounds': round(window_stat(row, 5, 'rebounds')['mean'], 1),
+                        'assists': round(window_stat(row, 5, 'assists')['mean'], 1)
+                    }
+                })
             
             # Sort by projected fantasy points
             lineup_picks.sort(key=lambda x: x['projected_fantasy_points'], reverse=True)
+            return lineup_picks
             
-            # Filter by position if specified
-            if position:
-                lineup_picks = [p for p in lineup_picks if position.lower() in p['position'].lower()]
+        except Exception as e:
+            print(f"❌ Error projecting players: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
+    
+    def get_optimal_lineup(self, site: str = 'draftkings', salaries=None,
+                           max_per_team: int = None, min_stack: int = None,
+                           stacks: Dict[str, int] = None, locked: List[str] = None,
+                           excluded: List[str] = None, scoring=None) -> Dict:
+        """
+        Highest-projected lineup that fills the site's roster slots.
+
+        salaries is the site's salary CSV (path, text or file); with it the
+        lineup also stays under the salary cap, otherwise only positions apply.
+        max_per_team / min_stack / stacks / locked / excluded as in Slate.solve.
+        Projections use the site's own scoring unless scoring is given.
+        """
+        try:
+            scoring = as_scoring(scoring, default=SITES.get(site, {}).get('scoring', 'standard'))
+            players = self._slate_players(salaries, scoring)
+            if not players:
+                return {'error': 'No projected players with known positions'}
             
-            return lineup_picks[:limit]
+            slate = Slate(players, site)
+            lineup = slate.solve(
+                max_per_team=max_per_team,
+                min_stack=min_stack,
+                stacks=stacks,
+                locked=locked or (),
+                excluded=excluded or ()
+            )
+            if lineup is None:
+                return {'error': 'No lineup satisfies the roster, salary and stacking constraints'}
+            return {'scoring': scoring.name, **slate.describe(lineup)}
             
+        except ValueError as e:
+            return {'error': str(e)}
         except Exception as e:
             print(f"❌ Error optimizing lineup: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return {'error': str(e)}
+    
+    def get_lineups(self, n_lineups: int = 20, site: str = 'draftkings', salaries=None,
+                    noise: float = 0.1, max_exposure: float = 1.0,
+                    exposures: Dict[str, float] = None, min_unique: int = 1,
+                    workers: int = None, seed: int = 0, scoring=None, **constraints) -> Dict:
+        """
+        n_lineups distinct lineups for multi-entry contests (see
+        generate_lineups); scoring and constraints as in get_optimal_lineup.
+        """
+        try:
+            scoring = as_scoring(scoring, default=SITES.get(site, {}).get('scoring', 'standard'))
+            players = self._slate_players(salaries, scoring)
+            if not players:
+                return {'error': 'No projected players with known positions'}
+            
+            result = generate_lineups(
+                players, site, n_lineups,
+                noise=noise,
+                max_exposure=max_exposure,
+                exposures=exposures,
+                min_unique=min_unique,
+                workers=workers,
+                seed=seed,
+                **{k: v for k, v in constraints.items() if v is not None}
+            )
+            if 'error' in result:
+                return result
+            return {'scoring': scoring.name, **result}
+            
+        except ValueError as e:
+            return {'error': str(e)}
+        except Exception as e:
+            print(f"❌ Error generating lineups: {e}")
+            import traceback
+            traceback.print_exc()
+            return {'error': str(e)}
+    
+    def _slate_players(self, salaries=None, scoring=None) -> List[Dict]:
+        """Projected players with DFS positions, joined to the salary CSV if given"""
+        players = self.get_projections(scoring=scoring)
+        if salaries is not None:
+            players = match_salaries(players, load_salaries(salaries))
+        return [p for p in players if p['positions']]
     
     def get_value_picks(self, limit: int = 10) -> List[Dict]:
         """Get best value picks (high performance, lower ownership)"""
-        lineup = self.get_optimal_lineup(limit=50)
+        lineup = self.get_projections(limit=50)
         
         # Filter for value plays (good stats but not superstars)
         value_picks = [
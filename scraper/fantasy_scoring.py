@@ -0,0 +1,133 @@
+"""
+Fantasy Scoring - Named scoring systems applied to whole stat matrices
+
+A ScoringSystem is a weight per box score stat plus optional bonuses
+(double-double, triple-double). Games are scored as a (games x stats) matrix,
+NaN where a stat is missing: one dot product with the weight vector, plus the
+bonus terms from a count of double-digit categories. Presets cover standard
+season-long scoring, DraftKings, FanDuel and Yahoo; custom weights and
+bonuses start from any preset.
+"""
+import numpy as np
+from typing import Dict, List, Sequence
+
+# Column order of every stat matrix (same as rolling_stats.BOX_SCORE_STATS)
+STAT_COLUMNS = ['points', 'rebounds', 'assists', 'steals', 'blocks', 'turnovers', 'three_pointers_made']
+
+# Categories that count toward double- and triple-doubles
+DOUBLE_DIGIT_STATS = ['points', 'rebounds', 'assists', 'steals', 'blocks']
+BONUS_THRESHOLDS = {'double_double': 2, 'triple_double': 3}
+
+PRESETS = {
+    'standard': {
+        'weights': {'points': 1.0, 'rebounds': 1.2, 'assists': 1.5, 'steals': 3.0, 'blocks': 3.0, 'turnovers': -1.0},
+        'bonuses': {}
+    },
+    'draftkings': {
+        'weights': {
+            'points': 1.0, 'three_pointers_made': 0.5, 'rebounds': 1.25, 'assists': 1.5,
+            'steals': 2.0, 'blocks': 2.0, 'turnovers': -0.5
+        },
+        'bonuses': {'double_double': 1.5, 'triple_double': 3.0}
+    },
+    'fanduel': {
+        'weights': {'points': 1.0, 'rebounds': 1.2, 'assists': 1.5, 'steals': 3.0, 'blocks': 3.0, 'turnovers': -1.0},
+        'bonuses': {}
+    },
+    'yahoo': {
+        'weights': {
+            'points': 1.0, 'three_pointers_made': 0.5, 'rebounds': 1.2, 'assists': 1.5,
+            'steals': 3.0, 'blocks': 3.0, 'turnovers': -1.0
+        },
+        'bonuses': {}
+    }
+}
+
+_DOUBLE_COLUMNS = [STAT_COLUMNS.index(stat) for stat in DOUBLE_DIGIT_STATS]
+
+def stat_matrix(games: Sequence[Dict]) -> np.ndarray:
+    """(games x STAT_COLUMNS) array from box score dicts, NaN where missing"""
+    return np.array(
+        [[np.nan if g.get(stat) is None else g[stat] for stat in STAT_COLUMNS] for g in games],
+        dtype=float
+    ).reshape(len(games), len(STAT_COLUMNS))
+
+class ScoringSystem:
+    """Weights per stat plus bonuses; scores any (... x STAT_COLUMNS) array"""
+
+    def __init__(self, weights: Dict[str, float], bonuses: Dict[str, float] = None, name: str = 'custom'):
+        unknown = set(weights) - set(STAT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown stats: {', '.join(sorted(unknown))} (expected {', '.join(STAT_COLUMNS)})")
+        bonuses = bonuses or {}
+        unknown = set(bonuses) - set(BONUS_THRESHOLDS)
+        if unknown:
+            raise ValueError(f"Unknown bonuses: {', '.join(sorted(unknown))} (expected {', '.join(BONUS_THRESHOLDS)})")
+
+        self.name = name
+        self.weights = {stat: float(w) for stat, w in weights.items() if w}
+        self.bonuses = {bonus: float(b) for bonus, b in bonuses.items() if b}
+        self.vector = np.array([self.weights.get(stat, 0.0) for stat in STAT_COLUMNS])
+        # Only scored columns enter the dot product, so unscored ones may be missing
+        self.columns = np.flatnonzero(self.vector)
+        self.key = (tuple(sorted(self.weights.items())), tuple(sorted(self.bonuses.items())))
+
+    def score_matrix(self, values: np.ndarray) -> np.ndarray:
+        """
+        Fantasy points for every row of a (... x STAT_COLUMNS) array; NaN where
+        a scored stat is missing (unscored stats may be missing freely).
+        """
+        values = np.asarray(values, dtype=float)
+        points = values[..., self.columns] @ self.vector[self.columns]
+        if self.bonuses:
+            doubles = (np.nan_to_num(values[..., _DOUBLE_COLUMNS]) >= 10).sum(axis=-1)
+            for bonus, amount in self.bonuses.items():
+                points = points + amount * (doubles >= BONUS_THRESHOLDS[bonus])
+        return points
+
+    def score_games(self, games: Sequence[Dict]) -> np.ndarray:
+        """Fantasy points per box score dict"""
+        return self.score_matrix(stat_matrix(games))
+
+    def score_columns(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Fantasy points per row of column arrays (absent columns count as missing)"""
+        length = len(next(iter(columns.values())))
+        return self.score_matrix(np.stack(
+            [np.asarray(columns[stat], dtype=float) if stat in columns else np.full(length, np.nan)
+             for stat in STAT_COLUMNS],
+            axis=-1
+        ))
+
+    def score(self, stats: Dict, missing: float = np.nan) -> float:
+        """Fantasy points for one box score; absent or None stats count as `missing`"""
+        row = [missing if stats.get(stat) is None else stats[stat] for stat in STAT_COLUMNS]
+        return float(self.score_matrix(np.array(row, dtype=float)))
+
+    def to_dict(self) -> Dict:
+        return {'name': self.name, 'weights': self.weights, 'bonuses': self.bonuses}
+
+def get_scoring(preset: str = 'standard', weights: Dict[str, float] = None,
+                bonuses: Dict[str, float] = None) -> ScoringSystem:
+    """
+    A preset, optionally with some weights or bonuses replaced (a weight or
+    bonus of 0 removes it).
+    """
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown scoring preset '{preset}' (expected one of {', '.join(PRESETS)})")
+    name = preset if not (weights or bonuses) else f'{preset} (custom)'
+    return ScoringSystem(
+        {**PRESETS[preset]['weights'], **(weights or {})},
+        {**PRESETS[preset]['bonuses'], **(bonuses or {})},
+        name=name
+    )
+
+def as_scoring(scoring=None, default: str = 'standard') -> ScoringSystem:
+    """A ScoringSystem from None (the default preset), a preset name or a ScoringSystem"""
+    if isinstance(scoring, ScoringSystem):
+        return scoring
+    return get_scoring(scoring or default)
+
+def list_presets() -> List[Dict]:
+    return [get_scoring(name).to_dict() for name in PRESETS]
+
+STANDARD_SCORING = get_scoring('standard')
@@ -0,0 +1,135 @@
+"""
+Game Logs - Per-player prop series from one box score fetch
+
+A GameLog holds a player's recent games (newest first) as NumPy columns:
+one per box score stat plus every combo prop (PRA, PR, PA, RA) derived from
+them. Averages, consistency, matchup splits, hit rates and last-N values
+for every prop come from those columns, so a player's games are read once
+per request however many markets are evaluated.
+"""
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from rolling_stats import get_rolling_stats
+
+# Prop type -> daily_player_stats columns summed to get its value
+PROP_COMPONENTS = {
+    'points': ('points',),
+    'rebounds': ('rebounds',),
+    'assists': ('assists',),
+    'threes': ('three_pointers_made',),
+    'blocks': ('blocks',),
+    'steals': ('steals',),
+    'turnovers': ('turnovers',),
+    'points_rebounds_assists': ('points', 'rebounds', 'assists'),
+    'points_rebounds': ('points', 'rebounds'),
+    'points_assists': ('points', 'assists'),
+    'rebounds_assists': ('rebounds', 'assists'),
+}
+
+STAT_COLUMNS = sorted({stat for stats in PROP_COMPONENTS.values() for stat in stats})
+
+def consistency_rating(std: float) -> str:
+    if std < 3:
+        return 'High'
+    elif std < 5:
+        return 'Medium'
+    return 'Low'
+
+def _as_number(value: float):
+    return int(value) if float(value).is_integer() else float(value)
+
+class GameLog:
+    """A player's recent games as columns, newest first"""
+
+    def __init__(self, games: List[Dict]):
+        self.dates = [g.get('game_date') for g in games]
+        self.has_opponent_data = any('opponent_team' in g for g in games)
+        self.opponents = np.array([g.get('opponent_team') for g in games], dtype=object)
+
+        # NaN marks a missing stat, and propagates into the combos that use it
+        stats = {
+            stat: np.array([np.nan if g.get(stat) is None else g[stat] for g in games], dtype=float)
+            for stat in STAT_COLUMNS
+        }
+        self.props = {
+            prop: np.sum([stats[s] for s in components], axis=0)
+            for prop, components in PROP_COMPONENTS.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def values(self, prop_type: str, n: int = None, mask: np.ndarray = None) -> np.ndarray:
+        """Non-missing values of a prop over the last n games (optionally masked)"""
+        series = self.props[prop_type][:n]
+        keep = np.isfinite(series)
+        if mask is not None:
+            keep &= mask[:n]
+        return series[keep]
+
+    def hit_rate(self, prop_type: str, line: float, n: int = None) -> Optional[float]:
+        """Share of the last n games that went over the line (None without games)"""
+        values = self.values(prop_type, n)
+        return float(np.mean(values > line)) if len(values) else None
+
+    def last_games(self, prop_type: str, n: int = 5) -> List[Dict]:
+        """date / opponent / stat for each of the last n games with the prop recorded"""
+        series = self.props[prop_type][:n]
+        return [
+            {'date': self.dates[i], 'opponent': self.opponents[i], 'stat': _as_number(series[i])}
+            for i in np.flatnonzero(np.isfinite(series))
+        ]
+
+    def consistency(self, prop_type: str, opponent_team: str = None, n: int = 10) -> Dict:
+        """
+        Consistency over the last n games; uses the head-to-head games
+        instead when there are at least 2 against opponent_team.
+        """
+        all_stats = self.values(prop_type, n)
+        if len(self) < 3 or len(all_stats) < 3:
+            return {
+                'rating': 'Unknown',
+                'std': 0,
+                'matchup_adjusted': False,
+                'explanation': 'Insufficient data'
+            }
+
+        if opponent_team and self.has_opponent_data:
+            matchup = self.opponents[:n] == opponent_team
+            matchup_stats = self.values(prop_type, n, matchup)
+            if matchup.sum() >= 2 and len(matchup_stats):
+                matchup_std = float(np.std(matchup_stats))
+                return {
+                    'rating': consistency_rating(matchup_std),
+                    'std': matchup_std,
+                    'matchup_adjusted': True,
+                    'matchup_avg': float(np.mean(matchup_stats)),
+                    'matchup_games': int(matchup.sum()),
+                    'explanation': f'vs {opponent_team}: {int(matchup.sum())} game history'
+                }
+
+        raw_std = float(np.std(all_stats))
+        return {
+            'rating': consistency_rating(raw_std),
+            'std': raw_std,
+            'matchup_adjusted': False,
+            'explanation': f'Last {len(all_stats)} games (no matchup data)'
+        }
+
+def prop_tensor(logs: Sequence[GameLog], prop_types: Sequence[str], n: int) -> np.ndarray:
+    """(players x props x n) values over each log's last n games, NaN where missing"""
+    tensor = np.full((len(logs), len(prop_types), n), np.nan)
+    for p, log in enumerate(logs):
+        games = min(len(log), n)
+        for k, prop_type in enumerate(prop_types):
+            tensor[p, k, :games] = log.props[prop_type][:games]
+    return tensor
+
+def load_game_logs(player_ids: Sequence[str]) -> Dict[str, GameLog]:
+    """GameLogs (last 10 games) for the given players from one rolling stats read"""
+    rows = get_rolling_stats(player_ids)
+    return {
+        player_id: GameLog(rows[player_id]['games'] if player_id in rows else [])
+        for player_id in dict.fromkeys(player_ids)
+    }
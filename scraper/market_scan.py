@@ -0,0 +1,195 @@
+"""
+Market Scan - One-pass trend, momentum and volatility metrics for every player
+"""
+import os
+import datetime
+import numpy as np
+from dotenv import load_dotenv
+from supabase import create_client, Client
+from typing import Dict, List
+
+from supabase_pager import iter_batches
+from snapshot_service import get_snapshot
+
+load_dotenv()
+url: str = os.environ.get("SUPABASE_URL")
+key: str = os.environ.get("SUPABASE_KEY")
+supabase: Client = create_client(url, key)
+
+TREND_DAYS = 7      # Window for trend % (trending players / value drops)
+MOMENTUM_DAYS = 14  # Window for momentum, volatility and direction
+# Metadata lookups for players missing from the snapshot are split to keep URLs short
+PLAYER_CHUNK_SIZE = 200
+
+class MarketScan:
+    """
+    Reads the recent player_value_index window once and computes per-player
+    market metrics as NumPy arrays. Trending players, value drops and market
+    movers are all views over the same scan.
+    """
+
+    def __init__(self, today: datetime.date = None):
+        self.today = today or datetime.date.today()
+        self.player_ids = np.array([], dtype=object)
+        self.players = {}
+
+    def load(self) -> 'MarketScan':
+        """Read the momentum window and compute every player's metrics"""
+        start_date = (self.today - datetime.timedelta(days=MOMENTUM_DAYS)).isoformat()
+
+        ids, dates, values = [], [], []
+        for batch in iter_batches(
+            supabase, 'player_value_index', 'player_id, value_date, value_score',
+            key=('player_id', 'value_date'),
+            filters=lambda q: q.gte('value_date', start_date)
+        ):
+            ids.append(batch['player_id'])
+            dates.append(batch['value_date'])
+            values.append(np.array([np.nan if v is None else v for v in batch['value_score']], dtype=float))
+
+        if ids:
+            ids, dates, values = np.concatenate(ids), np.concatenate(dates).astype(str), np.concatenate(values)
+            keep = ~np.isnan(values)
+            self._compute(ids[keep], dates[keep], values[keep])
+
+        print(f"✅ Market scan: {len(self.player_ids)} players since {start_date}")
+        self._load_players()
+        return self
+
+    def _compute(self, ids: np.ndarray, dates: np.ndarray, values: np.ndarray):
+        """Per-player metrics from rows ordered by (player_id, value_date)"""
+        if len(ids) == 0:
+            return
+
+        # Each player's rows are one contiguous segment
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        ends = np.r_[starts[1:], len(ids)]
+        counts = ends - starts
+        last = ends - 1
+
+        self.player_ids = ids[starts]
+        self.latest_dates = dates[last]
+        self.current_value = values[last]
+
+        # Trend over the last TREND_DAYS: dates are sorted, so the trend
+        # window is a suffix of each segment
+        trend_start = (self.today - datetime.timedelta(days=TREND_DAYS)).isoformat()
+        self.trend_points = np.add.reduceat((dates >= trend_start).astype(int), starts)
+        week_ago = values[np.minimum(ends - self.trend_points, last)]
+        self.week_ago_value = week_ago
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.trend_pct = np.where(
+                (self.trend_points > 0) & (week_ago > 0),
+                (self.current_value - week_ago) / week_ago * 100, 0.0
+            )
+
+        # Momentum stats over the whole window (need at least 7 points)
+        self.momentum_points = counts
+        first3 = starts[:, None] + np.arange(3)
+        last3 = ends[:, None] - 3 + np.arange(3)
+        older_avg = values[np.minimum(first3, last[:, None])].sum(axis=1) / 3
+        recent_avg = values[np.maximum(last3, starts[:, None])].sum(axis=1) / 3
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.momentum_trend = np.where(older_avg > 0, (recent_avg - older_avg) / older_avg * 100, 0.0)
+            self.momentum = (values[last] - values[starts]) / np.maximum(counts - 1, 1)
+            means = np.add.reduceat(values, starts) / counts
+            self.volatility = np.sqrt(np.add.reduceat((values - np.repeat(means, counts)) ** 2, starts) / counts)
+        self.window_start_value = values[starts]
+
+        t = self.momentum_trend
+        self.direction = np.select(
+            [t > 5, t > 2, t < -5, t < -2],
+            ['strong_upward', 'upward', 'strong_downward', 'downward'],
+            default='stable'
+        )
+
+    def _load_players(self):
+        """
+        Player metadata for everyone a view can return: taken from the latest
+        snapshot, with only players missing from it read from the players table
+        """
+        player_ids = [str(pid) for pid in self.player_ids[self.trend_points >= 2]] if len(self.player_ids) else []
+        if not player_ids:
+            return
+
+        snapshot = get_snapshot()
+        self.players = {pid: snapshot.players[pid] for pid in player_ids if pid in snapshot.players}
+
+        missing = [pid for pid in player_ids if pid not in self.players]
+        for i in range(0, len(missing), PLAYER_CHUNK_SIZE):
+            response = supabase.table('players').select(
+                'id, full_name, team_name, position'
+            ).in_('id', missing[i:i + PLAYER_CHUNK_SIZE]).execute()
+            self.players.update({p['id']: p for p in response.data})
+
+    def momentum_stats(self, i: int) -> Dict:
+        """Momentum summary for player index i (same shape as get_price_momentum)"""
+        if self.momentum_points[i] < 7:
+            return {
+                'trend': 'insufficient_data',
+                'momentum': 0,
+                'volatility': 0,
+                'direction': 'unknown'
+            }
+
+        return {
+            'trend': round(float(self.momentum_trend[i]), 2),
+            'momentum': round(float(self.momentum[i]), 3),
+            'volatility': round(float(self.volatility[i]), 2),
+            'direction': str(self.direction[i]),
+            'current_value': float(self.current_value[i]),
+            'week_ago_value': float(self.window_start_value[i])
+        }
+
+    def _rows(self, indices: np.ndarray) -> List[Dict]:
+        rows = []
+        for i in indices:
+            player = self.players.get(self.player_ids[i])
+            if not player:
+                continue
+            rows.append({
+                'player_id': self.player_ids[i],
+                'player_name': player['full_name'],
+                'team': player['team_name'],
+                'position': player['position'],
+                'current_value': float(self.current_value[i]),
+                'week_ago_value': float(self.week_ago_value[i]),
+                'trend_pct': round(float(self.trend_pct[i]), 2),
+                'latest_date': self.latest_dates[i],
+                'momentum': self.momentum_stats(i)
+            })
+        return rows
+
+    def trending(self, min_pct: float = 3, min_points: int = 5) -> List[Dict]:
+        """Players up at least min_pct over the trend window, biggest gain first"""
+        if not len(self.player_ids):
+            return []
+        idx = np.flatnonzero((self.trend_points >= min_points) & (self.trend_pct > min_pct))
+        return self._rows(idx[np.argsort(-self.trend_pct[idx], kind='stable')])
+
+    def drops(self, min_pct: float = 3, min_points: int = 5) -> List[Dict]:
+        """Players down at least min_pct over the trend window, biggest drop first"""
+        if not len(self.player_ids):
+            return []
+        idx = np.flatnonzero((self.trend_points >= min_points) & (self.trend_pct < -min_pct))
+        return self._rows(idx[np.argsort(self.trend_pct[idx], kind='stable')])
+
+    def movers(self, limit: int = 5, min_points: int = 2) -> Dict[str, List[Dict]]:
+        """Biggest risers and fallers over the trend window"""
+        if not len(self.player_ids):
+            return {'risers': [], 'fallers': []}
+        idx = np.flatnonzero(self.trend_points >= min_points)
+        order = idx[np.argsort(-self.trend_pct[idx], kind='stable')]
+        risers = [r for r in self._rows(order[:limit]) if r['trend_pct'] > 0]
+        fallers = [r for r in self._rows(order[::-1][:limit]) if r['trend_pct'] < 0]
+        return {'risers': risers, 'fallers': fallers}
+
+if __name__ == "__main__":
+    scan = MarketScan().load()
+    movers = scan.movers(5)
+    print("\n📈 Risers")
+    for r in movers['risers']:
+        print(f"   {r['player_name']:<25} {r['trend_pct']:+.1f}%  ({r['momentum']['direction']})")
+    print("\n📉 Fallers")
+    for r in movers['fallers']:
+        print(f"   {r['player_name']:<25} {r['trend_pct']:+.1f}%  ({r['momentum']['direction']})")
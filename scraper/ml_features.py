@@ -0,0 +1,13 @@
+"""
+ML Features - Input columns of the ML trade model
+
+Shared by ml_trade_advisor.py, which trains and serves the model, and
+model_evaluation.py, which evaluates it offline, so the evaluation harness
+can read the column order without building a Supabase client.
+"""
+
+# Model inputs, in column order
+FEATURE_NAMES = [
+    'stat_component', 'sentiment_component', 'momentum_score',
+    'confidence_score', 'value_score', 'stat_trend', 'sentiment_trend'
+]
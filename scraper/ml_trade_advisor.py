@@ -7,49 +7,76 @@ from supabase import create_client, Client
 import datetime
 import numpy as np
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 import pickle
+import joblib
 import warnings
 warnings.filterwarnings('ignore')
 
+from supabase_pager import iter_pages
+from model_registry import ModelRegistry
+from snapshot_service import get_snapshot
+from ml_features import FEATURE_NAMES
+
 load_dotenv()
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
 supabase: Client = create_client(url, key)
 
+# Players whose last stored sample is older than this (relative to the newest
+# sample) are treated as inactive when choosing how far back to re-read
+ACTIVE_PLAYER_DAYS = 60
+
 class MLTradeAdvisor:
     """Machine Learning-powered trade recommendations"""
     
+    # Scored snapshots shared across instances, keyed by (model_version, value_date)
+    _prediction_cache = {}
+    _prediction_cache_size = 4
+    
+    # Model inputs, in column order (shared with model_evaluation.py)
+    FEATURE_NAMES = FEATURE_NAMES
+    
     def __init__(self):
         self.model = None
+        self.model_version = None
+        self.model_metadata = None
+        self.training_metadata = {}
+        self.registry = ModelRegistry()
         self.model_path = 'ml_trade_model.pkl'
-        self.feature_names = [
-            'stat_component', 'sentiment_component', 'momentum_score',
-            'confidence_score', 'value_score', 'stat_trend', 'sentiment_trend'
-        ]
+        self.feature_names = list(self.FEATURE_NAMES)
         
-    def generate_training_data(self, lookback_days: int = 7) -> pd.DataFrame:
+    def generate_training_data(self, lookback_days: int = 7, since: str = None) -> pd.DataFrame:
         """
         Generate training data by looking at historical value changes.
         Label: 1 if value increased by >5% in next 7 days, 0 otherwise
+        
+        If since is given, only value_index rows on or after that date are read
+        (used by incremental training to materialize just the newest samples).
         """
         print("\n📊 Generating training data from historical player values...")
         
-        # Get all historical data
-        response = supabase.table('player_value_index').select(
+        # Get historical data, page by page (a single read is capped at max-rows)
+        pages = [pd.DataFrame(page) for page in iter_pages(
+            supabase, 'player_value_index',
             'player_id, value_date, value_score, stat_component, '
-            'sentiment_component, momentum_score, confidence_score'
-        ).order('player_id').order('value_date').execute()
+            'sentiment_component, momentum_score, confidence_score',
+            key=('player_id', 'value_date'),
+            filters=(lambda q: q.gte('value_date', since)) if since else None
+        )]
         
-        if not response.data or len(response.data) < 100:
+        if since is None and (not pages or sum(len(p) for p in pages) < 100):
             print("❌ Not enough historical data. Need at least 100 records.")
             return None
+        if not pages:
+            return pd.DataFrame(columns=['player_id', 'date'] + self.feature_names +
+                                ['future_value_change', 'label'])
         
         # Convert to DataFrame
-        df = pd.DataFrame(response.data)
+        df = pd.concat(pages, ignore_index=True)
         df['value_date'] = pd.to_datetime(df['value_date'])
         
         training_samples = []
@@ -103,6 +130,8 @@ class MLTradeAdvisor:
         
         training_df = pd.DataFrame(training_samples)
         print(f"✅ Generated {len(training_df)} training samples")
+        if training_df.empty:
+            return training_df
         print(f"   Profitable trades: {training_df['label'].sum()} ({training_df['label'].mean()*100:.1f}%)")
         print(f"   Unprofitable trades: {(1-training_df['label']).sum()} ({(1-training_df['label']).mean()*100:.1f}%)")
         
@@ -132,11 +161,24 @@ class MLTradeAdvisor:
         )
         
         self.model.fit(X_train, y_train)
+        self.model_version = f"trained-{datetime.datetime.now().isoformat()}"
         
         # Evaluate
         y_pred = self.model.predict(X_test)
         accuracy = accuracy_score(y_test, y_pred)
         
+        # Recorded alongside the model when it's published
+        self.training_metadata = {
+            'training_window': {
+                'start': str(training_df['date'].min()),
+                'end': str(training_df['date'].max())
+            },
+            'accuracy': float(accuracy),
+            'features': list(self.feature_names),
+            'n_samples': int(len(training_df)),
+            'model_params': self.model.get_params()
+        }
+        
         print(f"✅ Model trained successfully!")
         print(f"   Accuracy: {accuracy*100:.1f}%")
         print(f"   Training samples: {len(X_train)}")
@@ -158,50 +200,193 @@ class MLTradeAdvisor:
         
         return accuracy
     
+    @property
+    def sample_store_path(self) -> str:
+        """Materialized training samples kept next to the registry versions"""
+        return self.registry.sample_store_path
+    
+    def load_sample_store(self) -> pd.DataFrame:
+        """Load previously materialized training samples (None if absent)"""
+        if not os.path.exists(self.sample_store_path):
+            return None
+        return pd.read_pickle(self.sample_store_path)
+    
+    def save_sample_store(self, samples: pd.DataFrame):
+        """Atomically replace the materialized training samples"""
+        os.makedirs(self.registry.root, exist_ok=True)
+        tmp_path = f"{self.sample_store_path}.tmp"
+        samples.to_pickle(tmp_path)
+        os.replace(tmp_path, self.sample_store_path)
+        print(f"✅ Saved {len(samples)} training samples to {self.sample_store_path}")
+    
+    def update_sample_store(self, lookback_days: int = 7) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Append only the samples whose forward label became known since the
+        last run. Returns (all_samples, new_samples).
+        """
+        store = self.load_sample_store()
+        if store is None or store.empty:
+            print("ℹ️  No stored training samples yet - materializing full history")
+            samples = self.generate_training_data(lookback_days=lookback_days)
+            if samples is None:
+                return None, None
+            self.save_sample_store(samples)
+            return samples, samples
+        
+        dates = pd.to_datetime(store['date'])
+        last_date = dates.max()
+        # A player's rows after their last stored sample are the ones still
+        # waiting for a label; re-read from the oldest such sample among active
+        # players (at least a margin before the watermark) so each of those
+        # rows comes with its previous row, as in a full run
+        last_by_player = dates.groupby(store['player_id']).max()
+        active = last_by_player[last_by_player >= last_date - datetime.timedelta(days=ACTIVE_PLAYER_DAYS)]
+        since = min(active.min(), last_date - datetime.timedelta(days=lookback_days * 2))
+        since = since.date().isoformat()
+        fresh = self.generate_training_data(lookback_days=lookback_days, since=since)
+        
+        if fresh is None or fresh.empty:
+            return store, fresh
+        
+        fresh = fresh.sort_values(['player_id', 'date'], kind='stable')
+        known = pd.MultiIndex.from_frame(store[['player_id', 'date']])
+        is_new = ~pd.MultiIndex.from_frame(fresh[['player_id', 'date']]).isin(known)
+        # The first row of each player in the re-read window has no previous
+        # row, so its trend features are wrong. Every later new row is kept,
+        # including ones dated before the watermark whose label only just became
+        # known (players with gaps in their games).
+        first_in_window = ~fresh['player_id'].duplicated(keep='first')
+        new_samples = fresh[is_new & ~first_in_window.to_numpy()]
+        
+        samples = pd.concat([store, new_samples], ignore_index=True)
+        self.save_sample_store(samples)
+        print(f"✅ Appended {len(new_samples)} new training samples (watermark was {last_date.date()})")
+        return samples, new_samples
+    
+    def train_incremental(self, samples: pd.DataFrame, new_samples: pd.DataFrame,
+                          mode: str = 'warm_start', trees_per_update: int = 20,
+                          max_trees: int = 400, window_days: int = 60) -> float:
+        """
+        Update the current model without retraining on the full history.
+        
+        mode='warm_start': grow the current forest by trees_per_update trees fit
+            on the new samples only. Falls back to a rolling retrain once the
+            forest reaches max_trees or there is no usable base model.
+        mode='rolling': retrain from scratch on the last window_days of samples.
+        
+        Either way the work per run depends on the update size or window, not
+        on how long the scraper has been running.
+        """
+        if mode == 'warm_start':
+            base_model = None
+            if self.registry.current_version():
+                # Load a private copy - the cached, served model must not change underneath readers
+                base_model, base_metadata, base_version = self.registry.load(private=True)
+            
+            usable = (
+                base_model is not None
+                and getattr(base_model, 'n_estimators', max_trees) + trees_per_update <= max_trees
+                and new_samples is not None and len(new_samples) >= 50
+                and new_samples['label'].nunique() == 2
+            )
+            if usable:
+                return self._grow_forest(base_model, base_metadata, new_samples, trees_per_update)
+            print("ℹ️  Warm start not possible - falling back to a rolling-window retrain")
+        
+        dates = pd.to_datetime(samples['date'])
+        window_start = dates.max() - datetime.timedelta(days=window_days)
+        window_df = samples[dates >= window_start]
+        print(f"🔁 Retraining on rolling window since {window_start.date()} ({len(window_df)} samples)")
+        return self.train_model(window_df)
+    
+    def _grow_forest(self, base_model, base_metadata: Dict, new_samples: pd.DataFrame,
+                     trees_per_update: int) -> float:
+        """Add trees fit on new_samples to a copy of the current forest"""
+        import copy
+        
+        model = copy.deepcopy(base_model)
+        X_new = new_samples[self.feature_names].fillna(0)
+        y_new = new_samples['label']
+        
+        # The new samples are unseen by the current model, so score them first
+        # as an honest out-of-sample accuracy for this update
+        accuracy = accuracy_score(y_new, model.predict(X_new))
+        
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + trees_per_update, n_jobs=-1)
+        model.fit(X_new, y_new)
+        
+        self.model = model
+        self.model_version = f"trained-{datetime.datetime.now().isoformat()}"
+        window = base_metadata.get('training_window', {}) if base_metadata else {}
+        self.training_metadata = {
+            'training_window': {
+                'start': window.get('start', str(new_samples['date'].min())),
+                'end': str(new_samples['date'].max())
+            },
+            'accuracy': float(accuracy),
+            'features': list(self.feature_names),
+            'n_samples': int((base_metadata or {}).get('n_samples', 0) + len(new_samples)),
+            'model_params': model.get_params(),
+            'training_mode': 'warm_start',
+            'parent_version': (base_metadata or {}).get('version')
+        }
+        
+        print(f"✅ Grew forest to {model.n_estimators} trees using {len(new_samples)} new samples")
+        print(f"   Accuracy on new samples (before update): {accuracy*100:.1f}%")
+        return accuracy
+    
     def save_model(self):
-        """Save trained model to disk"""
+        """Publish trained model to the model registry as the current version"""
         if self.model is None:
             print("❌ No model to save")
-            return
+            return None
         
-        with open(self.model_path, 'wb') as f:
-            pickle.dump(self.model, f)
-        print(f"✅ Model saved to {self.model_path}")
+        self.model_version = self.registry.publish(self.model, self.training_metadata)
+        self.model_metadata = self.registry.get_metadata(self.model_version)
+        return self.model_version
     
     def load_model(self):
-        """Load trained model from disk"""
+        """Load the current model from the registry, falling back to the legacy pickle"""
+        try:
+            if self.registry.current_version():
+                self.model, self.model_metadata, self.model_version = self.registry.load()
+                return True
+        except Exception as e:
+            print(f"⚠️  Could not load model from registry: {e}")
+        
+        return self._load_legacy_model()
+    
+    def _load_legacy_model(self):
+        """Load trained model from the legacy pickle file"""
         if not os.path.exists(self.model_path):
             print(f"❌ Model file not found: {self.model_path}")
             return False
         
         with open(self.model_path, 'rb') as f:
             self.model = pickle.load(f)
+        self.model_version = self._file_version(self.model_path)
         print(f"✅ Model loaded from {self.model_path}")
         return True
     
-    def predict_trade_success(self, player_data: Dict) -> Dict:
-        """
-        Predict if trading this player will be profitable
-        Returns: {probability, recommendation, confidence}
-        """
-        if self.model is None:
-            return {'error': 'Model not trained'}
-        
-        # Prepare features
-        features = np.array([[
-            player_data.get('stat_component', 0),
-            player_data.get('sentiment_component', 0),
-            player_data.get('momentum_score', 0),
-            player_data.get('confidence_score', 0),
-            player_data.get('value_score', 50),
-            player_data.get('stat_trend', 0),
-            player_data.get('sentiment_trend', 0)
-        ]])
-        
-        # Get prediction probability
-        probability = self.model.predict_proba(features)[0][1]  # Probability of profitable
-        
-        # Determine recommendation
+    def _file_version(self, path: str) -> str:
+        """Identify a model file by modification time and size"""
+        stat = os.stat(path)
+        return f"{int(stat.st_mtime)}-{stat.st_size}"
+    
+    def _build_feature_matrix(self, records: List[Dict]) -> np.ndarray:
+        """Stack player records into one (n_players x n_features) matrix"""
+        return np.array([[
+            record.get('stat_component', 0),
+            record.get('sentiment_component', 0),
+            record.get('momentum_score', 0),
+            record.get('confidence_score', 0),
+            record.get('value_score', 50),
+            record.get('stat_trend', 0),
+            record.get('sentiment_trend', 0)
+        ] for record in records], dtype=float)
+    
+    def _classify_probability(self, probability: float) -> Dict:
+        """Turn a profit probability into a recommendation"""
         if probability > 0.7:
             recommendation = 'STRONG BUY'
             action = 'buy'
@@ -225,10 +410,89 @@ class MLTradeAdvisor:
             'confidence': 'high' if abs(probability - 0.5) > 0.2 else 'medium'
         }
     
+    def predict_trade_success(self, player_data: Dict) -> Dict:
+        """
+        Predict if trading this player will be profitable
+        Returns: {probability, recommendation, confidence}
+        """
+        if self.model is None:
+            return {'error': 'Model not trained'}
+        
+        return self.predict_batch([player_data])[0]
+    
+    def predict_batch(self, records: List[Dict]) -> List[Dict]:
+        """
+        Score many players with a single predict_proba call.
+        Returns one {probability, recommendation, action, confidence} per record.
+        """
+        if self.model is None:
+            return [{'error': 'Model not trained'} for _ in records]
+        if not records:
+            return []
+        
+        features = self._build_feature_matrix(records)
+        
+        # Spread tree traversal over all cores without touching the shared
+        # (registry-cached) estimator's own n_jobs
+        with joblib.parallel_backend('threading', n_jobs=-1):
+            probabilities = self.model.predict_proba(features)[:, 1]  # Probability of profitable
+        
+        return [self._classify_probability(p) for p in probabilities]
+    
+    def score_snapshot(self, value_date: str) -> List[Dict]:
+        """
+        Score every player in one value_date snapshot, sorted by probability.
+        Memoized per (model_version, value_date) so repeated requests reuse it.
+        """
+        cache_key = (self.model_version, value_date)
+        cached = MLTradeAdvisor._prediction_cache.get(cache_key)
+        if cached is not None:
+            print(f"✅ Using cached ML scores for {value_date}")
+            return cached
+        
+        # Get all players' data for this date (the latest day is already in memory)
+        snapshot = get_snapshot()
+        if snapshot.version == value_date:
+            records = snapshot.records
+        else:
+            response = supabase.table('player_value_index').select(
+                'player_id, value_score, stat_component, sentiment_component, '
+                'momentum_score, confidence_score'
+            ).eq('value_date', value_date).execute()
+            records = response.data or []
+        
+        player_data = []
+        for record in records:
+            # Calculate trends (simplified - using momentum as proxy)
+            player_data.append({
+                **record,
+                'stat_trend': record['momentum_score'] * record['stat_component'] * 0.1,
+                'sentiment_trend': record['momentum_score'] * 0.1
+            })
+        
+        scored = [
+            {'record': record, 'prediction': prediction}
+            for record, prediction in zip(records, self.predict_batch(player_data))
+        ]
+        scored.sort(key=lambda x: x['prediction']['probability'], reverse=True)
+        
+        # Keep only the most recent few snapshots
+        while len(MLTradeAdvisor._prediction_cache) >= MLTradeAdvisor._prediction_cache_size:
+            MLTradeAdvisor._prediction_cache.pop(next(iter(MLTradeAdvisor._prediction_cache)))
+        MLTradeAdvisor._prediction_cache[cache_key] = scored
+        
+        return scored
+    
     def get_ml_recommendations(self, limit: int = 10) -> List[Dict]:
         """Get ML-powered buy recommendations"""
         print("\n🤖 Generating ML-powered recommendations...")
         
+        # Pick up a newly published model version without a restart
+        current_version = self.registry.current_version()
+        if self.model is not None and current_version and current_version != self.model_version:
+            print(f"🔄 Model version changed ({self.model_version} -> {current_version}). Reloading...")
+            self.model = None
+        
         if self.model is None:
             print("❌ Model not loaded. Loading...")
             if not self.load_model():
@@ -236,35 +500,21 @@ class MLTradeAdvisor:
                 return []
         
         # Get latest data
-        latest_date_response = supabase.table('player_value_index').select('value_date').order('value_date', desc=True).limit(1).execute()
-        if not latest_date_response.data:
+        latest = get_snapshot()
+        if not len(latest):
             return []
         
-        latest_date = latest_date_response.data[0]['value_date']
-        
-        # Get all players' latest data
-        response = supabase.table('player_value_index').select(
-            'player_id, value_score, stat_component, sentiment_component, '
-            'momentum_score, confidence_score'
-        ).eq('value_date', latest_date).execute()
+        # Score all players' latest data at once (already sorted by probability)
+        snapshot = self.score_snapshot(latest.version)
         
         recommendations = []
         
-        for record in response.data:
-            # Calculate trends (simplified - using momentum as proxy)
-            stat_trend = record['momentum_score'] * record['stat_component'] * 0.1
-            sentiment_trend = record['momentum_score'] * 0.1
-            
-            player_data = {
-                **record,
-                'stat_trend': stat_trend,
-                'sentiment_trend': sentiment_trend
-            }
+        for scored in snapshot:
+            record = scored['record']
+            prediction = scored['prediction']
             
-            prediction = self.predict_trade_success(player_data)
-            
-            # Only include strong buy signals
-            if prediction['action'] == 'buy' and prediction['probability'] > 0.6:
+            # Only include buy signals (lowered threshold from 0.6 to 0.55)
+            if prediction['action'] == 'buy' and prediction['probability'] > 0.55:
                 recommendations.append({
                     'player_id': record['player_id'],
                     'value_score': record['value_score'],
@@ -276,31 +526,42 @@ class MLTradeAdvisor:
                     'ml_confidence': prediction['confidence']
                 })
         
-        # Sort by probability
-        recommendations.sort(key=lambda x: x['ml_probability'], reverse=True)
-        
         # Get player names
         if recommendations:
-            player_ids = [r['player_id'] for r in recommendations[:limit]]
-            players_response = supabase.table('players').select('id, full_name, team_name, position').in_('id', player_ids).execute()
-            players_map = {p['id']: p for p in players_response.data}
-            
             for rec in recommendations[:limit]:
-                player = players_map.get(rec['player_id'])
+                player = latest.player(rec['player_id'])
                 if player:
                     rec['player_name'] = player['full_name']
                     rec['team'] = player['team_name']
                     rec['position'] = player['position']
         
-        print(f"✅ Found {len(recommendations[:limit])} ML-powered buy opportunities")
+        result_count = len(recommendations[:limit])
+        print(f"✅ Found {result_count} ML-powered buy opportunities")
+        
+        if result_count == 0:
+            print(f"ℹ️  Checked {len(snapshot)} players, none met criteria (probability > 0.55 and action == 'buy')")
+        
         return recommendations[:limit]
 
-def train_and_save():
-    """Main function to train and save the model"""
+def train_and_save(incremental: bool = False, mode: str = 'warm_start', window_days: int = 60):
+    """
+    Main function to train and save the model
+    
+    Args:
+        incremental: Reuse stored training samples and only materialize new
+                     dates instead of regenerating the full history
+        mode: Incremental update strategy - 'warm_start' or 'rolling'
+        window_days: Size of the rolling retrain window
+    """
     advisor = MLTradeAdvisor()
     
-    # Generate training data
-    training_df = advisor.generate_training_data(lookback_days=7)
+    if incremental:
+        training_df, new_samples = advisor.update_sample_store(lookback_days=7)
+    else:
+        # Generate training data
+        training_df = advisor.generate_training_data(lookback_days=7)
+        if training_df is not None:
+            advisor.save_sample_store(training_df)
     
     if training_df is None or len(training_df) < 50:
         print("❌ Not enough data to train. Need more historical data.")
@@ -308,24 +569,32 @@ def train_and_save():
         return
     
     # Train model
-    accuracy = advisor.train_model(training_df)
-    
-    # Save model
-    advisor.save_model()
+    if incremental:
+        if new_samples is not None and new_samples.empty:
+            print("ℹ️  No new labeled samples since the last run - keeping the current model")
+            return
+        accuracy = advisor.train_incremental(training_df, new_samples, mode=mode, window_days=window_days)
+    else:
+        accuracy = advisor.train_model(training_df)
     
-    # Copy to api folder
-    import shutil
-    api_model_path = os.path.join(os.path.dirname(__file__), '../api/ml_trade_model.pkl')
-    try:
-        shutil.copy(advisor.model_path, api_model_path)
-        print(f"✅ Model copied to {api_model_path}")
-    except Exception as e:
-        print(f"⚠️  Could not copy to api folder: {e}")
+    # Publish to the registry (the API picks up the new version on its next request)
+    version = advisor.save_model()
     
     print(f"\n✅ ML Trade Advisor trained and saved!")
     print(f"   Model accuracy: {accuracy*100:.1f}%")
-    print(f"   Model saved to: {advisor.model_path}")
+    print(f"   Model version: {version} ({advisor.registry.root})")
     print(f"   Ready to use for predictions")
 
 if __name__ == "__main__":
-    train_and_save()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train the ML trade model")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only add samples for newly labeled dates instead of a full retrain")
+    parser.add_argument('--mode', choices=['warm_start', 'rolling'], default='warm_start',
+                        help="Incremental strategy: grow the forest or retrain on a rolling window")
+    parser.add_argument('--window-days', type=int, default=60,
+                        help="Rolling window size in days")
+    args = parser.parse_args()
+    
+    train_and_save(incremental=args.incremental, mode=args.mode, window_days=args.window_days)
@@ -0,0 +1,274 @@
+"""
+Model Evaluation - Walk-forward hyperparameter search for the ML trade model
+
+Runs entirely offline against the materialized training samples written by
+ml_trade_advisor.py (or any pickle/CSV with the same columns). Each forest
+configuration is scored on walk-forward splits by value date, so a model is
+only ever tested on dates after everything it was trained on, and the
+(configuration, fold) jobs are spread across a process pool.
+
+Usage:
+    python model_evaluation.py                       # evaluate + publish best
+    python model_evaluation.py --no-publish --json results.json
+"""
+import os
+import json
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from model_registry import ModelRegistry
+from ml_features import FEATURE_NAMES
+
+# MLTradeAdvisor labels anything above this probability a BUY
+BUY_THRESHOLD = 0.55
+
+# Precision over fewer BUY signals than this (across all folds) is too noisy
+# to rank on; ranking uses the lower end of its confidence interval anyway
+MIN_BUY_SIGNALS = 30
+PRECISION_CONFIDENCE_Z = 1.96
+
+# Forward-label horizon in days; training data this close to a test fold
+# would have labels that peek into it
+LABEL_HORIZON_DAYS = 7
+
+DEFAULT_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [6, 10, None],
+}
+
+BASE_PARAMS = {
+    'min_samples_split': 20,
+    'min_samples_leaf': 10,
+    'random_state': 42,
+    'class_weight': 'balanced',
+}
+
+# Dataset shared with worker processes (set once per worker by the initializer)
+_X = None
+_y = None
+
+
+def load_dataset(path: str = None) -> pd.DataFrame:
+    """Load cached training samples (pickle or CSV) sorted by date"""
+    path = path or ModelRegistry().sample_store_path
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"No cached training samples at {path}. "
+            "Run `python ml_trade_advisor.py` once to materialize them."
+        )
+
+    df = pd.read_csv(path) if path.endswith('.csv') else pd.read_pickle(path)
+    df['date'] = pd.to_datetime(df['date'])
+    return df.sort_values('date').reset_index(drop=True)
+
+
+def walk_forward_splits(dates: pd.Series, n_splits: int = 4,
+                        embargo_days: int = LABEL_HORIZON_DAYS) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Expanding-window splits by date. The unique dates are cut into
+    n_splits + 1 blocks; fold k tests on block k+1 and trains on everything
+    strictly before it minus an embargo of embargo_days.
+    """
+    unique_dates = np.sort(dates.unique())
+    blocks = np.array_split(unique_dates, n_splits + 1)
+    values = dates.values
+    embargo = np.timedelta64(embargo_days, 'D')
+
+    splits = []
+    for block in blocks[1:]:
+        if len(block) == 0:
+            continue
+        test_start, test_end = block[0], block[-1]
+        train_idx = np.flatnonzero(values < test_start - embargo)
+        test_idx = np.flatnonzero((values >= test_start) & (values <= test_end))
+        if len(train_idx) and len(test_idx):
+            splits.append((train_idx, test_idx))
+    return splits
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _evaluate_fold(params: Dict, train_idx: np.ndarray, test_idx: np.ndarray) -> Dict:
+    """Fit one configuration on one fold and score it"""
+    y_train = _y[train_idx]
+    if len(np.unique(y_train)) < 2:
+        return None
+
+    model = RandomForestClassifier(**BASE_PARAMS, **params, n_jobs=1)
+
+    start = time.perf_counter()
+    model.fit(_X[train_idx], y_train)
+    train_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    probabilities = model.predict_proba(_X[test_idx])[:, 1]
+    inference_time = time.perf_counter() - start
+
+    y_test = _y[test_idx]
+    predicted = (probabilities > 0.5).astype(int)
+    buys = probabilities > BUY_THRESHOLD
+
+    return {
+        'accuracy': float((predicted == y_test).mean()),
+        'precision_at_buy': float(y_test[buys].mean()) if buys.any() else None,
+        'buy_signals': int(buys.sum()),
+        'buy_hits': int(y_test[buys].sum()),
+        'test_samples': int(len(test_idx)),
+        'train_time': train_time,
+        'inference_time': inference_time,
+    }
+
+
+def precision_lower_bound(hits: int, signals: int, z: float = PRECISION_CONFIDENCE_Z):
+    """Wilson score lower bound of hits / signals (None without signals)"""
+    if not signals:
+        return None
+    p = hits / signals
+    denominator = 1 + z * z / signals
+    centre = p + z * z / (2 * signals)
+    margin = z * np.sqrt(p * (1 - p) / signals + z * z / (4 * signals * signals))
+    return float((centre - margin) / denominator)
+
+
+def _summarize(params: Dict, folds: List[Dict]) -> Dict:
+    """Average fold metrics for one configuration"""
+    folds = [f for f in folds if f is not None]
+    precisions = [f['precision_at_buy'] for f in folds if f['precision_at_buy'] is not None]
+    test_samples = sum(f['test_samples'] for f in folds)
+    buy_signals = sum(f['buy_signals'] for f in folds)
+    return {
+        'params': params,
+        'folds': len(folds),
+        'accuracy': float(np.mean([f['accuracy'] for f in folds])) if folds else None,
+        'precision_at_buy': float(np.mean(precisions)) if precisions else None,
+        'buy_signals': buy_signals,
+        'precision_lower_bound': precision_lower_bound(sum(f['buy_hits'] for f in folds), buy_signals),
+        'train_time': sum(f['train_time'] for f in folds),
+        'inference_time_per_1k': (sum(f['inference_time'] for f in folds) / test_samples * 1000)
+                                 if test_samples else None,
+    }
+
+
+def evaluate_grid(df: pd.DataFrame, grid: Dict = None, n_splits: int = 4,
+                  max_workers: int = None) -> List[Dict]:
+    """Score every configuration in the grid across walk-forward folds"""
+    grid = grid or DEFAULT_GRID
+    configs = [dict(zip(grid.keys(), values)) for values in itertools.product(*grid.values())]
+    splits = walk_forward_splits(df['date'], n_splits=n_splits)
+    if not splits:
+        raise ValueError("Not enough distinct dates for walk-forward evaluation")
+
+    X = df[FEATURE_NAMES].fillna(0).to_numpy(dtype=float)
+    y = df['label'].to_numpy(dtype=int)
+
+    print(f"🧪 Evaluating {len(configs)} configurations x {len(splits)} walk-forward folds "
+          f"on {len(df)} samples...")
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(X, y)) as pool:
+        futures = {
+            (i, j): pool.submit(_evaluate_fold, params, train_idx, test_idx)
+            for i, params in enumerate(configs)
+            for j, (train_idx, test_idx) in enumerate(splits)
+        }
+        results = [
+            _summarize(params, [futures[(i, j)].result() for j in range(len(splits))])
+            for i, params in enumerate(configs)
+        ]
+
+    return results
+
+
+def pick_best(results: List[Dict], metric: str = 'precision_at_buy') -> Dict:
+    """
+    Best configuration by metric, ties broken by accuracy. precision_at_buy
+    only considers configurations with at least MIN_BUY_SIGNALS BUYs and
+    ranks them by the lower confidence bound of their pooled precision, so
+    a few lucky BUYs can't beat hundreds of good ones.
+    """
+    if metric == 'precision_at_buy':
+        scored = [r for r in results
+                  if r['precision_lower_bound'] is not None and r['buy_signals'] >= MIN_BUY_SIGNALS]
+        if scored:
+            return max(scored, key=lambda r: (r['precision_lower_bound'], r['accuracy'] or 0))
+        print(f"⚠️  No configuration produced {MIN_BUY_SIGNALS}+ BUY signals - ranking by accuracy")
+    scored = [r for r in results if r['accuracy'] is not None]
+    return max(scored, key=lambda r: (r['accuracy'], r['precision_lower_bound'] or 0))
+
+
+def print_report(results: List[Dict]):
+    """Print one line per configuration"""
+    print(f"\n{'n_estimators':>12} {'max_depth':>9} {'accuracy':>9} {'prec@buy':>9} {'prec_low':>9} "
+          f"{'buys':>6} {'train_s':>8} {'infer_ms/1k':>11}")
+    print("-" * 80)
+    for r in results:
+        p = r['params']
+        accuracy = f"{r['accuracy']*100:.1f}%" if r['accuracy'] is not None else 'n/a'
+        precision = f"{r['precision_at_buy']*100:.1f}%" if r['precision_at_buy'] is not None else 'n/a'
+        lower = f"{r['precision_lower_bound']*100:.1f}%" if r['precision_lower_bound'] is not None else 'n/a'
+        inference = f"{r['inference_time_per_1k']*1000:.1f}" if r['inference_time_per_1k'] is not None else 'n/a'
+        print(f"{p['n_estimators']:>12} {str(p['max_depth']):>9} {accuracy:>9} {precision:>9} {lower:>9} "
+              f"{r['buy_signals']:>6} {r['train_time']:>8.2f} {inference:>11}")
+
+
+def publish_best(df: pd.DataFrame, best: Dict, results: List[Dict],
+                 registry: ModelRegistry = None) -> str:
+    """Refit the best configuration on all samples and publish it"""
+    registry = registry or ModelRegistry()
+    model = RandomForestClassifier(**BASE_PARAMS, **best['params'])
+    model.fit(df[FEATURE_NAMES].fillna(0), df['label'])
+
+    return registry.publish(model, {
+        'training_window': {'start': str(df['date'].min()), 'end': str(df['date'].max())},
+        'accuracy': best['accuracy'],
+        'precision_at_buy': best['precision_at_buy'],
+        'features': FEATURE_NAMES,
+        'n_samples': int(len(df)),
+        'model_params': model.get_params(),
+        'training_mode': 'walk_forward_search',
+        'evaluation': results,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward evaluation of trade model configurations")
+    parser.add_argument('--dataset', help="Training samples (.pkl or .csv); defaults to the registry cache")
+    parser.add_argument('--splits', type=int, default=4, help="Number of walk-forward folds")
+    parser.add_argument('--n-estimators', type=int, nargs='+', default=DEFAULT_GRID['n_estimators'])
+    parser.add_argument('--max-depth', type=lambda v: None if v.lower() == 'none' else int(v),
+                        nargs='+', default=DEFAULT_GRID['max_depth'])
+    parser.add_argument('--metric', choices=['precision_at_buy', 'accuracy'], default='precision_at_buy')
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size")
+    parser.add_argument('--json', help="Write full results to this file")
+    parser.add_argument('--no-publish', action='store_true', help="Don't publish the best model")
+    args = parser.parse_args()
+
+    df = load_dataset(args.dataset)
+    grid = {'n_estimators': args.n_estimators, 'max_depth': args.max_depth}
+    results = evaluate_grid(df, grid=grid, n_splits=args.splits, max_workers=args.workers)
+    print_report(results)
+
+    best = pick_best(results, args.metric)
+    print(f"\n🏆 Best configuration ({args.metric}): {best['params']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"✅ Results written to {args.json}")
+
+    if not args.no_publish:
+        publish_best(df, best, results)
+
+
+if __name__ == "__main__":
+    main()
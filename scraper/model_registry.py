@@ -0,0 +1,184 @@
+"""
+Model Registry - Versioned local storage for trained models
+
+Each published model lives in its own version directory with a joblib
+artifact and a metadata.json (training window, accuracy, feature list).
+A CURRENT file points at the live version and is swapped atomically, so
+readers never see a half-written model. Loaded models are cached per
+process; each process holds its own copy (sklearn trees copy their node
+arrays on unpickling, so memory-mapping the artifact would not share them).
+"""
+import os
+import json
+import shutil
+import datetime
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+
+DEFAULT_REGISTRY_DIR = os.environ.get(
+    'MODEL_REGISTRY_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_registry')
+)
+
+MODEL_FILE = 'model.joblib'
+METADATA_FILE = 'metadata.json'
+POINTER_FILE = 'CURRENT'
+SAMPLE_STORE_FILE = 'training_samples.pkl'
+
+
+def _version_order(version: str) -> Tuple[str, int]:
+    """Sort key for version ids: timestamp, then numeric suffix (-2 before -10)"""
+    parts = version.split('-')
+    suffix = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 1
+    return '-'.join(parts[:2]), suffix
+
+
+class ModelRegistry:
+    """Versioned model artifacts with an atomic "current" pointer"""
+
+    # Models already loaded in this process, keyed by (root, version)
+    _loaded = {}
+    _lock = threading.Lock()
+
+    def __init__(self, root: str = None):
+        self.root = os.path.abspath(root or DEFAULT_REGISTRY_DIR)
+
+    @property
+    def sample_store_path(self) -> str:
+        """Materialized training samples shared by training and evaluation"""
+        return os.path.join(self.root, SAMPLE_STORE_FILE)
+
+    def _version_dir(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def _new_version_id(self) -> str:
+        """Timestamp-based version id, unique within the registry"""
+        base = datetime.datetime.now().strftime('v%Y%m%d-%H%M%S')
+        version = base
+        suffix = 1
+        while os.path.exists(self._version_dir(version)):
+            suffix += 1
+            version = f"{base}-{suffix}"
+        return version
+
+    def publish(self, model, metadata: Dict, make_current: bool = True) -> str:
+        """
+        Store a model as a new version and (by default) make it current.
+        The version directory is written under a temp name and renamed into
+        place, so a crash mid-write never leaves a partial version behind.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        version = self._new_version_id()
+        tmp_dir = os.path.join(self.root, f".tmp-{version}")
+        os.makedirs(tmp_dir)
+
+        joblib.dump(model, os.path.join(tmp_dir, MODEL_FILE))
+
+        metadata = {
+            **metadata,
+            'version': version,
+            'created_at': datetime.datetime.now().isoformat()
+        }
+        with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+            json.dump(metadata, f, indent=2, default=str)
+
+        os.rename(tmp_dir, self._version_dir(version))
+        print(f"✅ Published model version {version} to {self.root}")
+
+        if make_current:
+            self.set_current(version)
+        return version
+
+    def set_current(self, version: str):
+        """Atomically point CURRENT at an existing version"""
+        if not os.path.exists(os.path.join(self._version_dir(version), MODEL_FILE)):
+            raise ValueError(f"Unknown model version: {version}")
+
+        tmp_pointer = os.path.join(self.root, f".{POINTER_FILE}.{os.getpid()}")
+        with open(tmp_pointer, 'w') as f:
+            f.write(version)
+        os.replace(tmp_pointer, os.path.join(self.root, POINTER_FILE))
+        print(f"✅ Current model version is now {version}")
+
+    def current_version(self) -> Optional[str]:
+        """Version CURRENT points at, or None if nothing is published"""
+        try:
+            with open(os.path.join(self.root, POINTER_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def list_versions(self) -> List[str]:
+        """All published versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            (name for name in os.listdir(self.root)
+             if os.path.exists(os.path.join(self._version_dir(name), MODEL_FILE))),
+            key=_version_order
+        )
+
+    def get_metadata(self, version: str = None) -> Optional[Dict]:
+        """Metadata for a version (default: current)"""
+        version = version or self.current_version()
+        if not version:
+            return None
+        with open(os.path.join(self._version_dir(version), METADATA_FILE)) as f:
+            return json.load(f)
+
+    def load(self, version: str = None, private: bool = False) -> Tuple[object, Dict, str]:
+        """
+        Load a version (default: current) as (model, metadata, version).
+        Loaded models are cached per process, so this is cheap when the
+        version hasn't changed and picks up a new CURRENT without a restart.
+        private=True returns a fresh, uncached copy that is safe to modify.
+        """
+        version = version or self.current_version()
+        if not version:
+            raise FileNotFoundError(f"No model published in {self.root}")
+
+        if private:
+            model = joblib.load(os.path.join(self._version_dir(version), MODEL_FILE))
+            return model, self.get_metadata(version), version
+
+        cache_key = (self.root, version)
+        with ModelRegistry._lock:
+            cached = ModelRegistry._loaded.get(cache_key)
+            if cached is None:
+                model = joblib.load(os.path.join(self._version_dir(version), MODEL_FILE))
+                cached = (model, self.get_metadata(version))
+                # Drop other versions of this registry - they're no longer served
+                for key in [k for k in ModelRegistry._loaded if k[0] == self.root]:
+                    del ModelRegistry._loaded[key]
+                ModelRegistry._loaded[cache_key] = cached
+                print(f"✅ Loaded model version {version}")
+
+        model, metadata = cached
+        return model, metadata, version
+
+    def prune(self, keep: int = 5) -> List[str]:
+        """Delete all but the newest `keep` versions (never the current one)"""
+        current = self.current_version()
+        versions = self.list_versions()
+        removed = []
+        for version in versions[:-keep] if keep > 0 else versions:
+            if version == current:
+                continue
+            shutil.rmtree(self._version_dir(version), ignore_errors=True)
+            removed.append(version)
+        return removed
+
+
+if __name__ == "__main__":
+    registry = ModelRegistry()
+    current = registry.current_version()
+    print(f"Registry: {registry.root}")
+    for version in registry.list_versions():
+        meta = registry.get_metadata(version)
+        marker = '*' if version == current else ' '
+        accuracy = meta.get('accuracy')
+        accuracy_text = f"{accuracy*100:.1f}%" if accuracy is not None else 'n/a'
+        print(f" {marker} {version}  accuracy={accuracy_text}  "
+              f"window={meta.get('training_window', {}).get('start')}..{meta.get('training_window', {}).get('end')}")
@@ -0,0 +1,479 @@
+"""
+Odds History - Every bookmaker's prop lines over time, plus a best-price index
+
+Each Odds API fetch is appended as an immutable columnar segment (Parquet
+when pyarrow is installed, compressed NumPy otherwise) with one row per
+(timestamp, bookmaker, player, market, line, over odds, under odds); string
+columns are dictionary-encoded. Line movement for a prop is a filtered read
+of those segments.
+
+Alongside, an in-memory index keeps each bookmaker's latest quote and, per
+prop, one heap for the best over (lowest line, then best price) and one for
+the best under (highest line, then best price). A new quote is pushed in
+O(log n); entries it supersedes, or that have gone stale, are dropped lazily
+when they reach the top of a heap.
+
+Usage:
+    python odds_history.py fetch     # record one Odds API snapshot
+    python odds_history.py compact   # merge each finished day's segments into one file
+"""
+import os
+import glob
+import heapq
+import time
+import argparse
+import datetime
+import itertools
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from prop_edges import american_to_decimal
+from player_names import normalize_player_name
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet is optional; segments fall back to .npz
+    pa = pq = None
+
+DEFAULT_HISTORY_DIR = os.environ.get(
+    'ODDS_HISTORY_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'odds_history')
+)
+
+STRING_COLUMNS = ['bookmaker', 'player', 'market', 'home_team', 'away_team']
+NUMBER_COLUMNS = ['line', 'over_odds', 'under_odds']
+
+QUOTE_MAX_AGE_HOURS = 6  # Quotes older than this no longer count as available
+SEGMENT_CACHE_SIZE = 64
+OVER, UNDER = 0, 1
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+def _iso(timestamp_ms: int) -> str:
+    return datetime.datetime.fromtimestamp(timestamp_ms / 1000, datetime.timezone.utc).isoformat()
+
+def _number(value):
+    """None for missing, int for whole numbers (American odds), float otherwise"""
+    if value is None or not np.isfinite(value):
+        return None
+    return int(value) if float(value).is_integer() else float(value)
+
+class Segment:
+    """One immutable batch of odds ticks as columns"""
+
+    def __init__(self, timestamps: np.ndarray, numbers: Dict[str, np.ndarray],
+                 strings: Dict[str, Tuple[np.ndarray, List[str]]]):
+        self.timestamps = timestamps  # int64 epoch milliseconds (UTC)
+        self.numbers = numbers        # float arrays, NaN where missing
+        self.strings = strings        # column -> (int32 codes, values)
+        self._lookup = {}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def from_ticks(cls, ticks: List[Dict]) -> 'Segment':
+        strings = {}
+        for column in STRING_COLUMNS:
+            values = {}
+            codes = np.array([values.setdefault(t.get(column) or '', len(values)) for t in ticks], dtype=np.int32)
+            strings[column] = (codes, list(values))
+        numbers = {
+            column: np.array([np.nan if t.get(column) is None else t[column] for t in ticks], dtype=float)
+            for column in NUMBER_COLUMNS
+        }
+        return cls(np.array([t['timestamp'] for t in ticks], dtype=np.int64), numbers, strings)
+
+    def code(self, column: str, value: str) -> int:
+        """Dictionary code of a string value in this segment (-1 if absent)"""
+        if column not in self._lookup:
+            self._lookup[column] = {v: i for i, v in enumerate(self.strings[column][1])}
+        return self._lookup[column].get(value, -1)
+
+    def value(self, column: str, row: int) -> Optional[str]:
+        codes, values = self.strings[column]
+        return values[codes[row]] or None
+
+    def write(self, path: str):
+        """Write atomically (temp file + rename)"""
+        tmp_path = os.path.join(os.path.dirname(path), '.tmp-' + os.path.basename(path))
+        if path.endswith('.parquet'):
+            table = pa.table({
+                'timestamp': pa.array(self.timestamps, pa.int64()),
+                **{c: pa.array(self.numbers[c], pa.float64(), from_pandas=True) for c in NUMBER_COLUMNS},
+                **{
+                    c: pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), pa.array(values, pa.string()))
+                    for c, (codes, values) in self.strings.items()
+                }
+            })
+            pq.write_table(table, tmp_path)
+        else:
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(
+                    f, timestamp=self.timestamps, **self.numbers,
+                    **{f'{c}__codes': codes for c, (codes, _) in self.strings.items()},
+                    **{f'{c}__values': np.array(values, dtype=str) for c, (_, values) in self.strings.items()}
+                )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read(cls, path: str) -> 'Segment':
+        if path.endswith('.parquet'):
+            table = pq.read_table(path)
+            strings = {}
+            for column in STRING_COLUMNS:
+                array = table.column(column).combine_chunks()
+                if not pa.types.is_dictionary(array.type):
+                    array = array.dictionary_encode()
+                strings[column] = (
+                    array.indices.to_numpy(zero_copy_only=False).astype(np.int32),
+                    array.dictionary.to_pylist()
+                )
+            return cls(
+                table.column('timestamp').to_numpy().astype(np.int64),
+                {c: table.column(c).to_numpy().astype(float) for c in NUMBER_COLUMNS},
+                strings
+            )
+
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data['timestamp'],
+                {c: data[c] for c in NUMBER_COLUMNS},
+                {c: (data[f'{c}__codes'], data[f'{c}__values'].tolist()) for c in STRING_COLUMNS}
+            )
+
+    @classmethod
+    def concat(cls, segments: Sequence['Segment']) -> 'Segment':
+        """One segment with every row of the given ones, ordered by timestamp"""
+        timestamps = np.concatenate([s.timestamps for s in segments])
+        order = np.argsort(timestamps, kind='stable')
+        strings = {}
+        for column in STRING_COLUMNS:
+            values = list(dict.fromkeys(v for s in segments for v in s.strings[column][1]))
+            index = {v: i for i, v in enumerate(values)}
+            codes = np.concatenate([
+                np.array([index[v] for v in s.strings[column][1]], dtype=np.int32)[s.strings[column][0]]
+                for s in segments
+            ])
+            strings[column] = (codes[order], values)
+        numbers = {c: np.concatenate([s.numbers[c] for s in segments])[order] for c in NUMBER_COLUMNS}
+        return cls(timestamps[order], numbers, strings)
+
+class OddsHistory:
+    """Append-only odds segments on disk plus the live best-price index"""
+
+    # How long to trust the segment listing before looking for files from other processes
+    check_interval = 30
+
+    def __init__(self, root: str = None):
+        self.root = os.path.abspath(root or DEFAULT_HISTORY_DIR)
+        self._lock = threading.RLock()
+        self._segments = OrderedDict()  # path -> Segment (LRU)
+        self._applied = set()           # segment files already folded into the index
+        self._checked_at = 0.0
+        self._counter = itertools.count()
+
+        # (player, market) -> {bookmaker key: latest quote}, and its two heaps
+        self._quotes: Dict[Tuple[str, str], Dict[str, Dict]] = {}
+        self._heaps: Dict[Tuple[str, str], Tuple[List, List]] = {}
+        self._seq = itertools.count()
+
+    # --- segments ---
+
+    @property
+    def extension(self) -> str:
+        return '.parquet' if pq is not None else '.npz'
+
+    def segment_paths(self, since_ms: int = None) -> List[str]:
+        """Segment files in time order (optionally only days on or after since_ms)"""
+        paths = [
+            p for p in glob.glob(os.path.join(self.root, 'odds-*'))
+            if p.endswith('.npz') or (p.endswith('.parquet') and pq is not None)
+        ]
+        if since_ms is not None:
+            first_day = _iso(since_ms)[:10].replace('-', '')
+            paths = [p for p in paths if os.path.basename(p)[5:13] >= first_day]
+        return sorted(paths)
+
+    def _segment(self, path: str) -> Segment:
+        if path in self._segments:
+            self._segments.move_to_end(path)
+            return self._segments[path]
+        segment = Segment.read(path)
+        self._segments[path] = segment
+        if len(self._segments) > SEGMENT_CACHE_SIZE:
+            self._segments.popitem(last=False)
+        return segment
+
+    def _new_segment_path(self, timestamp_ms: int, suffix: str = None) -> str:
+        stamp = datetime.datetime.fromtimestamp(timestamp_ms / 1000, datetime.timezone.utc).strftime('%Y%m%dT%H%M%S')
+        suffix = suffix or f"{os.getpid()}-{next(self._counter)}"
+        return os.path.join(self.root, f"odds-{stamp}-{suffix}{self.extension}")
+
+    def record(self, props: List[Dict], timestamp_ms: int = None) -> int:
+        """
+        Append one fetch (OddsAPIClient.get_player_props rows) as a segment
+        and fold it into the index. Returns the number of ticks stored.
+        """
+        timestamp_ms = timestamp_ms or _now_ms()
+        ticks = [
+            {
+                'timestamp': timestamp_ms,
+                'bookmaker': prop.get('bookmaker') or 'unknown',
+                'player': normalize_player_name(prop['player_name']),
+                'market': prop['prop_type'].replace('player_', ''),
+                'line': prop['line'],
+                'over_odds': prop.get('over_odds'),
+                'under_odds': prop.get('under_odds'),
+                'home_team': prop.get('home_team'),
+                'away_team': prop.get('away_team')
+            }
+            for prop in props if prop.get('player_name') and prop.get('line') is not None
+        ]
+        if not ticks:
+            return 0
+
+        segment = Segment.from_ticks(ticks)
+        os.makedirs(self.root, exist_ok=True)
+        path = self._new_segment_path(timestamp_ms)
+        segment.write(path)
+
+        with self._lock:
+            self._segments[path] = segment
+            self._apply_segment(path, segment)
+        return len(ticks)
+
+    # --- best-price index ---
+
+    def _apply_quote(self, quote: Dict):
+        prop = (quote['player'], quote['market'])
+        book = quote['bookmaker'].lower()
+        books = self._quotes.setdefault(prop, {})
+        current = books.get(book)
+        if current is not None and current['timestamp'] > quote['timestamp']:
+            return  # An older tick replayed from another process's segment
+
+        quote['seq'] = next(self._seq)
+        books[book] = quote
+        heaps = self._heaps.setdefault(prop, ([], []))
+        if quote['over_odds'] is not None:
+            heapq.heappush(heaps[OVER], (quote['line'], -float(american_to_decimal(quote['over_odds'])), quote['seq'], book))
+        if quote['under_odds'] is not None:
+            heapq.heappush(heaps[UNDER], (-quote['line'], -float(american_to_decimal(quote['under_odds'])), quote['seq'], book))
+
+        # Superseded entries pile up between lookups; rebuild from live quotes now and then
+        if len(heaps[OVER]) + len(heaps[UNDER]) > 4 * len(books) + 32:
+            self._rebuild_heaps(prop)
+
+    def _rebuild_heaps(self, prop: Tuple[str, str]):
+        over, under = [], []
+        for book, quote in self._quotes[prop].items():
+            if quote['over_odds'] is not None:
+                over.append((quote['line'], -float(american_to_decimal(quote['over_odds'])), quote['seq'], book))
+            if quote['under_odds'] is not None:
+                under.append((-quote['line'], -float(american_to_decimal(quote['under_odds'])), quote['seq'], book))
+        heapq.heapify(over)
+        heapq.heapify(under)
+        self._heaps[prop] = (over, under)
+
+    def _apply_segment(self, path: str, segment: Segment):
+        """Fold a segment's latest quote per (player, market, bookmaker) into the index"""
+        self._applied.add(path)
+        if not len(segment):
+            return
+        keys = np.stack([segment.strings[c][0] for c in ('player', 'market', 'bookmaker')], axis=1)
+        # Last row of each key (rows are in timestamp order)
+        _, first_from_end = np.unique(keys[::-1], axis=0, return_index=True)
+        for row in np.sort(len(segment) - 1 - first_from_end):
+            self._apply_quote({
+                'timestamp': int(segment.timestamps[row]),
+                **{c: segment.value(c, row) for c in STRING_COLUMNS},
+                **{c: _number(segment.numbers[c][row]) for c in NUMBER_COLUMNS}
+            })
+
+    def refresh(self, force: bool = False):
+        """Fold in segments written by other processes since the last check"""
+        with self._lock:
+            now = time.time()
+            if not force and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            since_ms = _now_ms() - QUOTE_MAX_AGE_HOURS * 3600 * 1000
+            # Segments from days before the window are never listed again
+            first_day = _iso(since_ms)[:10].replace('-', '')
+            self._applied = {p for p in self._applied if os.path.basename(p)[5:13] >= first_day}
+            for path in self.segment_paths(since_ms):
+                if path not in self._applied:
+                    try:
+                        self._apply_segment(path, self._segment(path))
+                    except Exception as e:
+                        print(f"⚠️  Skipping unreadable odds segment {os.path.basename(path)}: {e}")
+                        self._applied.add(path)
+
+    def _top(self, prop: Tuple[str, str], side: int, oldest_ms: int) -> Optional[Dict]:
+        heap = self._heaps[prop][side]
+        books = self._quotes[prop]
+        while heap:
+            _, _, seq, book = heap[0]
+            quote = books.get(book)
+            if quote is None or quote['seq'] != seq:
+                heapq.heappop(heap)  # Superseded by a newer quote from the same book
+                continue
+            if quote['timestamp'] < oldest_ms:
+                heapq.heappop(heap)  # Stale: the book has stopped quoting this prop
+                del books[book]
+                continue
+            return quote
+        return None
+
+    @staticmethod
+    def _format(quote: Optional[Dict], side: str = None) -> Optional[Dict]:
+        if quote is None:
+            return None
+        formatted = {
+            'bookmaker': quote['bookmaker'],
+            'line': quote['line'],
+            'timestamp': _iso(quote['timestamp'])
+        }
+        if side:
+            formatted['odds'] = quote[f'{side}_odds']
+        else:
+            formatted.update(over_odds=quote['over_odds'], under_odds=quote['under_odds'])
+        return formatted
+
+    def best_prices(self, player_name: str, market: str = None,
+                    max_age_hours: float = QUOTE_MAX_AGE_HOURS) -> Dict[str, Dict]:
+        """
+        Best available over and under per market for a player, plus every
+        bookmaker's current quote.
+        """
+        self.refresh()
+        player = normalize_player_name(player_name)
+        oldest_ms = _now_ms() - int(max_age_hours * 3600 * 1000)
+        with self._lock:
+            markets = [market] if market else sorted(m for p, m in self._quotes if p == player)
+            result = {}
+            for m in markets:
+                prop = (player, m)
+                if prop not in self._quotes:
+                    continue
+                best_over = self._top(prop, OVER, oldest_ms)
+                best_under = self._top(prop, UNDER, oldest_ms)
+                books = [q for q in self._quotes[prop].values() if q['timestamp'] >= oldest_ms]
+                if not books:
+                    continue
+                result[m] = {
+                    'best_over': self._format(best_over, 'over'),
+                    'best_under': self._format(best_under, 'under'),
+                    'books': sorted((self._format(q) for q in books), key=lambda q: q['bookmaker'])
+                }
+            return result
+
+    # --- history ---
+
+    def movement(self, player_name: str, market: str, hours: float = 24,
+                 bookmaker: str = None, changes_only: bool = True) -> List[Dict]:
+        """
+        Every recorded quote for one prop over the last `hours`, oldest first.
+        changes_only keeps a tick only when that bookmaker's line or odds moved.
+        """
+        player = normalize_player_name(player_name)
+        since_ms = _now_ms() - int(hours * 3600 * 1000)
+        ticks = []
+        with self._lock:
+            for path in self.segment_paths(since_ms):
+                try:
+                    segment = self._segment(path)
+                except Exception as e:
+                    print(f"⚠️  Skipping unreadable odds segment {os.path.basename(path)}: {e}")
+                    continue
+                player_code = segment.code('player', player)
+                market_code = segment.code('market', market)
+                if player_code < 0 or market_code < 0:
+                    continue
+                mask = (
+                    (segment.strings['player'][0] == player_code) &
+                    (segment.strings['market'][0] == market_code) &
+                    (segment.timestamps >= since_ms)
+                )
+                for row in np.flatnonzero(mask):
+                    book = segment.value('bookmaker', row)
+                    if bookmaker and book.lower() != bookmaker.lower():
+                        continue
+                    ticks.append({
+                        'timestamp': int(segment.timestamps[row]),
+                        'bookmaker': book,
+                        **{c: _number(segment.numbers[c][row]) for c in NUMBER_COLUMNS}
+                    })
+
+        ticks.sort(key=lambda t: t['timestamp'])
+        if changes_only:
+            last_by_book = {}
+            moved = []
+            for tick in ticks:
+                quote = (tick['line'], tick['over_odds'], tick['under_odds'])
+                if last_by_book.get(tick['bookmaker']) != quote:
+                    moved.append(tick)
+                    last_by_book[tick['bookmaker']] = quote
+            ticks = moved
+        return [{**t, 'timestamp': _iso(t['timestamp'])} for t in ticks]
+
+    def compact(self, before_day: str = None) -> int:
+        """
+        Merge each day's segments (days before before_day, default today UTC)
+        into one file. Returns the number of files merged away.
+        """
+        before_day = (before_day or _iso(_now_ms())[:10]).replace('-', '')
+        by_day = {}
+        for path in self.segment_paths():
+            day = os.path.basename(path)[5:13]
+            if day < before_day:
+                by_day.setdefault(day, []).append(path)
+
+        merged = 0
+        with self._lock:
+            for day, paths in by_day.items():
+                if len(paths) < 2:
+                    continue
+                segment = Segment.concat([Segment.read(p) for p in paths])
+                target = os.path.join(self.root, f"odds-{day}T000000-compacted-{os.getpid()}-{next(self._counter)}{self.extension}")
+                segment.write(target)
+                for path in paths:
+                    os.remove(path)
+                    self._segments.pop(path, None)
+                self._applied.update(paths)
+                self._applied.add(target)
+                merged += len(paths)
+                print(f"✅ Compacted {len(paths)} segments for {day} ({len(segment)} ticks)")
+        return merged
+
+_history = None
+_history_lock = threading.Lock()
+
+def get_odds_history() -> OddsHistory:
+    """Process-wide OddsHistory"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = OddsHistory()
+        return _history
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the odds history store")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('fetch', help="Record one Odds API snapshot")
+    compact = subparsers.add_parser('compact', help="Merge each finished day's segments into one file")
+    compact.add_argument('--before', help="Only days before this date (YYYY-MM-DD, default today UTC)")
+    args = parser.parse_args()
+
+    history = get_odds_history()
+    if args.command == 'fetch':
+        from odds_api_integration import OddsAPIClient
+        stored = history.record(OddsAPIClient().get_player_props())
+        print(f"✅ Recorded {stored} odds ticks in {history.root}")
+    else:
+        history.compact(args.before)
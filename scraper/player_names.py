@@ -0,0 +1,14 @@
+"""
+Player Names - One spelling of a player's name for cross-source joins
+
+Sportsbooks, DFS salary exports and the players table spell names slightly
+differently (periods, Jr./Sr./II/III suffixes, double spaces). Normalizing
+both sides the same way lets odds, salaries and projections be matched by
+name without pulling in any of the modules that use it.
+"""
+
+def normalize_player_name(name: str) -> str:
+    """Lowercase, no periods or suffixes (Jr., Sr., II, III)"""
+    normalized = name.lower().replace('.', '').replace('  ', ' ').strip()
+    normalized = normalized.replace(' jr', '').replace(' sr', '').replace(' iii', '').replace(' ii', '')
+    return normalized
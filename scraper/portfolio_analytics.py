@@ -0,0 +1,356 @@
+"""
+Portfolio Analytics - Covariance-based risk metrics for portfolios of players
+
+Daily value_score returns for every player are loaded once per value_date
+into an aligned (date x player) matrix and the league-wide covariance is
+computed from it. Analyzing a roster is then just a slice of that matrix:
+portfolio volatility, historical VaR/CVaR and diversification ratio without
+another database round trip. Batches of what-if trades are scored the same
+way, as one weight matrix over the shared arrays.
+"""
+import os
+import datetime
+import threading
+import numpy as np
+from collections import OrderedDict
+from dotenv import load_dotenv
+from supabase import create_client, Client
+from typing import Dict, List, Optional, Sequence
+
+from supabase_pager import iter_batches
+from snapshot_service import get_snapshot
+
+load_dotenv()
+url: str = os.environ.get("SUPABASE_URL")
+key: str = os.environ.get("SUPABASE_KEY")
+supabase: Client = create_client(url, key)
+
+RETURN_WINDOW_DAYS = 60
+VAR_CONFIDENCE = 0.95
+MIN_OBSERVATIONS = 5  # Return days a player needs to get a volatility estimate
+RISK_AVERSION = 1.0   # Value points given up per point of daily volatility when ranking trades
+MAX_SCENARIOS = 1000
+
+def fetch_value_matrix(value_date: str, player_ids: Sequence[str] = None,
+                       days: int = RETURN_WINDOW_DAYS) -> Dict:
+    """
+    Read value_score history ending at value_date in one paged query and
+    align it into a (date x player) matrix (NaN where a player has no row).
+    """
+    end = datetime.date.fromisoformat(value_date)
+    start_date = (end - datetime.timedelta(days=days)).isoformat()
+
+    def filters(query):
+        query = query.gte('value_date', start_date).lte('value_date', value_date)
+        return query.in_('player_id', list(player_ids)) if player_ids is not None else query
+
+    ids, dates, values = [], [], []
+    for batch in iter_batches(
+        supabase, 'player_value_index', 'player_id, value_date, value_score',
+        key=('player_id', 'value_date'), filters=filters
+    ):
+        ids.append(batch['player_id'])
+        dates.append(batch['value_date'])
+        values.append(np.array([np.nan if v is None else v for v in batch['value_score']], dtype=float))
+
+    if not ids:
+        return {'player_ids': np.array([], dtype=object), 'dates': np.array([], dtype=str),
+                'values': np.zeros((0, 0))}
+
+    ids, dates, values = np.concatenate(ids), np.concatenate(dates).astype(str), np.concatenate(values)
+    player_axis, col = np.unique(ids, return_inverse=True)
+    date_axis, row = np.unique(dates, return_inverse=True)
+
+    matrix = np.full((len(date_axis), len(player_axis)), np.nan)
+    matrix[row, col] = values
+    return {'player_ids': player_axis, 'dates': date_axis, 'values': matrix}
+
+def daily_returns(values: np.ndarray) -> np.ndarray:
+    """Day-over-day % returns; NaN where either day is missing or the base is 0"""
+    previous, current = values[:-1], values[1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+    return returns
+
+def pairwise_covariance(returns: np.ndarray) -> np.ndarray:
+    """Covariance over the days each pair of players both have returns"""
+    observed = ~np.isnan(returns)
+    counts = observed.sum(axis=0)
+    means = np.where(counts > 0, np.nansum(returns, axis=0) / np.maximum(counts, 1), 0.0)
+
+    centered = np.where(observed, returns - means, 0.0)
+    overlap = observed.T.astype(float) @ observed.astype(float)
+    return (centered.T @ centered) / np.maximum(overlap - 1, 1)
+
+def column_percentile(values: np.ndarray, q: float) -> np.ndarray:
+    """
+    Per-column percentile ignoring NaN (linear interpolation, like
+    np.nanpercentile) with one sort instead of a loop over columns
+    """
+    ordered = np.sort(values, axis=0)  # NaN sorts last
+    counts = (~np.isnan(values)).sum(axis=0)
+    position = (np.maximum(counts, 1) - 1) * q / 100
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+    columns = np.arange(values.shape[1])
+    low, high = ordered[lower, columns], ordered[upper, columns]
+    return low + (high - low) * (position - lower)
+
+class LeagueRisk:
+    """Aligned returns and covariance for every player at one value_date"""
+
+    def __init__(self, value_date: str, matrix: Dict):
+        self.value_date = value_date
+        self.player_ids = matrix['player_ids']
+        self.dates = matrix['dates']
+        self.index = {pid: i for i, pid in enumerate(self.player_ids)}
+
+        self.returns = daily_returns(matrix['values'])
+        self.observations = (~np.isnan(self.returns)).sum(axis=0)
+        self.mean_returns = np.where(
+            self.observations > 0,
+            np.nansum(self.returns, axis=0) / np.maximum(self.observations, 1), 0.0
+        )
+        self.covariance = pairwise_covariance(self.returns)
+        self.volatility = np.sqrt(np.clip(np.diag(self.covariance), 0, None))
+
+    def lookup(self, player_ids: Sequence[str]) -> np.ndarray:
+        return np.array([self.index[pid] for pid in dict.fromkeys(player_ids) if pid in self.index], dtype=int)
+
+    def batch_stats(self, idx: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Risk stats for many portfolios over the same players at once.
+
+        idx holds league columns (-1 for players with no value history) and
+        weights is (portfolios x players) with rows summing to 1. Every stat
+        comes back as an array with one entry per portfolio.
+        """
+        known = idx >= 0
+        cov = np.zeros((len(idx), len(idx)))
+        cov[np.ix_(known, known)] = self.covariance[np.ix_(idx[known], idx[known])]
+        returns = np.full((len(self.returns), len(idx)), np.nan)
+        returns[:, known] = self.returns[:, idx[known]]
+        means = np.zeros(len(idx))
+        means[known] = self.mean_returns[idx[known]]
+        vols = np.zeros(len(idx))
+        vols[known] = self.volatility[idx[known]]
+
+        volatility = np.sqrt(np.clip(((weights @ cov) * weights).sum(axis=1), 0, None))
+        stand_alone = weights @ vols
+
+        # Historical simulation: each portfolio's daily return series (missing
+        # players contribute 0 that day, days where no member has data are skipped)
+        members = (weights > 0).astype(float)
+        missing = np.isnan(returns).astype(float) @ members.T
+        portfolio_returns = np.nan_to_num(returns) @ weights.T
+        portfolio_returns[missing >= members.sum(axis=1)] = np.nan
+
+        var = np.zeros(len(weights))
+        cvar = np.zeros(len(weights))
+        has_days = ~np.isnan(portfolio_returns).all(axis=0)
+        if has_days.any():
+            active = portfolio_returns[:, has_days]
+            cutoff = column_percentile(active, (1 - VAR_CONFIDENCE) * 100)
+            tail = active <= cutoff
+            var[has_days] = -cutoff
+            cvar[has_days] = -np.where(tail, active, 0).sum(axis=0) / np.maximum(tail.sum(axis=0), 1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            diversification = np.where(volatility > 0, stand_alone / volatility, 1.0)
+
+        return {
+            'expected_daily_return': weights @ means,
+            'volatility': volatility,
+            'var_95': var,
+            'cvar_95': cvar,
+            'diversification_ratio': diversification
+        }
+
+    def metrics(self, idx: np.ndarray, weights: np.ndarray = None) -> Dict:
+        """Risk metrics for the players at idx with the given weights (default: equal)"""
+        if not len(idx):
+            return {'error': 'No value history for these players'}
+
+        weights = np.full(len(idx), 1 / len(idx)) if weights is None else weights / weights.sum()
+        stats = {name: float(values[0]) for name, values in self.batch_stats(idx, weights[None, :]).items()}
+        cov = self.covariance[np.ix_(idx, idx)]
+
+        stds = self.volatility[idx]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = np.where(np.outer(stds, stds) > 0, cov / np.outer(stds, stds), 0.0)
+        upper = correlation[np.triu_indices(len(idx), k=1)]
+
+        return {
+            'value_date': self.value_date,
+            'window_days': int(len(self.dates)),
+            'expected_daily_return': round(stats['expected_daily_return'], 3),
+            'volatility': round(stats['volatility'], 3),
+            'var_95': round(stats['var_95'], 3),
+            'cvar_95': round(stats['cvar_95'], 3),
+            'diversification_ratio': round(stats['diversification_ratio'], 3),
+            'avg_correlation': round(float(upper.mean()), 3) if len(upper) else None,
+            'players': [
+                {
+                    'player_id': self.player_ids[i],
+                    'weight': round(float(w), 4),
+                    'volatility': round(float(self.volatility[i]), 3) if self.observations[i] >= MIN_OBSERVATIONS else None,
+                    'observations': int(self.observations[i])
+                }
+                for i, w in zip(idx, weights)
+            ]
+        }
+
+class PortfolioAnalytics:
+    """Portfolio risk over the league-wide returns matrix, cached per value_date"""
+
+    _league_cache = OrderedDict()
+    _league_cache_size = 2
+    _lock = threading.Lock()
+
+    def get_league_risk(self, value_date: str = None) -> Optional[LeagueRisk]:
+        """League returns/covariance for value_date (default: latest snapshot)"""
+        value_date = value_date or get_snapshot().version
+        if not value_date:
+            return None
+
+        with PortfolioAnalytics._lock:
+            league = PortfolioAnalytics._league_cache.get(value_date)
+            if league is None:
+                league = LeagueRisk(value_date, fetch_value_matrix(value_date))
+                while len(PortfolioAnalytics._league_cache) >= PortfolioAnalytics._league_cache_size:
+                    PortfolioAnalytics._league_cache.popitem(last=False)
+                PortfolioAnalytics._league_cache[value_date] = league
+                print(f"✅ League covariance for {value_date}: {len(league.player_ids)} players")
+            return league
+
+    def analyze(self, player_ids: List[str], weights: Dict[str, float] = None) -> Dict:
+        """Covariance, volatility, VaR/CVaR and diversification for a roster"""
+        try:
+            league = self.get_league_risk()
+            if league is None:
+                return {'error': 'No value history available'}
+
+            idx = league.lookup(player_ids)
+            w = None
+            if weights:
+                w = np.array([float(weights.get(league.player_ids[i], 1)) for i in idx])
+            return league.metrics(idx, w)
+        except Exception as e:
+            print(f"Error computing portfolio analytics: {e}")
+            return {'error': str(e)}
+
+    def simulate(self, player_ids: List[str], swaps: List[Dict], weights: Dict[str, float] = None,
+                 limit: int = None) -> Dict:
+        """
+        Score many what-if trades against a base roster in one pass.
+
+        Each swap is {'add': [ids], 'drop': [ids], 'shares': {id: n}} (shares
+        optional, defaulting to 1 for added players). Every scenario becomes a
+        row of one weight matrix over the union of base and added players, so
+        value, volatility, VaR and diversification for all of them come from a
+        few matrix products. Scenarios are ranked by the change in risk-adjusted
+        value (value_score - RISK_AVERSION * volatility) versus the base roster.
+        """
+        snapshot = get_snapshot()
+        league = self.get_league_risk(snapshot.version)
+        if league is None:
+            return {'error': 'No value history available'}
+
+        weights = weights or {}
+        base_ids = [pid for pid in dict.fromkeys(player_ids) if pid in snapshot.index]
+        if not base_ids:
+            return {'error': 'No data found for portfolio'}
+
+        # Column universe: the base roster plus every player any swap adds
+        added = [pid for swap in swaps for pid in swap.get('add') or [] if pid in snapshot.index]
+        universe = list(dict.fromkeys(base_ids + added))
+        column = {pid: j for j, pid in enumerate(universe)}
+        base_columns = [column[pid] for pid in base_ids]
+
+        values = snapshot['value_score'][[snapshot.index[pid] for pid in universe]]
+        values = np.nan_to_num(values)
+        idx = np.array([league.index.get(pid, -1) for pid in universe], dtype=int)
+
+        base = np.zeros(len(universe))
+        base[base_columns] = [float(weights.get(pid, 1)) for pid in base_ids]
+
+        scenarios, skipped, rows = [], [], [base]
+        for n, swap in enumerate(swaps):
+            add, drop = list(swap.get('add') or []), list(swap.get('drop') or [])
+            shares = swap.get('shares') or {}
+            problem = None
+            if not add and not drop:
+                problem = 'Nothing to add or drop'
+            elif any(pid not in snapshot.index for pid in add):
+                problem = 'Added player has no data'
+            elif any(pid not in column or base[column[pid]] == 0 for pid in drop):
+                problem = 'Dropped player is not in the portfolio'
+            elif any(pid in column and base[column[pid]] > 0 and pid not in drop for pid in add):
+                problem = 'Added player is already in the portfolio'
+            if problem:
+                skipped.append({'index': n, 'add': add, 'drop': drop, 'reason': problem})
+                continue
+
+            row = base.copy()
+            row[[column[pid] for pid in drop]] = 0
+            for pid in add:
+                row[column[pid]] = float(shares.get(pid, 1))
+            if row.sum() <= 0:
+                skipped.append({'index': n, 'add': add, 'drop': drop, 'reason': 'Portfolio would be empty'})
+                continue
+
+            rows.append(row)
+            scenarios.append((n, add, drop))
+
+        weight_matrix = np.array(rows)
+        weight_matrix /= weight_matrix.sum(axis=1, keepdims=True)
+
+        portfolio_value = weight_matrix @ values
+        stats = league.batch_stats(idx, weight_matrix)
+        risk_adjusted = portfolio_value - RISK_AVERSION * stats['volatility']
+
+        # Deltas of every scenario against row 0 (the base roster)
+        delta = risk_adjusted[1:] - risk_adjusted[0]
+        order = np.argsort(-delta, kind='stable')
+        if limit is not None:
+            order = order[:limit]
+
+        def names(ids):
+            return [
+                {'player_id': pid, 'player_name': (snapshot.player(pid) or {}).get('full_name', 'Unknown')}
+                for pid in ids
+            ]
+
+        def summary(i):
+            return {
+                'portfolio_value': round(float(portfolio_value[i]), 2),
+                'volatility': round(float(stats['volatility'][i]), 3),
+                'var_95': round(float(stats['var_95'][i]), 3),
+                'cvar_95': round(float(stats['cvar_95'][i]), 3),
+                'diversification_ratio': round(float(stats['diversification_ratio'][i]), 3),
+                'risk_adjusted_value': round(float(risk_adjusted[i]), 2)
+            }
+
+        results = []
+        for rank, s in enumerate(order, 1):
+            n, add, drop = scenarios[s]
+            i = s + 1
+            results.append({
+                'rank': rank,
+                'index': n,
+                'add': names(add),
+                'drop': names(drop),
+                **summary(i),
+                'value_change': round(float(portfolio_value[i] - portfolio_value[0]), 2),
+                'volatility_change': round(float(stats['volatility'][i] - stats['volatility'][0]), 3),
+                'var_95_change': round(float(stats['var_95'][i] - stats['var_95'][0]), 3),
+                'risk_adjusted_change': round(float(delta[s]), 2)
+            })
+
+        return {
+            'value_date': snapshot.version,
+            'base': {'players': names(base_ids), **summary(0)},
+            'scenarios_evaluated': len(scenarios),
+            'scenarios': results,
+            'skipped': skipped
+        }
@@ -0,0 +1,92 @@
+"""
+Prop Edges - Vectorized evaluation of a whole slate of player props
+
+Lines and odds arrive as (players x props) matrices and recent game values
+as a (players x props x games) tensor, NaN wherever a player has no line or
+a game has no value. Averages, empirical hit rates, no-vig implied
+probabilities, edge and expected value are computed for every prop at once,
+and the best prop per player is picked with one argmax.
+"""
+import numpy as np
+from typing import Dict
+
+DEFAULT_ODDS = -110  # Assumed price when a side has no odds
+MIN_GAMES = 3
+
+# Rules on (average - line): above OVER_EDGE is an OVER, above STRONG_EDGE a
+# HIGH-confidence one; below -STRONG_EDGE is an UNDER
+OVER_EDGE = 0.5
+STRONG_EDGE = 2.0
+
+OVER, UNDER, PASS = 1, -1, 0
+
+def american_to_decimal(odds: np.ndarray) -> np.ndarray:
+    """Decimal payout (stake included) for American odds"""
+    odds = np.asarray(odds, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(odds > 0, 1 + odds / 100, 1 + 100 / np.abs(odds))
+
+def no_vig_probabilities(over_odds: np.ndarray, under_odds: np.ndarray):
+    """Over/under probabilities implied by the prices with the bookmaker margin removed"""
+    over_odds = np.where(np.isfinite(over_odds), over_odds, DEFAULT_ODDS)
+    under_odds = np.where(np.isfinite(under_odds), under_odds, DEFAULT_ODDS)
+    implied_over = 1 / american_to_decimal(over_odds)
+    implied_under = 1 / american_to_decimal(under_odds)
+    total = implied_over + implied_under
+    return implied_over / total, implied_under / total
+
+def evaluate_props(lines: np.ndarray, over_odds: np.ndarray, under_odds: np.ndarray,
+                   values: np.ndarray, min_games: int = MIN_GAMES) -> Dict[str, np.ndarray]:
+    """
+    Every metric for every (player, prop) at once.
+
+    Returns (players x props) arrays: games, average, std, recommendation
+    (OVER/UNDER/PASS), high_confidence, value_score, hit_rate / no_vig_probability
+    / edge / expected_value for the recommended side (OVER for PASS), and
+    valid (has a line and at least min_games values).
+    """
+    lines = np.asarray(lines, dtype=float)
+    played = np.isfinite(values)
+    games = played.sum(axis=-1)
+    valid = np.isfinite(lines) & (games >= min_games)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average = np.where(played, values, 0.0).sum(axis=-1) / games
+        std = np.sqrt((np.where(played, values - average[..., None], 0.0) ** 2).sum(axis=-1) / games)
+        hit_over = (played & (values > lines[..., None])).sum(axis=-1) / games
+        hit_under = (played & (values < lines[..., None])).sum(axis=-1) / games
+
+    edge_points = average - lines
+    recommendation = np.select(
+        [edge_points > OVER_EDGE, edge_points < -STRONG_EDGE], [OVER, UNDER], PASS
+    )
+    recommendation = np.where(valid, recommendation, PASS)
+    high_confidence = (recommendation == OVER) & (edge_points > STRONG_EDGE)
+
+    fair_over, fair_under = no_vig_probabilities(over_odds, under_odds)
+    under = recommendation == UNDER
+    hit_rate = np.where(under, hit_under, hit_over)
+    no_vig = np.where(under, fair_under, fair_over)
+    odds = np.where(under, under_odds, over_odds)
+    payout = american_to_decimal(np.where(np.isfinite(odds), odds, DEFAULT_ODDS))
+
+    return {
+        'valid': valid,
+        'games': games,
+        'average': average,
+        'std': std,
+        'recommendation': recommendation,
+        'high_confidence': high_confidence,
+        'value_score': np.where(recommendation != PASS, np.abs(edge_points), 0.0),
+        'hit_rate': hit_rate,
+        'no_vig_probability': no_vig,
+        'edge': hit_rate - no_vig,
+        'expected_value': hit_rate * payout - 1
+    }
+
+def best_props(evaluation: Dict[str, np.ndarray]) -> np.ndarray:
+    """Column of each player's largest-value OVER/UNDER prop (first wins ties), -1 if none"""
+    value_score = evaluation['value_score']
+    best = np.argmax(value_score, axis=-1)
+    has_pick = value_score[np.arange(len(best)), best] > 0
+    return np.where(has_pick, best, -1)
@@ -0,0 +1,335 @@
+"""
+Prop Simulator - Monte Carlo probabilities for props, combos and parlays
+
+Each box score stat of a player is modelled as a count distribution (Poisson,
+or negative binomial when the player's games are over-dispersed) and the
+stats are tied together with a Gaussian copula fitted to the same games, so
+a big scoring night tends to come with more shots made, assists and so on.
+One batch of draws per player prices every single prop, every combo and any
+parlay that includes the player; draws are seeded per player, so the same
+seed always gives the same probabilities.
+
+Usage:
+    python prop_simulator.py --benchmark [--players 50] [--draws 100000] [--seed 7]
+"""
+import time
+import zlib
+import argparse
+import numpy as np
+from collections import OrderedDict
+from statistics import NormalDist
+from dotenv import load_dotenv
+from typing import Dict, List, Sequence
+
+from game_logs import PROP_COMPONENTS, STAT_COLUMNS
+
+load_dotenv()
+
+FIT_GAMES = 25  # Most recent games used to fit each player
+MIN_GAMES = 5
+DEFAULT_DRAWS = 100_000
+MAX_DRAWS = 1_000_000
+MAX_PARLAY_LEGS = 12
+CORRELATION_PRIOR = 10  # Correlations are shrunk toward 0 as if from this many extra games
+SAMPLE_CACHE_SIZE = 32  # Players whose draws are kept in memory
+TAIL_PROBABILITY = 1e-12
+MIN_DISPERSION = 0.2  # Smallest modelled variance, as a share of the mean
+
+PROP_TYPES = list(PROP_COMPONENTS)
+SIDES = ('over', 'under')
+
+_standard_normal = NormalDist()
+
+def count_thresholds(mean: float, variance: float) -> np.ndarray:
+    """
+    Standard normal cut points of a count distribution: a normal draw z maps
+    to the number of thresholds <= z. Negative binomial when variance > mean,
+    binomial when variance < mean (a player who always scores 20-24 would get
+    a std of ~4.7 from a Poisson), Poisson in between. The variance is kept
+    at least MIN_DISPERSION * mean so a few steady games never make a stat
+    certain.
+    """
+    if mean <= 0:
+        return np.array([])
+    variance = max(variance, MIN_DISPERSION * mean)
+    spread = np.sqrt(max(variance, mean))
+    k = np.arange(int(np.ceil(mean + 12 * spread + 10)) + 1)
+
+    # pmf by recurrence (no gamma functions needed)
+    if variance > mean * 1.05:
+        r = mean * mean / (variance - mean)
+        p = r / (r + mean)
+        ratios = (k[1:] - 1 + r) / k[1:] * (1 - p)
+        first = p ** r
+    elif variance < mean * 0.95:
+        # n trials with success chance p: mean n*p, variance n*p*(1-p)
+        n = max(int(round(mean / (1 - variance / mean))), int(mean) + 1)
+        p = mean / n
+        ratios = np.maximum(n - k[1:] + 1, 0) / k[1:] * (p / (1 - p))
+        first = (1 - p) ** n
+    else:
+        ratios = mean / k[1:]
+        first = np.exp(-mean)
+    pmf = first * np.concatenate([[1.0], np.cumprod(ratios)])
+
+    cdf = np.cumsum(pmf) / pmf.sum()
+    cdf = cdf[cdf < 1 - TAIL_PROBABILITY]
+    return np.array([_standard_normal.inv_cdf(c) for c in np.clip(cdf, TAIL_PROBABILITY, None)], dtype=np.float32)
+
+def probability_to_american(probability: float):
+    """Fair American odds for a probability (None at 0 or 1)"""
+    if not 0 < probability < 1:
+        return None
+    if probability >= 0.5:
+        return round(-100 * probability / (1 - probability))
+    return round(100 * (1 - probability) / probability)
+
+class PlayerModel:
+    """Count marginals + Gaussian copula fitted to one player's games"""
+
+    def __init__(self, games: np.ndarray):
+        """games: (games x STAT_COLUMNS) box score values, NaN where missing"""
+        valid = np.isfinite(games)
+        counts = valid.sum(axis=0)
+        values = np.where(valid, games, 0.0)
+        self.games = int(valid.all(axis=1).sum())
+        self.means = values.sum(axis=0) / np.maximum(counts, 1)
+        self.variances = np.where(
+            counts > 1,
+            (np.where(valid, games - self.means, 0.0) ** 2).sum(axis=0) / np.maximum(counts - 1, 1),
+            self.means
+        )
+        self.thresholds = [count_thresholds(m, v) for m, v in zip(self.means, self.variances)]
+
+        # Correlation over complete games, shrunk toward independence
+        complete = games[np.isfinite(games).all(axis=1)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = np.nan_to_num(np.corrcoef(complete, rowvar=False)) if len(complete) > 2 \
+                else np.zeros((games.shape[1], games.shape[1]))
+        shrink = len(complete) / (len(complete) + CORRELATION_PRIOR)
+        correlation = shrink * correlation
+        np.fill_diagonal(correlation, 1.0)
+        self.correlation = correlation
+        self.cholesky = np.linalg.cholesky(correlation)
+
+    def sample(self, draws: int, rng: np.random.Generator) -> np.ndarray:
+        """(STAT_COLUMNS x draws) simulated box scores"""
+        z = self.cholesky.astype(np.float32) @ rng.standard_normal((len(self.thresholds), draws), dtype=np.float32)
+        samples = np.empty(z.shape, dtype=np.int16)
+        for j, thresholds in enumerate(self.thresholds):
+            samples[j] = np.searchsorted(thresholds, z[j], side='right')
+        return samples
+
+def load_stat_history(player_ids: Sequence[str], games: int = FIT_GAMES) -> Dict[str, List[Dict]]:
+    """
+    Each player's last `games` box score lines, newest first (through the
+    recent_player_games function, or date-windowed paging without it)
+    """
+    from rolling_stats import load_recent_games
+
+    return load_recent_games(player_ids, n=games)
+
+class PropSimulator:
+    """Fits players, then prices props, combos and parlays from shared draws"""
+
+    def __init__(self, seed: int = None, draws: int = DEFAULT_DRAWS):
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.draws = draws
+        self.models: Dict[str, PlayerModel] = {}
+        self._prop_draws = OrderedDict()
+
+    def fit(self, player_ids: Sequence[str] = None, history: Dict[str, List[Dict]] = None) -> List[str]:
+        """Fit every player with at least MIN_GAMES games; returns the fitted ids"""
+        if history is None:
+            history = load_stat_history(player_ids)
+        fitted = []
+        for player_id, games in history.items():
+            if len(games) < MIN_GAMES:
+                continue
+            matrix = np.array([
+                [np.nan if g.get(stat) is None else g[stat] for stat in STAT_COLUMNS] for g in games
+            ], dtype=float)
+            self.models[player_id] = PlayerModel(matrix)
+            self._prop_draws.pop(player_id, None)
+            fitted.append(player_id)
+        return fitted
+
+    def prop_draws(self, player_id: str) -> np.ndarray:
+        """
+        (PROP_TYPES x draws) simulated value of every single and combo prop,
+        from the player's draws; the same for a given seed
+        """
+        if player_id in self._prop_draws:
+            self._prop_draws.move_to_end(player_id)
+            return self._prop_draws[player_id]
+
+        rng = np.random.default_rng([self.seed, zlib.crc32(player_id.encode())])
+        samples = self.models[player_id].sample(self.draws, rng)
+        rows = {stat: samples[j] for j, stat in enumerate(STAT_COLUMNS)}
+        draws = np.empty((len(PROP_TYPES), self.draws), dtype=np.int16)
+        for k, prop_type in enumerate(PROP_TYPES):
+            components = PROP_COMPONENTS[prop_type]
+            np.copyto(draws[k], rows[components[0]])
+            for stat in components[1:]:
+                draws[k] += rows[stat]
+
+        self._prop_draws[player_id] = draws
+        if len(self._prop_draws) > SAMPLE_CACHE_SIZE:
+            self._prop_draws.popitem(last=False)
+        return draws
+
+    def prop_values(self, player_id: str, prop_type: str) -> np.ndarray:
+        """Simulated value of a single or combo prop for every draw"""
+        return self.prop_draws(player_id)[PROP_TYPES.index(prop_type)]
+
+    def price_props(self, player_id: str, lines: Dict[str, float]) -> Dict[str, Dict]:
+        """Over/under/push probabilities and the simulated mean for each prop line"""
+        prop_types = list(lines)
+        values = self.prop_draws(player_id)[[PROP_TYPES.index(p) for p in prop_types]]
+        line_column = np.array([lines[p] for p in prop_types], dtype=float)[:, None]
+        over = np.count_nonzero(values > line_column, axis=1) / self.draws
+        under = np.count_nonzero(values < line_column, axis=1) / self.draws
+        means = values.mean(axis=1)
+
+        return {
+            prop_type: {
+                'line': lines[prop_type],
+                'over': round(float(over[k]), 4),
+                'under': round(float(under[k]), 4),
+                'push': round(float(1 - over[k] - under[k]), 4),
+                'mean': round(float(means[k]), 2),
+                'fair_over_odds': probability_to_american(float(over[k])),
+                'fair_under_odds': probability_to_american(float(under[k]))
+            }
+            for k, prop_type in enumerate(prop_types)
+        }
+
+    def price_parlay(self, legs: List[Dict]) -> Dict:
+        """
+        Probability that every leg hits. Legs are {'player_id', 'prop_type',
+        'line', 'side'}; legs on the same player share draws, so their
+        correlation is priced in (players are independent of each other).
+        """
+        for leg in legs:
+            if leg['player_id'] not in self.models:
+                return {'error': f"Not enough games to model player {leg['player_id']}"}
+            if leg['prop_type'] not in PROP_COMPONENTS:
+                return {'error': f"Unknown prop type {leg['prop_type']}. Available: {', '.join(PROP_COMPONENTS)}"}
+            if leg.get('side', 'over') not in SIDES:
+                return {'error': f"Side must be one of {', '.join(SIDES)}"}
+
+        hits = np.ones(self.draws, dtype=bool)
+        leg_results = []
+        for leg in legs:
+            values = self.prop_values(leg['player_id'], leg['prop_type'])
+            hit = values > leg['line'] if leg.get('side', 'over') == 'over' else values < leg['line']
+            hits &= hit
+            leg_results.append({**leg, 'side': leg.get('side', 'over'), 'probability': round(float(hit.mean()), 4)})
+
+        probability = float(hits.mean())
+        independent = float(np.prod([leg['probability'] for leg in leg_results]))
+        return {
+            'legs': leg_results,
+            'probability': round(probability, 4),
+            'independent_probability': round(independent, 4),
+            'correlation_lift': round(probability / independent, 3) if independent else None,
+            'fair_odds': probability_to_american(probability),
+            'draws': self.draws
+        }
+
+# --- BENCHMARK ---
+
+def synthetic_history(players: int = 50, games: int = FIT_GAMES, seed: int = 7) -> Dict[str, List[Dict]]:
+    """Box scores where minutes drive every stat, so the stats are positively correlated"""
+    rng = np.random.default_rng(seed)
+    rates = {
+        'points': rng.uniform(0.2, 0.9, players), 'rebounds': rng.uniform(0.05, 0.35, players),
+        'assists': rng.uniform(0.03, 0.3, players), 'steals': rng.uniform(0.01, 0.05, players),
+        'blocks': rng.uniform(0.005, 0.06, players), 'turnovers': rng.uniform(0.02, 0.1, players),
+        'three_pointers_made': rng.uniform(0.01, 0.12, players),
+    }
+    history = {}
+    for p in range(players):
+        minutes = np.clip(rng.normal(rng.uniform(15, 36), 5, games), 0, 48)
+        history[f"synthetic-{p:04d}"] = [
+            {'game_date': str(np.datetime64('2025-01-01') + g),
+             **{stat: int(rng.poisson(rates[stat][p] * minutes[g])) for stat in STAT_COLUMNS}}
+            for g in range(games)
+        ]
+    return history
+
+def benchmark(players: int = 50, draws: int = DEFAULT_DRAWS, seed: int = 7, parlays: int = 200) -> Dict:
+    history = synthetic_history(players, seed=seed)
+    simulator = PropSimulator(seed=seed, draws=draws)
+
+    started = time.perf_counter()
+    fitted = simulator.fit(history=history)
+    fit_time = time.perf_counter() - started
+
+    # Every prop for every player at its fitted mean (rounded to a half point)
+    started = time.perf_counter()
+    prices = {}
+    for player_id in fitted:
+        means = dict(zip(STAT_COLUMNS, simulator.models[player_id].means))
+        lines = {
+            prop: np.floor(sum(means[s] for s in stats)) + 0.5 for prop, stats in PROP_COMPONENTS.items()
+        }
+        prices[player_id] = simulator.price_props(player_id, lines)
+    price_time = time.perf_counter() - started
+
+    # Random 2-4 leg same-player parlays, grouped by player as a slate would be
+    rng = np.random.default_rng(seed)
+    players_drawn = np.sort(rng.integers(len(fitted), size=parlays))
+    started = time.perf_counter()
+    lifts = []
+    for p in players_drawn:
+        player_id = fitted[p]
+        props = rng.choice(PROP_TYPES, size=rng.integers(2, 5), replace=False)
+        result = simulator.price_parlay([
+            {'player_id': player_id, 'prop_type': prop, 'line': prices[player_id][prop]['line'], 'side': 'over'}
+            for prop in props
+        ])
+        if result['correlation_lift']:
+            lifts.append(result['correlation_lift'])
+    parlay_time = time.perf_counter() - started
+
+    # Same seed, same probabilities
+    repeat = PropSimulator(seed=seed, draws=draws)
+    repeat.fit(history={fitted[0]: history[fitted[0]]})
+    reproducible = repeat.price_props(fitted[0], {p: v['line'] for p, v in prices[fitted[0]].items()}) == prices[fitted[0]]
+
+    return {
+        'players': len(fitted),
+        'draws': draws,
+        'fit_seconds': round(fit_time, 3),
+        'price_seconds': round(price_time, 3),
+        'props_priced': sum(len(p) for p in prices.values()),
+        'ms_per_player': round(price_time / len(fitted) * 1000, 1),
+        'parlays': parlays,
+        'parlay_seconds': round(parlay_time, 3),
+        'median_correlation_lift': round(float(np.median(lifts)), 3) if lifts else None,
+        'reproducible': reproducible
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo prop and parlay simulator")
+    parser.add_argument('--benchmark', action='store_true', help="Time fitting and pricing on synthetic players")
+    parser.add_argument('--players', type=int, default=50)
+    parser.add_argument('--draws', type=int, default=DEFAULT_DRAWS)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        return
+
+    result = benchmark(args.players, args.draws, args.seed)
+    print(f"✅ Fitted {result['players']} players in {result['fit_seconds']}s")
+    print(f"✅ Priced {result['props_priced']} props with {result['draws']:,} draws each in "
+          f"{result['price_seconds']}s ({result['ms_per_player']} ms/player)")
+    print(f"✅ Priced {result['parlays']} same-game parlays in {result['parlay_seconds']}s "
+          f"(median correlation lift {result['median_correlation_lift']})")
+    print(f"{'✅' if result['reproducible'] else '❌'} Same seed reproduces the same probabilities")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Rolling Stats - Incrementally maintained last-5 / last-10 game aggregates
+
+player_rolling_stats holds one row per player: the player's last 10 box score
+lines plus, for every stat, the count, sum and sum of squares over the last 5
+and last 10 games. daily_stats_scraper updates the rows of the players who
+just played, so readers get means and standard deviations from one row
+instead of scanning and re-aggregating daily_player_stats.
+
+Usage:
+    python rolling_stats.py rebuild                # recompute every player from raw rows
+    python rolling_stats.py check [--sample 200]   # compare stored rows with raw rows
+"""
+import os
+import math
+import random
+import argparse
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from supabase import create_client, Client
+from typing import Dict, Iterable, List, Sequence
+
+from supabase_pager import DEFAULT_PAGE_SIZE, iter_rows
+from fantasy_scoring import STANDARD_SCORING, STAT_COLUMNS
+
+load_dotenv()
+url: str = os.environ.get("SUPABASE_URL")
+key: str = os.environ.get("SUPABASE_KEY")
+supabase: Client = create_client(url, key)
+
+WINDOWS = (5, 10)
+MAX_GAMES = max(WINDOWS)
+
+BOX_SCORE_STATS = STAT_COLUMNS
+ROLLING_STATS = BOX_SCORE_STATS + ['fantasy_points']
+
+PLAYER_CHUNK_SIZE = 200
+UPSERT_CHUNK_SIZE = 500
+
+# Date windows (days back) tried in turn for players still short of n games
+RECENT_WINDOWS = (30, 90, 365)
+OLDER_GAMES_WORKERS = 8
+
+_rpc_available = None  # Unknown until the first call
+
+def merge_games(games: Iterable[Dict], new_games: Iterable[Dict], limit: int = MAX_GAMES) -> List[Dict]:
+    """Newest-first last `limit` lines; a new line replaces one with the same game_date"""
+    by_date = {g['game_date'][:10]: g for g in games}
+    by_date.update({g['game_date'][:10]: g for g in new_games})
+    return [by_date[d] for d in sorted(by_date, reverse=True)[:limit]]
+
+def build_rows(games_by_player: Dict[str, List[Dict]]) -> List[Dict]:
+    """
+    player_rolling_stats rows for many players at once: their games go into
+    one (players x MAX_GAMES x stats) array, NaN where a game or stat is
+    missing, and every window's count / sum / sum of squares is a reduction
+    over it.
+    """
+    player_ids = list(games_by_player)
+    games = [merge_games([], games_by_player[pid]) for pid in player_ids]
+
+    values = np.full((len(player_ids), MAX_GAMES, len(ROLLING_STATS)), np.nan)
+    for p, player_games in enumerate(games):
+        for g, game in enumerate(player_games):
+            values[p, g, :len(BOX_SCORE_STATS)] = [
+                np.nan if game.get(stat) is None else game[stat] for stat in BOX_SCORE_STATS
+            ]
+    # Standard fantasy points; NaN if any scored stat is missing
+    values[..., -1] = STANDARD_SCORING.score_matrix(values[..., :len(BOX_SCORE_STATS)])
+
+    played = np.isfinite(values)
+    filled = np.where(played, values, 0.0)
+    n_games = np.array([len(g) for g in games])
+    windows = {}
+    for w in WINDOWS:
+        windows[w] = (
+            np.minimum(n_games, w),
+            played[:, :w].sum(axis=1),
+            filled[:, :w].sum(axis=1),
+            (filled[:, :w] ** 2).sum(axis=1)
+        )
+
+    now = datetime.datetime.now().isoformat()
+    rows = []
+    for p, player_id in enumerate(player_ids):
+        row = {
+            'player_id': player_id,
+            'last_game_date': games[p][0]['game_date'][:10] if games[p] else None,
+            'games': games[p]
+        }
+        for w, (n, count, total, total_sq) in windows.items():
+            row[f'last_{w}'] = {'games': int(n[p])}
+            for k, stat in enumerate(ROLLING_STATS):
+                row[f'last_{w}'][stat] = {
+                    'count': int(count[p, k]),
+                    'sum': float(total[p, k]),
+                    'sum_sq': float(total_sq[p, k])
+                }
+        row['updated_at'] = now
+        rows.append(row)
+    return rows
+
+def window_stat(row: Dict, window: int, stat: str) -> Dict:
+    """count, mean and (population) std of a stat over the last `window` games"""
+    agg = row[f'last_{window}'][stat]
+    n = agg['count']
+    if not n:
+        return {'count': 0, 'mean': 0.0, 'std': 0.0}
+    mean = agg['sum'] / n
+    return {'count': n, 'mean': mean, 'std': math.sqrt(max(agg['sum_sq'] / n - mean * mean, 0.0))}
+
+def _all_player_ids() -> List[str]:
+    return [r['id'] for r in iter_rows(supabase, 'players', 'id', key=('id',))]
+
+def _load_recent_games_rpc(player_ids: List[str], n: int) -> Dict[str, List[Dict]]:
+    """Top n rows per player from the recent_player_games function"""
+    recent = {}
+    # The RPC's result is capped at PostgREST's max-rows like any read, so each
+    # call asks for at most DEFAULT_PAGE_SIZE // n players
+    chunk_size = max(DEFAULT_PAGE_SIZE // n, 1)
+    for i in range(0, len(player_ids), chunk_size):
+        response = supabase.rpc('recent_player_games', {
+            'player_ids': player_ids[i:i + chunk_size],
+            'n': n
+        }).execute()
+        for game in response.data or []:
+            recent.setdefault(game['player_id'], []).append(game)
+    return {pid: merge_games([], games, limit=n) for pid, games in recent.items()}
+
+def _load_recent_games_windowed(player_ids: List[str], n: int) -> Dict[str, List[Dict]]:
+    """
+    Last n rows per player without the RPC: page through the last
+    RECENT_WINDOWS[0] days, then, for players still short of n games, each
+    older slab of days; whoever is still short gets one limited query for
+    the rest.
+    """
+    recent = {}
+    short = list(dict.fromkeys(player_ids))
+    newer_than = None
+    today = datetime.date.today()
+    for days in RECENT_WINDOWS:
+        since = (today - datetime.timedelta(days=days)).isoformat()
+
+        def filters(q, chunk, since=since, until=newer_than):
+            q = q.in_('player_id', chunk).gte('game_date', since)
+            return q.lt('game_date', until) if until else q
+
+        for i in range(0, len(short), PLAYER_CHUNK_SIZE):
+            chunk = short[i:i + PLAYER_CHUNK_SIZE]
+            for game in iter_rows(
+                supabase, 'daily_player_stats', '*',
+                key=('player_id', 'game_date'), desc=True,
+                filters=lambda q, chunk=chunk: filters(q, chunk)
+            ):
+                games = recent.setdefault(game['player_id'], [])
+                if len(games) < n:
+                    games.append(game)
+
+        short = [pid for pid in short if len(recent.get(pid, [])) < n]
+        if not short:
+            return recent
+        newer_than = since
+
+    # Players who barely played in RECENT_WINDOWS[-1] days: only their missing games
+    def older_games(player_id: str) -> List[Dict]:
+        return supabase.table('daily_player_stats').select('*').eq('player_id', player_id).lt(
+            'game_date', newer_than
+        ).order('game_date', desc=True).limit(n - len(recent.get(player_id, []))).execute().data or []
+
+    with ThreadPoolExecutor(max_workers=OLDER_GAMES_WORKERS) as pool:
+        for player_id, games in zip(short, pool.map(older_games, short)):
+            if games:
+                recent.setdefault(player_id, []).extend(games)
+    return recent
+
+def load_recent_games(player_ids: Sequence[str] = None, n: int = MAX_GAMES) -> Dict[str, List[Dict]]:
+    """
+    Last n raw box score lines per player, newest first (all players if
+    None). Uses the recent_player_games function (sql/recent_player_games.sql)
+    when the database has it, else date-windowed paging; either way only about
+    n rows per player are read, however long the season has run.
+    """
+    global _rpc_available
+    player_ids = _all_player_ids() if player_ids is None else list(dict.fromkeys(player_ids))
+    if not player_ids:
+        return {}
+
+    if _rpc_available is not False:
+        try:
+            recent = _load_recent_games_rpc(player_ids, n)
+            _rpc_available = True
+            return recent
+        except Exception as e:
+            if _rpc_available:
+                raise
+            print(f"⚠️  recent_player_games RPC unavailable, paging by date instead: {e}")
+            _rpc_available = False
+    return _load_recent_games_windowed(player_ids, n)
+
+def load_rolling_stats(player_ids: Sequence[str]) -> Dict[str, Dict]:
+    """Stored rows for the given players (players without a row are left out)"""
+    rows = {}
+    player_ids = list(dict.fromkeys(player_ids))
+    for i in range(0, len(player_ids), PLAYER_CHUNK_SIZE):
+        response = supabase.table('player_rolling_stats').select('*').in_(
+            'player_id', player_ids[i:i + PLAYER_CHUNK_SIZE]
+        ).execute()
+        rows.update({r['player_id']: r for r in response.data or []})
+    return rows
+
+def get_rolling_stats(player_ids: Sequence[str]) -> Dict[str, Dict]:
+    """
+    Rolling stats rows for the given players. Players the store doesn't have
+    yet are computed from raw daily_player_stats rows (not written back).
+    """
+    try:
+        rows = load_rolling_stats(player_ids)
+    except Exception as e:
+        print(f"⚠️  Could not read player_rolling_stats, using raw stats: {e}")
+        rows = {}
+
+    missing = [pid for pid in dict.fromkeys(player_ids) if pid not in rows]
+    if missing:
+        rows.update({row['player_id']: row for row in build_rows(load_recent_games(missing))})
+    return rows
+
+def save_rows(rows: List[Dict]) -> int:
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        supabase.table('player_rolling_stats').upsert(
+            rows[i:i + UPSERT_CHUNK_SIZE], on_conflict='player_id'
+        ).execute()
+    return len(rows)
+
+def update_rolling_stats(stat_lines: List[Dict]) -> int:
+    """
+    Fold newly scraped box score lines into the store. Only the players in
+    stat_lines are touched; a player without a row is seeded from raw rows.
+    """
+    new_games = {}
+    for line in stat_lines:
+        if line.get('player_id'):
+            new_games.setdefault(line['player_id'], []).append(line)
+    if not new_games:
+        return 0
+
+    stored = load_rolling_stats(list(new_games))
+    missing = [pid for pid in new_games if pid not in stored]
+    seeded = load_recent_games(missing) if missing else {}
+
+    merged = {}
+    for player_id, games in new_games.items():
+        existing = stored[player_id]['games'] if player_id in stored else seeded.get(player_id, [])
+        merged[player_id] = merge_games(existing, games)
+
+    return save_rows(build_rows(merged))
+
+def rebuild_rolling_stats() -> int:
+    """Recompute every player's row from daily_player_stats"""
+    print("🔄 Rebuilding player_rolling_stats from daily_player_stats...")
+    saved = save_rows(build_rows(load_recent_games()))
+    print(f"✅ Rebuilt rolling stats for {saved} players")
+    return saved
+
+def check_consistency(sample: int = None, tolerance: float = 1e-6) -> List[Dict]:
+    """Compare stored rows with aggregates recomputed from raw rows; returns mismatches"""
+    stored = {r['player_id']: r for r in iter_rows(supabase, 'player_rolling_stats', '*', key=('player_id',))}
+    player_ids = list(stored)
+    if sample and sample < len(player_ids):
+        player_ids = random.sample(player_ids, sample)
+
+    raw = load_recent_games(player_ids)
+    expected_rows = build_rows({pid: raw.get(pid, []) for pid in player_ids})
+    mismatches = []
+    for player_id, expected in zip(player_ids, expected_rows):
+        row = stored[player_id]
+
+        problems = []
+        if [g['game_date'][:10] for g in row['games']] != [g['game_date'][:10] for g in expected['games']]:
+            problems.append('games')
+        for w in WINDOWS:
+            for stat in ROLLING_STATS:
+                got, want = row[f'last_{w}'][stat], expected[f'last_{w}'][stat]
+                if got['count'] != want['count'] or any(
+                    abs(got[f] - want[f]) > tolerance * max(1.0, abs(want[f])) for f in ('sum', 'sum_sq')
+                ):
+                    problems.append(f'last_{w}.{stat}')
+        if problems:
+            mismatches.append({'player_id': player_id, 'fields': problems})
+
+    print(f"{'✅' if not mismatches else '❌'} Checked {len(player_ids)} players: {len(mismatches)} mismatched")
+    for m in mismatches[:20]:
+        print(f"   {m['player_id']}: {', '.join(m['fields'][:6])}")
+    return mismatches
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain player_rolling_stats")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('rebuild', help="Recompute every player from daily_player_stats")
+    check = subparsers.add_parser('check', help="Compare stored rows against raw rows")
+    check.add_argument('--sample', type=int, help="Only check this many random players")
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        rebuild_rolling_stats()
+    else:
+        exit(1 if check_consistency(args.sample) else 0)
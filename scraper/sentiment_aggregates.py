@@ -0,0 +1,243 @@
+"""
+Sentiment Aggregates - Daily per-(player, source) sentiment totals
+
+player_sentiment_daily holds, for every player, source and article_date, the
+number of mentions, the sum of their sentiment scores and the source-weighted
+sum used by the value index. The sentiment scrapers refresh the days they
+just wrote, so any window (a 5-day value index window, a player's full
+history by source) is read as a handful of rows instead of every article.
+
+Usage:
+    python sentiment_aggregates.py rebuild [--since YYYY-MM-DD]
+"""
+import os
+import math
+import argparse
+import datetime
+from dotenv import load_dotenv
+from supabase import create_client, Client
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from supabase_pager import iter_rows
+
+load_dotenv()
+url: str = os.environ.get("SUPABASE_URL")
+key: str = os.environ.get("SUPABASE_KEY")
+supabase: Client = create_client(url, key)
+
+# Weight different sources (first key contained in the source name wins)
+SOURCE_WEIGHTS = {
+    'reddit_nba': 1.2,
+    'reddit_nbadiscussion': 1.3,
+    'reddit_fantasybball': 1.1,
+    'news_espn': 1.5,
+    'news_cbssports': 1.3,
+    'news_yahoo': 1.2,
+    'bleacher_report': 1.4
+}
+
+PLAYER_CHUNK_SIZE = 200
+UPSERT_CHUNK_SIZE = 500
+GUID_CHUNK_SIZE = 100  # article_guids are URLs; keep in_() filters short
+
+def source_weight(source: Optional[str]) -> float:
+    """Weight of a sentiment source (1.0 for unknown sources)"""
+    source = source or 'unknown'
+    for key, val in SOURCE_WEIGHTS.items():
+        if key in source:
+            return val
+    return 1.0
+
+def aggregate_rows(rows: Iterable[Dict]) -> List[Dict]:
+    """Group raw daily_player_sentiment rows into (player, source, day) totals"""
+    totals = {}
+    weights = {}
+    for row in rows:
+        score = row.get('sentiment_score')
+        if score is None or not math.isfinite(score):
+            continue
+        source = row.get('source') or 'unknown'
+        if source not in weights:
+            weights[source] = source_weight(source)
+
+        key = (row['player_id'], source, str(row['article_date'])[:10])
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = {
+                'player_id': key[0], 'source': key[1], 'article_date': key[2],
+                'mention_count': 0, 'sentiment_sum': 0.0, 'weighted_sum': 0.0
+            }
+        total['mention_count'] += 1
+        total['sentiment_sum'] += score
+        total['weighted_sum'] += score * weights[source]
+    return list(totals.values())
+
+def save_aggregates(aggregates: List[Dict]) -> int:
+    updated_at = datetime.datetime.now().isoformat()
+    for i in range(0, len(aggregates), UPSERT_CHUNK_SIZE):
+        supabase.table('player_sentiment_daily').upsert(
+            [{**a, 'updated_at': updated_at} for a in aggregates[i:i + UPSERT_CHUNK_SIZE]],
+            on_conflict='player_id, source, article_date'
+        ).execute()
+    return len(aggregates)
+
+def load_previous_sentiment(rows: List[Dict]) -> List[Dict]:
+    """
+    Stored daily_player_sentiment rows for the (player_id, article_guid) pairs
+    about to be upserted. The scrapers stamp article_date = today, so an
+    article scraped again moves to today; its old day must be refreshed too.
+    """
+    pairs = sorted({(r['player_id'], r['article_guid']) for r in rows
+                    if r.get('player_id') and r.get('article_guid')})
+    wanted = set(pairs)
+
+    previous = []
+    for i in range(0, len(pairs), GUID_CHUNK_SIZE):
+        chunk = pairs[i:i + GUID_CHUNK_SIZE]
+        player_ids = sorted({pid for pid, _ in chunk})
+        guids = sorted({guid for _, guid in chunk})
+        previous.extend(
+            row for row in iter_rows(
+                supabase, 'daily_player_sentiment',
+                'player_id, article_guid, article_date, source',
+                key=('player_id', 'article_guid'),
+                filters=lambda q, player_ids=player_ids, guids=guids: q.in_(
+                    'player_id', player_ids).in_('article_guid', guids)
+            )
+            if (row['player_id'], row['article_guid']) in wanted
+        )
+    return previous
+
+def refresh_sentiment_aggregates(inserted_rows: List[Dict], previous_rows: List[Dict] = ()) -> int:
+    """
+    Recompute the (player, day) totals touched by newly written sentiment
+    rows from the raw table, so re-running a scraper never double counts.
+    previous_rows (from load_previous_sentiment, read before the upsert) add
+    the days re-scraped articles were moved away from; totals left with no
+    mentions there are deleted.
+    """
+    days_by_player = {}
+    for row in list(inserted_rows) + list(previous_rows):
+        if row.get('player_id') and row.get('article_date'):
+            days_by_player.setdefault(row['player_id'], set()).add(str(row['article_date'])[:10])
+    if not days_by_player:
+        return 0
+
+    # Group players that share the same days (normally just "today")
+    groups = {}
+    for player_id, days in days_by_player.items():
+        groups.setdefault(tuple(sorted(days)), []).append(player_id)
+
+    raw = []
+    for days, player_ids in groups.items():
+        for i in range(0, len(player_ids), PLAYER_CHUNK_SIZE):
+            chunk = player_ids[i:i + PLAYER_CHUNK_SIZE]
+            raw.extend(iter_rows(
+                supabase, 'daily_player_sentiment',
+                'player_id, article_guid, article_date, source, sentiment_score',
+                key=('player_id', 'article_guid'),
+                filters=lambda q, chunk=chunk, days=days: q.in_('player_id', chunk).gte(
+                    'article_date', days[0]).lte('article_date', days[-1])
+            ))
+
+    wanted = {(pid, day) for pid, days in days_by_player.items() for day in days}
+    aggregates = [a for a in aggregate_rows(raw) if (a['player_id'], a['article_date']) in wanted]
+
+    # (player, source, day) totals whose only mentions moved to another day
+    kept = {(a['player_id'], a['source'], a['article_date']) for a in aggregates}
+    emptied = {
+        (row['player_id'], row.get('source') or 'unknown', str(row['article_date'])[:10])
+        for row in previous_rows if row.get('player_id') and row.get('article_date')
+    } - kept
+    for player_id, source, day in emptied:
+        supabase.table('player_sentiment_daily').delete().eq('player_id', player_id).eq(
+            'source', source).eq('article_date', day).execute()
+
+    return save_aggregates(aggregates)
+
+def rebuild_sentiment_aggregates(since: str = None) -> int:
+    """Recompute player_sentiment_daily from daily_player_sentiment (optionally since a date)"""
+    print(f"🔄 Rebuilding player_sentiment_daily{' since ' + since if since else ''}...")
+    aggregates = aggregate_rows(iter_rows(
+        supabase, 'daily_player_sentiment',
+        'player_id, article_guid, article_date, source, sentiment_score',
+        key=('player_id', 'article_guid'),
+        filters=(lambda q: q.gte('article_date', since)) if since else None
+    ))
+    saved = save_aggregates(aggregates)
+    print(f"✅ Stored {saved} daily sentiment aggregates")
+    return saved
+
+def load_daily_sentiment(player_ids: Sequence[str] = None, since: str = None,
+                         until: str = None) -> List[Dict]:
+    """
+    Daily (player, source) totals, optionally limited to players and a date
+    range. Falls back to aggregating raw rows only when player_sentiment_daily
+    is missing or unreadable; an empty window is a valid answer.
+    """
+    def filters(query, chunk=None):
+        if chunk is not None:
+            query = query.in_('player_id', chunk)
+        if since:
+            query = query.gte('article_date', since)
+        if until:
+            query = query.lte('article_date', until)
+        return query
+
+    chunks = [None] if player_ids is None else [
+        list(player_ids)[i:i + PLAYER_CHUNK_SIZE] for i in range(0, len(player_ids), PLAYER_CHUNK_SIZE)
+    ]
+
+    try:
+        rows = []
+        for chunk in chunks:
+            rows.extend(iter_rows(
+                supabase, 'player_sentiment_daily',
+                'player_id, source, article_date, mention_count, sentiment_sum, weighted_sum',
+                key=('player_id', 'article_date', 'source'),
+                filters=lambda q, chunk=chunk: filters(q, chunk)
+            ))
+        return rows
+    except Exception as e:
+        print(f"⚠️  Could not read player_sentiment_daily, using raw sentiment: {e}")
+
+    raw = []
+    for chunk in chunks:
+        raw.extend(iter_rows(
+            supabase, 'daily_player_sentiment',
+            'player_id, article_guid, article_date, source, sentiment_score',
+            key=('player_id', 'article_guid'),
+            filters=lambda q, chunk=chunk: filters(q, chunk)
+        ))
+    return aggregate_rows(raw)
+
+def source_breakdown(player_id: str, since: str = None) -> Dict:
+    """Mentions and average (unweighted) sentiment by source for one player"""
+    by_source = {}
+    for row in load_daily_sentiment([player_id], since=since):
+        source = by_source.setdefault(row['source'], {'count': 0, 'total': 0.0})
+        source['count'] += row['mention_count']
+        source['total'] += row['sentiment_sum']
+
+    total_mentions = sum(s['count'] for s in by_source.values())
+    if not total_mentions:
+        return {"total_mentions": 0, "by_source": {}, "avg_sentiment": 0}
+
+    total_sentiment = sum(s['total'] for s in by_source.values())
+    return {
+        "total_mentions": total_mentions,
+        "by_source": {
+            source: {"count": s['count'], "avg_sentiment": s['total'] / s['count']}
+            for source, s in by_source.items()
+        },
+        "avg_sentiment": total_sentiment / total_mentions
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain player_sentiment_daily")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    rebuild = subparsers.add_parser('rebuild', help="Recompute aggregates from daily_player_sentiment")
+    rebuild.add_argument('--since', help="Only rebuild days on or after this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    rebuild_sentiment_aggregates(args.since)
@@ -0,0 +1,99 @@
+"""
+Signal Screener - Vectorized buy/sell/breakout screens over a player snapshot
+
+Each screen is a boolean mask plus a score vector evaluated over whole
+columns at once. The top `limit` rows are picked with argpartition, so only
+the survivors get sorted, and several screens can be evaluated against the
+same columns in a single call.
+"""
+import numpy as np
+from typing import Callable, Dict, List, Sequence, Tuple
+
+Columns = Dict[str, np.ndarray]
+
+class Screen:
+    """
+    A named rule set: which rows qualify and how to rank them. Thresholds
+    live in params so they can be swept (see backtester.py); mask receives
+    the columns and the params to use.
+    """
+
+    def __init__(self, name: str, score_field: str,
+                 mask: Callable[[Columns, Dict[str, float]], np.ndarray],
+                 score: Callable[[Columns], np.ndarray],
+                 params: Dict[str, float],
+                 direction: int = 1):
+        self.name = name
+        self.score_field = score_field
+        self.mask = mask
+        self.score = score
+        self.params = params
+        self.direction = direction  # +1 expects the value to rise, -1 to fall
+
+    def select(self, columns: Columns, **overrides) -> np.ndarray:
+        """Boolean mask of qualifying rows (works on arrays of any shape)"""
+        return self.mask(columns, {**self.params, **overrides})
+
+SCREENS = {
+    # High stats, low/negative sentiment, decent confidence
+    'buy': Screen(
+        'buy', 'opportunity_score',
+        mask=lambda c, p: (c['stat_component'] > p['min_stat']) & (c['sentiment_component'] < p['max_sentiment']) & (c['confidence_score'] > p['min_confidence']),
+        score=lambda c: (c['stat_component'] * 0.6) + (np.abs(c['sentiment_component']) * 30 * 0.3) + (c['confidence_score'] * 10),
+        params={'min_stat': 30, 'max_sentiment': 0, 'min_confidence': 0.1}
+    ),
+    # Low stats, high sentiment, decent confidence
+    'sell': Screen(
+        'sell', 'risk_score',
+        mask=lambda c, p: (c['stat_component'] < p['max_stat']) & (c['sentiment_component'] > p['min_sentiment']) & (c['confidence_score'] > p['min_confidence']),
+        score=lambda c: (c['sentiment_component'] * 50) - (c['stat_component'] * 0.5) + (c['confidence_score'] * 10),
+        params={'max_stat': 30, 'min_sentiment': 0.2, 'min_confidence': 0.1},
+        direction=-1
+    ),
+    # Positive momentum, rising sentiment, improving stats
+    'breakout': Screen(
+        'breakout', 'breakout_score',
+        mask=lambda c, p: (c['momentum_score'] > p['min_momentum']) & (c['sentiment_component'] >= p['min_sentiment']) & (c['stat_component'] > p['min_stat']),
+        score=lambda c: (c['momentum_score'] * 50) + (c['sentiment_component'] * 30) + (c['stat_component'] * 0.3) + (c['confidence_score'] * 10),
+        params={'min_momentum': 0.15, 'min_sentiment': 0, 'min_stat': 15}
+    ),
+}
+
+def top_k(scores: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest-scoring masked rows, best first (ties keep row order)"""
+    candidates = np.flatnonzero(mask)
+    if k <= 0 or not len(candidates):
+        return candidates[:0]
+
+    if len(candidates) > k:
+        # Everything above the k-th best score, then the lowest rows among
+        # those tied with it (argpartition alone picks tied rows arbitrarily)
+        values = scores[candidates]
+        values = np.where(np.isnan(values), -np.inf, values)
+        kth = -np.partition(-values, k - 1)[k - 1]
+        above = candidates[values > kth]
+        tied = candidates[values == kth][:k - len(above)]
+        candidates = np.sort(np.concatenate([above, tied]))
+
+    # Stable sort of the survivors only
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+def run_screens(columns: Columns, names: Sequence[str], limit: int) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Evaluate several screens against the same columns.
+
+    Returns {name: (row_indices, scores)} with rows ordered best first and
+    scores aligned to them.
+    """
+    results = {}
+    for name in names:
+        if name not in SCREENS:
+            raise ValueError(f"Unknown screen '{name}'. Available: {', '.join(SCREENS)}")
+        screen = SCREENS[name]
+        scores = screen.score(columns)
+        rows = top_k(scores, screen.select(columns), limit)
+        results[name] = (rows, scores[rows])
+    return results
+
+def available_screens() -> List[str]:
+    return list(SCREENS)
@@ -0,0 +1,128 @@
+"""
+Snapshot Service - Shared in-memory copy of the latest player_value_index day
+
+Every advisor ranks players off the newest value_date. Instead of each one
+looking up the latest date and re-reading the full slice, the slice is loaded
+once per process, joined with player metadata and kept as NumPy columns. The
+snapshot is versioned by its value_date and only reloaded when a newer date
+shows up in the table.
+"""
+import os
+import time
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from supabase import create_client, Client
+from typing import Dict, List, Optional, Sequence
+
+from supabase_pager import iter_rows
+
+load_dotenv()
+url: str = os.environ.get("SUPABASE_URL")
+key: str = os.environ.get("SUPABASE_KEY")
+supabase: Client = create_client(url, key)
+
+VALUE_COLUMNS = ['value_score', 'stat_component', 'sentiment_component', 'momentum_score', 'confidence_score']
+
+# Metadata lookups are split so the in_ filter keeps the URL short
+PLAYER_CHUNK_SIZE = 200
+
+class PlayerSnapshot:
+    """One value_date of player_value_index joined with player metadata"""
+
+    def __init__(self, version: Optional[str], records: List[Dict], players: Dict[str, Dict]):
+        self.version = version  # The snapshot's value_date
+        self.records = records  # Raw rows, as returned by Supabase
+        self.players = players  # player_id -> {id, full_name, team_name, position}
+        self.loaded_at = time.time()
+
+        self.player_ids = np.array([r['player_id'] for r in records], dtype=object)
+        self.index = {pid: i for i, pid in enumerate(self.player_ids)}
+
+        # Numeric columns; missing values become NaN so comparisons are simply False
+        self.columns = {
+            column: np.array([np.nan if r.get(column) is None else r[column] for r in records], dtype=float)
+            for column in VALUE_COLUMNS
+        }
+        self.has_player = np.array([pid in players for pid in self.player_ids], dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def lookup(self, player_ids: Sequence[str]) -> np.ndarray:
+        """Row indices for the given players (players not in the snapshot are skipped)"""
+        return np.array([self.index[pid] for pid in dict.fromkeys(player_ids) if pid in self.index], dtype=int)
+
+    def player(self, player_id: str) -> Optional[Dict]:
+        return self.players.get(player_id)
+
+class SnapshotService:
+    """Process-wide holder of the latest PlayerSnapshot"""
+
+    _snapshot = None
+    _checked_at = 0.0
+    _lock = threading.Lock()
+
+    # How long to trust the current snapshot before checking for a newer value_date
+    check_interval = 60
+
+    @classmethod
+    def latest_value_date(cls) -> Optional[str]:
+        response = supabase.table('player_value_index').select('value_date').order(
+            'value_date', desc=True
+        ).limit(1).execute()
+        return response.data[0]['value_date'] if response.data else None
+
+    @classmethod
+    def load(cls, value_date: Optional[str]) -> PlayerSnapshot:
+        """Read one value_date slice and its player metadata"""
+        if value_date is None:
+            return PlayerSnapshot(None, [], {})
+
+        records = list(iter_rows(
+            supabase, 'player_value_index',
+            'player_id, ' + ', '.join(VALUE_COLUMNS),
+            key=('player_id',),
+            filters=lambda q: q.eq('value_date', value_date)
+        ))
+
+        players = {}
+        player_ids = [r['player_id'] for r in records]
+        for i in range(0, len(player_ids), PLAYER_CHUNK_SIZE):
+            response = supabase.table('players').select(
+                'id, full_name, team_name, position'
+            ).in_('id', player_ids[i:i + PLAYER_CHUNK_SIZE]).execute()
+            players.update({p['id']: p for p in response.data})
+
+        print(f"✅ Loaded snapshot {value_date}: {len(records)} players")
+        return PlayerSnapshot(value_date, records, players)
+
+    @classmethod
+    def get(cls, force_refresh: bool = False) -> PlayerSnapshot:
+        """
+        Latest snapshot. At most once per check_interval this asks for the
+        newest value_date and reloads only if it differs from the held version.
+        """
+        with cls._lock:
+            now = time.time()
+            if not force_refresh and cls._snapshot is not None and now - cls._checked_at < cls.check_interval:
+                return cls._snapshot
+
+            latest_date = cls.latest_value_date()
+            if force_refresh or cls._snapshot is None or cls._snapshot.version != latest_date:
+                cls._snapshot = cls.load(latest_date)
+            cls._checked_at = now
+            return cls._snapshot
+
+    @classmethod
+    def invalidate(cls):
+        """Force the next get() to check for a new value_date"""
+        with cls._lock:
+            cls._checked_at = 0.0
+
+def get_snapshot(force_refresh: bool = False) -> PlayerSnapshot:
+    """Shortcut for SnapshotService.get()"""
+    return SnapshotService.get(force_refresh)
@@ -0,0 +1,11 @@
+-- Precomputed API reports written by `python daily_reports.py` at the end of the
+-- scraper workflow. One row per report and value_date; etag is a content hash
+-- the API sends back so unchanged reports can be answered with 304.
+create table if not exists daily_reports (
+    report_name text not null,
+    value_date date not null,
+    etag text not null,
+    payload jsonb not null,
+    created_at timestamptz not null default now(),
+    primary key (report_name, value_date)
+);
@@ -0,0 +1,14 @@
+-- Precomputed price forecasts written nightly by `python ai_price_predictor.py --store`.
+-- value_date is the newest player_value_index row the forecast was built from,
+-- so a new value index row naturally invalidates the stored forecast.
+create table if not exists player_forecasts (
+    player_id uuid not null references players(id) on delete cascade,
+    value_date date not null,
+    days_ahead integer not null,
+    predictions jsonb not null,
+    momentum jsonb,
+    created_at timestamptz not null default now(),
+    primary key (player_id, value_date, days_ahead)
+);
+
+create index if not exists player_forecasts_value_date_idx on player_forecasts (value_date);
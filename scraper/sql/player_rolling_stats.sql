@@ -0,0 +1,13 @@
+-- Last-5 / last-10 game aggregates maintained by `daily_stats_scraper.py`
+-- (rebuild with `python rolling_stats.py rebuild`).
+-- games holds the player's last 10 daily_player_stats rows, newest first;
+-- last_5 / last_10 hold {"games": n, "<stat>": {"count", "sum", "sum_sq"}}
+-- for every box score stat plus fantasy_points.
+create table if not exists player_rolling_stats (
+    player_id uuid primary key references players(id) on delete cascade,
+    last_game_date date,
+    games jsonb not null default '[]'::jsonb,
+    last_5 jsonb not null,
+    last_10 jsonb not null,
+    updated_at timestamptz not null default now()
+);
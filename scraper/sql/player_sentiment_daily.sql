@@ -0,0 +1,15 @@
+-- Daily sentiment totals per (player, source), refreshed by the sentiment
+-- scrapers (rebuild with `python sentiment_aggregates.py rebuild`).
+-- weighted_sum applies the value index's source weights to each score.
+create table if not exists player_sentiment_daily (
+    player_id uuid not null references players(id) on delete cascade,
+    source text not null,
+    article_date date not null,
+    mention_count integer not null,
+    sentiment_sum double precision not null,
+    weighted_sum double precision not null,
+    updated_at timestamptz not null default now(),
+    primary key (player_id, article_date, source)
+);
+
+create index if not exists player_sentiment_daily_date_idx on player_sentiment_daily (article_date);
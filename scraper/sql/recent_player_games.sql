@@ -0,0 +1,21 @@
+-- Last n daily_player_stats rows per player, newest first, for
+-- rolling_stats.load_recent_games (called through supabase.rpc with at most
+-- 1000 rows per call). Without it the scrapers page by date windows instead.
+-- The index lets each player's rows be read top-down and stop after n.
+create index if not exists daily_player_stats_player_date_idx
+    on daily_player_stats (player_id, game_date desc);
+
+create or replace function recent_player_games(player_ids uuid[], n integer)
+returns setof daily_player_stats
+language sql stable
+as $$
+    select recent.*
+    from unnest(player_ids) as p(id)
+    cross join lateral (
+        select *
+        from daily_player_stats s
+        where s.player_id = p.id
+        order by s.game_date desc
+        limit n
+    ) recent
+$$;
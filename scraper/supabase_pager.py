@@ -0,0 +1,166 @@
+"""
+Supabase Pager - Streams large PostgREST reads page by page
+
+PostgREST silently caps a single read at its max-rows setting (1000 on
+Supabase by default), so any `.execute()` over a growing table can come back
+truncated. These helpers walk a table with keyset pagination instead: every
+page is ordered by a unique key and the next page starts strictly after the
+last key seen, so results are complete and only one page is held at a time.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow output is optional
+    pa = None
+
+# Supabase's default PostgREST max-rows. Pages larger than the server limit
+# come back short and would end the scan early, so never go above it.
+DEFAULT_PAGE_SIZE = 1000
+
+_RESERVED_CHARS = set(',.:()" \\')
+
+
+def _quote(value) -> str:
+    """Format a value for a PostgREST logical filter, quoting reserved characters"""
+    text = str(value)
+    if any(ch in _RESERVED_CHARS for ch in text):
+        text = '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return text
+
+
+def _keyset_filter(key: Sequence[str], last_row: Dict, desc: bool) -> str:
+    """
+    Build the `or=(...)` filter selecting rows strictly after last_row.
+
+    For key (a, b) ascending this is: a > x OR (a = x AND b > y)
+    """
+    op = 'lt' if desc else 'gt'
+    clauses = []
+    for i, column in enumerate(key):
+        terms = [f"{k}.eq.{_quote(last_row[k])}" for k in key[:i]]
+        terms.append(f"{column}.{op}.{_quote(last_row[column])}")
+        clauses.append(terms[0] if len(terms) == 1 else f"and({','.join(terms)})")
+    return ','.join(clauses)
+
+
+def _base_query(client, table: str, columns: str, key: Sequence[str],
+                filters: Optional[Callable], desc: bool):
+    query = client.table(table).select(columns)
+    if filters:
+        query = filters(query)
+    for column in key:
+        query = query.order(column, desc=desc)
+    return query
+
+
+def iter_pages(client, table: str, columns: str, key: Sequence[str] = ('id',),
+               filters: Optional[Callable] = None, page_size: int = DEFAULT_PAGE_SIZE,
+               desc: bool = False, prefetch: int = 0) -> Iterator[List[Dict]]:
+    """
+    Yield a table's rows one page (list of dicts) at a time.
+
+    Args:
+        client: Supabase client
+        table: Table name
+        columns: Select string; must include every key column
+        key: Columns that uniquely identify a row, in sort order
+        filters: Optional callable applied to the query builder,
+                 e.g. lambda q: q.gte('value_date', week_ago)
+        page_size: Rows per request (keep <= the server's max-rows)
+        desc: Walk the key in descending order
+        prefetch: If > 0, fetch this many pages concurrently using range
+                  offsets instead of sequential keyset requests
+    """
+    key = tuple(key)
+
+    if prefetch > 0:
+        yield from _iter_pages_prefetch(client, table, columns, key, filters,
+                                        page_size, desc, prefetch)
+        return
+
+    last_row = None
+    while True:
+        query = _base_query(client, table, columns, key, filters, desc)
+        if last_row is not None:
+            query = query.or_(_keyset_filter(key, last_row, desc))
+        page = query.range(0, page_size - 1).execute().data or []
+
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last_row = page[-1]
+
+
+def _iter_pages_prefetch(client, table, columns, key, filters, page_size, desc, prefetch):
+    """Range-offset paging with `prefetch` requests in flight at once"""
+    def fetch(page_index: int) -> List[Dict]:
+        start = page_index * page_size
+        query = _base_query(client, table, columns, key, filters, desc)
+        return query.range(start, start + page_size - 1).execute().data or []
+
+    with ThreadPoolExecutor(max_workers=prefetch) as pool:
+        next_index = 0
+        pending = []
+        while True:
+            while len(pending) < prefetch:
+                pending.append(pool.submit(fetch, next_index))
+                next_index += 1
+
+            page = pending.pop(0).result()
+            if page:
+                yield page
+            if len(page) < page_size:
+                for future in pending:
+                    future.cancel()
+                return
+
+
+def iter_rows(client, table: str, columns: str, **kwargs) -> Iterator[Dict]:
+    """Yield rows one at a time (see iter_pages for arguments)"""
+    for page in iter_pages(client, table, columns, **kwargs):
+        yield from page
+
+
+def fetch_all(client, table: str, columns: str, **kwargs) -> List[Dict]:
+    """Read every matching row (see iter_pages for arguments)"""
+    rows = []
+    for page in iter_pages(client, table, columns, **kwargs):
+        rows.extend(page)
+    return rows
+
+
+def page_to_arrays(page: List[Dict], fields: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Convert a page of row dicts into one NumPy array per field"""
+    arrays = {}
+    for field in fields:
+        values = [row.get(field) for row in page]
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            arrays[field] = np.asarray(values, dtype=float)
+        else:
+            arrays[field] = np.asarray(values, dtype=object)
+    return arrays
+
+
+def iter_batches(client, table: str, columns: str, fields: Sequence[str] = None,
+                 fmt: str = 'numpy', **kwargs) -> Iterator:
+    """
+    Yield pages as columnar batches.
+
+    fmt='numpy' yields {field: ndarray}; fmt='arrow' yields pyarrow.RecordBatch
+    (requires pyarrow). Fields default to the select string's column names.
+    """
+    if fields is None:
+        fields = [c.strip() for c in columns.split(',') if c.strip()]
+    if fmt == 'arrow' and pa is None:
+        raise ImportError("pyarrow is required for fmt='arrow'")
+
+    for page in iter_pages(client, table, columns, **kwargs):
+        if fmt == 'arrow':
+            yield pa.RecordBatch.from_pylist([{f: row.get(f) for f in fields} for row in page])
+        else:
+            yield page_to_arrays(page, fields)